@@ -0,0 +1,334 @@
+# benchmark.py -> medições de desempenho que servem de guarda contra regressões
+#
+# - inicio: tempo de 'import main' num interpretador novo (o que roda antes da janela de seleção
+#   de arquivos aparecer) e quais módulos pesados já foram carregados nesse ponto.
+#   Passou do orçamento ou algum módulo pesado voltou a ser importado no topo -> sai com código 1
+# - escala: gera cursos sintéticos (sintetico.py) de vários tamanhos e mede cada etapa: XML, CSV, grafo,
+#   índices, montagem da figura, desenho no canvas (Agg), hover simulado e caminho mais longo.
+#   Com --comparar, compara com um JSON de uma rodada anterior e sai com código 1 se alguma etapa piorou
+#
+# Uso:
+#   python benchmark.py inicio
+#   python benchmark.py inicio --repeticoes 10 --orcamento 0.2 --json inicio.json
+#   python benchmark.py escala --alunos 1000 10000 --disciplinas 40 80 --json escala.json
+#   python benchmark.py escala --alunos 1000 10000 --comparar escala.json --tolerancia 0.3
+#   python benchmark.py escala --alunos 10000 --trace trace.json   (abre em chrome://tracing ou ui.perfetto.dev)
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from types import SimpleNamespace
+
+import instrumentacao
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+#Orçamento (segundos) da mediana de 'import main'. Hoje fica em ~0.015s; com os imports pesados no topo era ~1s
+ORCAMENTO_INICIO_S = 0.25
+
+#Quantos movimentos do mouse o hover simulado faz por tamanho de curso
+EVENTOS_HOVER = 400
+
+#Diferenças menores que isso (segundos) não contam como regressão no --comparar (é ruído)
+PISO_REGRESSAO_S = 0.005
+
+#Módulos que NÃO podem estar carregados depois de 'import main' (são precarregados numa thread, ver main.py)
+MODULOS_PESADOS = ("pandas", "matplotlib", "networkx", "gui", "viz", "model")
+
+# Roda no interpretador novo: mede o import e devolve o tempo e os módulos pesados que entraram
+_CODIGO_INICIO = """
+import sys, time, json
+inicio = time.perf_counter()
+import main
+tempo = time.perf_counter() - inicio
+pesados = [m for m in {pesados!r} if m in sys.modules]
+print(json.dumps({{"tempo": tempo, "pesados": pesados}}))
+"""
+
+
+def _rodar_python(codigo):
+    # Interpretador novo a cada medição: o import tem que ser "a frio" (sem nada em sys.modules)
+    resultado = subprocess.run([sys.executable, "-c", codigo], cwd=PASTA, capture_output=True, text=True, check=True)
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def medir_inicio(repeticoes=5, orcamento=ORCAMENTO_INICIO_S):
+    """
+    Mede 'import main' em 'repeticoes' interpretadores novos.
+    Retorna um dicionário com os tempos, a mediana, os módulos pesados carregados e se passou ("ok")
+    """
+    codigo = _CODIGO_INICIO.format(pesados=MODULOS_PESADOS)
+    medicoes = [_rodar_python(codigo) for _ in range(repeticoes)]
+    tempos = [m["tempo"] for m in medicoes]
+    pesados = sorted({p for m in medicoes for p in m["pesados"]})
+    mediana = statistics.median(tempos)
+    return {
+        "tempos": tempos,
+        "mediana": mediana,
+        "orcamento": orcamento,
+        "modulos_pesados": pesados,
+        "ok": mediana <= orcamento and not pesados,
+    }
+
+
+def imprimir_inicio(resultado):
+    print("\n--- Início (import main) ---")
+    print(f"Mediana: {resultado['mediana'] * 1000:.1f} ms (orçamento {resultado['orcamento'] * 1000:.0f} ms), "
+          f"mín {min(resultado['tempos']) * 1000:.1f} ms, máx {max(resultado['tempos']) * 1000:.1f} ms")
+    if resultado["modulos_pesados"]:
+        print(f"Módulos pesados importados no início: {', '.join(resultado['modulos_pesados'])}")
+    print("OK" if resultado["ok"] else "REGRESSÃO")
+    print("----------------------------")
+
+
+def _app_simulada(catalogo, grafo, figura, canvas):
+    """
+    Um gui.App sem janela (App.__new__, sem Tk) com só o que o hover usa, montado igual ao regenerar_grafo.
+    O after() guarda o callback numa lista, que o benchmark roda depois de cada evento
+    """
+    import gui
+    import viz
+    from matplotlib.patches import FancyBboxPatch
+    from indices_grafo import IndiceCaminhos
+
+    app = gui.App.__new__(gui.App)
+    app.catalogo = catalogo
+    app.grafo_curso = grafo
+    app.indice_caminhos = IndiceCaminhos(grafo)
+    app.layout = viz.calcular_layout(grafo)
+    app.indice_espacial = viz.IndiceEspacial(app.layout)
+    app.figura_atual = figura
+    app.canvas = canvas
+    app.estado_hover = None
+    app.posicao_hover = None
+    app.hover_agendado = None
+    app.fundo = None
+    app.fundo_apagado = None
+    app.area_setas = None
+    app.area_destaque = None
+
+    ax = figura.axes[0]
+    app.grafo_textos = {t.get_gid(): t for t in ax.texts if t.get_gid() in grafo}
+    app.grafo_setas = next((c for c in ax.collections if c.get_gid() == "arestas"), None)
+    if app.grafo_setas is not None:
+        app.grafo_setas.guardar_fundos = True
+    app.grafo_caixas = {p.get_gid(): p for p in ax.patches
+                        if isinstance(p, FancyBboxPatch) and p.get_gid() is not None}
+    app._criar_camada_destaque(ax)
+    canvas.mpl_connect("draw_event", app._ao_desenhar)
+    canvas.draw()
+
+    app.agendados = []
+    app.after = lambda ms, funcao: app.agendados.append(funcao) or len(app.agendados)
+    return app
+
+
+def _eventos_hover(layout, quantidade):
+    # Movimentos do mouse alternando entre o centro de um nó e um ponto vazio (entre as colunas),
+    # pra cada evento trocar o destaque (o pior caso: desenha ou apaga o caminho toda vez)
+    nos = list(layout["pos"].items())
+    meio = layout["horizontal_spacing"] / 2
+    eventos = []
+    for i in range(quantidade):
+        _, (x, y) = nos[(i // 2) % len(nos)]
+        if i % 2:
+            x += meio
+        eventos.append(SimpleNamespace(inaxes=True, xdata=x, ydata=y))
+    return eventos
+
+
+def _aquecer():
+    # O primeiro desenho do processo carrega as fontes e os caches do matplotlib: fica fora da medição
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    figura = Figure(figsize=(2, 2))
+    ax = figura.add_subplot(111)
+    ax.text(0.5, 0.5, "Sem 1 ↻✓", fontweight="bold")
+    ax.set_title("aquecer", weight="bold")
+    FigureCanvasAgg(figura).draw()
+
+
+def medir_etapas(caminho_xml, caminho_csv, eventos_hover=EVENTOS_HOVER):
+    """
+    Mede cada etapa do caminho XML/CSV -> janela pra um curso. Retorna {etapa: segundos};
+    'hover' e 'caminho_mais_longo' são o tempo médio de UMA chamada
+    """
+    import matplotlib
+    matplotlib.use("Agg")  # antes de importar o viz: roda sem display
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import viz
+    from model import Catalogo, _importar_pandas
+    from indices_grafo import IndiceCaminhos, IndiceAlcance
+
+    # O pandas é importado só na primeira leitura de CSV; aqui ele entra antes pra etapa 'csv' medir só a leitura
+    _importar_pandas()
+    etapas = {}
+
+    def medir(nome, funcao):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        etapas[nome] = time.perf_counter() - inicio
+        return resultado
+
+    catalogo = Catalogo()
+    medir("xml", lambda: catalogo._carregar_de_xml(caminho_xml))
+    medir("csv", lambda: catalogo._carregar_de_csv(caminho_csv))
+    grafo = medir("grafo", lambda: viz.criar_grafo_do_catalogo(catalogo))
+    medir("indices", lambda: (IndiceCaminhos(grafo), IndiceAlcance(grafo)))
+    ras = catalogo.ras_ordenados()
+    figura = medir("desenhar", lambda: viz.desenhar_grafo_em_camadas(grafo, catalogo, 'decrescente', ras))
+    canvas = FigureCanvasAgg(figura)
+    medir("canvas", canvas.draw)
+
+    # Hover: o on_hover de verdade do gui.App + o callback que ele agenda (o _processar_hover com o blit)
+    app = _app_simulada(catalogo, grafo, figura, canvas)
+    eventos = _eventos_hover(app.layout, eventos_hover)
+    inicio = time.perf_counter()
+    for evento in eventos:
+        app.on_hover(evento)
+        while app.agendados:
+            app.agendados.pop(0)()
+    etapas["hover"] = (time.perf_counter() - inicio) / len(eventos)
+
+    nos = list(grafo.nodes())
+    inicio = time.perf_counter()
+    for no in nos:
+        app.encontrar_caminho_mais_longo(no)
+    etapas["caminho_mais_longo"] = (time.perf_counter() - inicio) / max(1, len(nos))
+    return etapas
+
+
+def medir_escala(alunos=(1000, 10000), disciplinas=(40,), densidade=1.5, taxa_refazer=0.3, semente=0,
+                 pasta=None, eventos_hover=EVENTOS_HOVER, repeticoes=3):
+    """
+    Para cada combinação (disciplinas, alunos) gera um curso sintético e mede as etapas (medir_etapas)
+    'repeticoes' vezes, guardando o menor tempo de cada etapa (o que menos sofreu com ruído da máquina).
+    Os arquivos vão pra 'pasta' (padrão: uma pasta temporária apagada no final)
+    """
+    import sintetico
+
+    temporaria = pasta is None
+    pasta = pasta or tempfile.mkdtemp(prefix="tcc2025-bench-")
+    resultados = []
+    _aquecer()
+    try:
+        for n_disciplinas in disciplinas:
+            for n_alunos in alunos:
+                prefixo = os.path.join(pasta, f"d{n_disciplinas}_a{n_alunos}_s{semente}")
+                inicio = time.perf_counter()
+                xml, csv, dados = sintetico.gerar_curso(prefixo, n_disciplinas, densidade=densidade, alunos=n_alunos,
+                                                        taxa_refazer=taxa_refazer, semente=semente)
+                gerar = time.perf_counter() - inicio
+                print(f"{n_disciplinas} disciplinas, {n_alunos} alunos ({dados['registros']} registros)...")
+                rodadas = [medir_etapas(xml, csv, eventos_hover) for _ in range(repeticoes)]
+                etapas = {etapa: min(r[etapa] for r in rodadas) for etapa in rodadas[0]}
+                resultados.append({"dados": dados, "gerar": gerar, "repeticoes": repeticoes, "etapas": etapas})
+    finally:
+        if temporaria:
+            shutil.rmtree(pasta, ignore_errors=True)
+    return {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+        "ok": True,
+    }
+
+
+def comparar_escala(resultado, anterior, tolerancia=0.3):
+    """
+    Compara etapa por etapa com uma rodada anterior (mesmo número de disciplinas e alunos).
+    Marca como regressão o que ficou mais de 'tolerancia' (fração) mais lento e mais de PISO_REGRESSAO_S.
+    Preenche resultado["regressoes"] e resultado["ok"]
+    """
+    def chave(r):
+        return (r["dados"]["disciplinas"], r["dados"]["alunos"])
+
+    antes = {chave(r): r["etapas"] for r in anterior.get("resultados", [])}
+    regressoes = []
+    for r in resultado["resultados"]:
+        base = antes.get(chave(r))
+        if base is None:
+            continue
+        for etapa, segundos in r["etapas"].items():
+            if etapa in base and segundos > base[etapa] * (1 + tolerancia) and segundos - base[etapa] > PISO_REGRESSAO_S:
+                regressoes.append({"disciplinas": chave(r)[0], "alunos": chave(r)[1], "etapa": etapa,
+                                   "antes": base[etapa], "agora": segundos})
+    resultado["regressoes"] = regressoes
+    resultado["ok"] = not regressoes
+    return resultado
+
+
+def imprimir_escala(resultado):
+    etapas = list(resultado["resultados"][0]["etapas"]) if resultado["resultados"] else []
+    print("\n--- Escala (segundos; hover e caminho_mais_longo em ms por chamada) ---")
+    print(f"{'disc':>5} {'alunos':>7} " + " ".join(f"{e:>10.10}" for e in etapas))
+    for r in resultado["resultados"]:
+        valores = [r["etapas"][e] * (1000 if e in ("hover", "caminho_mais_longo") else 1) for e in etapas]
+        print(f"{r['dados']['disciplinas']:>5} {r['dados']['alunos']:>7} " + " ".join(f"{v:>10.3f}" for v in valores))
+    for reg in resultado.get("regressoes", []):
+        print(f"REGRESSÃO: {reg['etapa']} ({reg['disciplinas']} disc, {reg['alunos']} alunos) "
+              f"{reg['antes']:.4f}s -> {reg['agora']:.4f}s")
+    if "regressoes" in resultado:
+        print("OK" if resultado["ok"] else "REGRESSÃO")
+    print("----------------------------")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Medições de desempenho com orçamento (guarda contra regressões).")
+    sub = parser.add_subparsers(dest="medicao", required=True)
+
+    p_inicio = sub.add_parser("inicio", help="tempo de 'import main' a frio")
+    p_inicio.add_argument("--repeticoes", type=int, default=5)
+    p_inicio.add_argument("--orcamento", type=float, default=ORCAMENTO_INICIO_S, help="segundos (mediana)")
+    p_inicio.add_argument("--json", default=None, help="grava o resultado nesse arquivo")
+
+    p_escala = sub.add_parser("escala", help="tempo de cada etapa em cursos sintéticos de vários tamanhos")
+    p_escala.add_argument("--alunos", type=int, nargs="+", default=[1000, 10000])
+    p_escala.add_argument("--disciplinas", type=int, nargs="+", default=[40])
+    p_escala.add_argument("--densidade", type=float, default=1.5, help="média de pré-requisitos por disciplina")
+    p_escala.add_argument("--taxa-refazer", type=float, default=0.3)
+    p_escala.add_argument("--semente", type=int, default=0)
+    p_escala.add_argument("--eventos-hover", type=int, default=EVENTOS_HOVER)
+    p_escala.add_argument("--repeticoes", type=int, default=3, help="rodadas por tamanho (fica o menor tempo)")
+    p_escala.add_argument("--pasta", default=None, help="onde gravar os cursos gerados (padrão: pasta temporária)")
+    p_escala.add_argument("--comparar", default=None, help="JSON de uma rodada anterior pra comparar")
+    p_escala.add_argument("--tolerancia", type=float, default=0.3, help="quanto mais lento (fração) conta como regressão")
+    p_escala.add_argument("--json", default=None, help="grava o resultado nesse arquivo")
+    p_escala.add_argument("--trace", default=None, help="liga a instrumentação e grava o trace do Chrome nesse arquivo")
+
+    args = parser.parse_args(argv)
+
+    if args.medicao == "inicio":
+        resultado = medir_inicio(args.repeticoes, args.orcamento)
+        imprimir_inicio(resultado)
+    elif args.medicao == "escala":
+        if args.trace:
+            instrumentacao.ativar()
+        resultado = medir_escala(args.alunos, args.disciplinas, args.densidade, args.taxa_refazer, args.semente,
+                                 args.pasta, args.eventos_hover, args.repeticoes)
+        if args.comparar:
+            with open(args.comparar, encoding="utf-8") as f:
+                comparar_escala(resultado, json.load(f), args.tolerancia)
+        imprimir_escala(resultado)
+        if args.trace:
+            instrumentacao.imprimir_resumo()
+            print(f"Trace com {instrumentacao.exportar_chrome(args.trace)} eventos gravado em {args.trace}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2)
+    return 0 if resultado["ok"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
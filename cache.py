@@ -0,0 +1,163 @@
+# cache.py -> guarda o Catalogo já montado no disco pra não ter que ler o XML e o CSV de novo
+#
+# - Cada entrada é uma pasta: catalogo.json + os arrays da BaseNotas (um .npy por coluna, sem pickle)
+# - Os arrays são abertos como memmap, então abrir o cache não lê os registros pra memória
+# - A chave é o tamanho + data de modificação dos dois arquivos (ou o hash do conteúdo)
+# - Se o XML ou o CSV mudarem a chave muda e o cache antigo é apagado automaticamente
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+from model import Catalogo, Disciplina, BaseNotas
+import instrumentacao
+
+#Muda quando o formato do arquivo de cache mudar, assim os caches antigos são ignorados
+CACHE_VERSAO = 8
+
+#Pasta padrão do cache, pode ser trocada pela variável de ambiente ou pelo parâmetro diretorio
+DIRETORIO_PADRAO = os.path.join(os.path.expanduser("~"), ".cache", "tcc2025")
+
+
+def diretorio_cache(diretorio=None):
+    # Parâmetro > variável de ambiente TCC2025_CACHE_DIR > pasta padrão
+    return diretorio or os.environ.get("TCC2025_CACHE_DIR") or DIRETORIO_PADRAO
+
+
+def arquivos_faltando(*caminhos):
+    #Caminhos que não existem (ou não são arquivo). Quem carrega vários pares confere antes de ler,
+    #porque caminho_cache/carregar_catalogo levantam FileNotFoundError no os.stat
+    return [caminho for caminho in caminhos if not os.path.isfile(caminho)]
+
+
+def _assinatura_arquivo(caminho, modo):
+    # 'mtime' usa tamanho + data de modificação (rápido), 'hash' lê o arquivo inteiro
+    if modo == "hash":
+        h = hashlib.sha256()
+        with open(caminho, "rb") as f:
+            for pedaco in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(pedaco)
+        return h.hexdigest()
+    info = os.stat(caminho)
+    return f"{info.st_size}:{info.st_mtime_ns}"
+
+
+def caminho_cache(caminho_xml, caminho_csv, diretorio=None, modo="mtime"):
+    """
+    Retorna o caminho do arquivo de cache para o par (XML, CSV).
+    O prefixo identifica o par de arquivos e o sufixo identifica o conteúdo deles.
+    """
+    par = os.path.abspath(caminho_xml) + "|" + os.path.abspath(caminho_csv)
+    prefixo = hashlib.sha1(par.encode("utf-8")).hexdigest()[:16]
+    conteudo = "|".join([
+        str(CACHE_VERSAO), modo,
+        _assinatura_arquivo(caminho_xml, modo),
+        _assinatura_arquivo(caminho_csv, modo),
+    ])
+    sufixo = hashlib.sha1(conteudo.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(diretorio_cache(diretorio), f"{prefixo}-{sufixo}")
+
+
+def salvar_catalogo(catalogo, caminho):
+    #Escreve o catálogo inteiro numa pasta: catalogo.json (disciplinas, pré-requisitos, total de alunos)
+    #e base/ com os registros (um .npy por coluna, ver model.BaseNotas.salvar)
+    disciplinas = catalogo.listar_disciplinas()
+    base = catalogo.base
+    if base is None:
+        base = BaseNotas.construir([d.codigo for d in disciplinas], {})
+    metadados = {
+        "versao": CACHE_VERSAO,
+        "total_alunos": int(catalogo.total_alunos),
+        "max_anos": catalogo.max_anos,
+        "disciplinas": [
+            {"codigo": d.codigo, "nome": d.nome, "creditos": d.creditos,
+             "semestre_offer": d.semestre_offer, "pre_requisitos": d.pre_requisitos,
+             "cadeia_pre_requisito": d.cadeia_pre_requisito}
+            for d in disciplinas
+        ],
+    }
+
+    # Escreve numa pasta temporária e troca de nome no final: ninguém lê um cache escrito pela metade.
+    # Cada processo tem a sua pasta (os workers do pool podem gravar o mesmo cache ao mesmo tempo)
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(pasta, exist_ok=True)
+    temporario = tempfile.mkdtemp(dir=pasta, prefix=os.path.basename(caminho) + ".", suffix=".tmp")
+    try:
+        base.salvar(os.path.join(temporario, "base"))
+        with open(os.path.join(temporario, "catalogo.json"), "w", encoding="utf-8") as f:
+            json.dump(metadados, f)
+        shutil.rmtree(caminho, ignore_errors=True)
+        try:
+            os.replace(temporario, caminho)
+        except OSError:
+            # Outro processo trocou primeiro (a pasta já existe de novo): o cache dele é igual, fica o dele
+            if not os.path.isfile(os.path.join(caminho, "catalogo.json")):
+                raise
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+
+@instrumentacao.medido("cache.carregar_catalogo_do_cache")
+def carregar_catalogo_do_cache(caminho, mmap=True):
+    #Monta um Catalogo a partir da pasta do cache. Retorna None se ela não existir ou for de outra versão.
+    #Com mmap=True os registros continuam no disco e só as partes usadas são lidas
+    try:
+        with open(os.path.join(caminho, "catalogo.json"), encoding="utf-8") as f:
+            metadados = json.load(f)
+        if metadados.get("versao") != CACHE_VERSAO:
+            return None
+        base = BaseNotas.abrir(os.path.join(caminho, "base"), mmap=mmap)
+    except (FileNotFoundError, OSError, ValueError, KeyError):
+        return None
+
+    catalogo = Catalogo()
+    catalogo.total_alunos = metadados["total_alunos"]
+    catalogo.max_anos = metadados["max_anos"]
+    for d in metadados["disciplinas"]:
+        catalogo.disciplinas[d["codigo"]] = Disciplina(**d)
+    catalogo.definir_base(base)
+    return catalogo
+
+
+@instrumentacao.medido("cache.carregar_catalogo")
+def carregar_catalogo(caminho_xml, caminho_csv, diretorio=None, modo="mtime", **opcoes_carga):
+    """
+    Retorna o Catalogo do par (XML, CSV), usando o cache do disco quando ele estiver válido.
+    Se não tiver cache (ou os arquivos mudaram), carrega normalmente com carregar_dados
+    e grava o cache novo, apagando os caches antigos do mesmo par.
+
+    - diretorio: pasta do cache (padrão: TCC2025_CACHE_DIR ou ~/.cache/tcc2025)
+    - modo: 'mtime' (tamanho + data de modificação) ou 'hash' (conteúdo dos arquivos)
+    - opcoes_carga: repassadas para Catalogo.carregar_dados (streaming, tamanho_bloco...)
+    """
+    caminho = caminho_cache(caminho_xml, caminho_csv, diretorio, modo)
+
+    inicio = time.perf_counter()
+    catalogo = carregar_catalogo_do_cache(caminho)
+    if catalogo is not None:
+        print(f"Catálogo carregado do cache em {time.perf_counter() - inicio:.2f}s ({caminho})")
+        return catalogo
+
+    catalogo = Catalogo()
+    catalogo.carregar_dados(caminho_xml, caminho_csv, **opcoes_carga)
+    if not catalogo.disciplinas:
+        return catalogo  # não guarda cache de uma carga que deu erro
+
+    # Apaga as versões antigas desse mesmo par de arquivos
+    pasta, nome = os.path.split(caminho)
+    prefixo = nome.split("-")[0] + "-"
+    if os.path.isdir(pasta):
+        for antigo in os.listdir(pasta):
+            # (as pastas temporárias do mesmo cache, nome.xxxx.tmp, podem ser de outro processo gravando agora)
+            if antigo.startswith(prefixo) and antigo != nome and not antigo.startswith(nome + "."):
+                shutil.rmtree(os.path.join(pasta, antigo), ignore_errors=True)
+    try:
+        salvar_catalogo(catalogo, caminho)
+    except OSError as e:
+        print(f"Aviso: não foi possível gravar o cache em '{caminho}': {e}")
+        return catalogo
+    # Reabre do disco: os registros passam a ser memmap e a cópia da carga sai da memória
+    return carregar_catalogo_do_cache(caminho) or catalogo
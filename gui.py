@@ -1,32 +1,101 @@
 # gui.py - versão corrigida
 
 
+import math
+import time
+import queue
+import threading
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, messagebox
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from matplotlib.patches import FancyBboxPatch, FancyArrowPatch
+from matplotlib.patches import FancyBboxPatch
 from matplotlib.figure import Figure
+from matplotlib.transforms import Bbox
 import numpy as np
 import viz 
 import os
+import cache
+import instrumentacao
 from model import Disciplina
-import networkx as nx
+from indices_grafo import IndiceCaminhos, IndiceAlcance
+from planejamento import ProjecaoConclusao
+
+#Intervalo mínimo entre dois processamentos do hover (~60 quadros por segundo)
+INTERVALO_HOVER_MS = 16
+
+#Folga em volta de cada artista do destaque no blit parcial (meia linha mais grossa + antialiasing), em pontos
+MARGEM_BLIT_PT = 3
+
+#Tempo máximo de cada lote de mapas de calor montado depois do esqueleto do grafo (a Tk respira entre os lotes)
+ORCAMENTO_LOTE_MAPAS_MS = 30
+
+#De quanto em quanto tempo a tela de carregamento olha a fila de mensagens da thread de carga
+INTERVALO_CARGA_MS = 50
+
+#Etapas da carga em segundo plano (chave, texto da tela de carregamento)
+ETAPAS_CARGA = [
+    ("catalogo", "Lendo XML e CSV (ou cache)"),
+    ("ras", "Ordenando alunos"),
+    ("grafo", "Montando o grafo"),
+    ("caminhos", "Pré-calculando caminhos"),
+    ("layout", "Calculando o layout"),
+    ("projecao", "Projetando conclusão"),
+]
+
+
+class CanvasMedido(FigureCanvasTkAgg):
+    #Canvas da Tk que registra cada redesenho completo (abrir, zoom, pan, redimensionar) na instrumentação
+    def draw(self):
+        with instrumentacao.trecho("gui.canvas.draw"):
+            super().draw()
+
+
+class CargaCancelada(Exception):
+    #Levantada dentro da thread de carga quando o usuário clica em Cancelar (ou fecha a janela)
+    pass
 
 
 class App(tk.Tk):
-    def __init__(self, catalogo, nome_arquivo_xml):
+    def __init__(self, catalogo, nome_arquivo_xml, caminho_xml=None, caminho_csv=None):
+        """
+        Com o catálogo pronto monta tudo na hora (como antes). Com catalogo=None a janela abre na hora
+        com a tela de carregamento e o XML/CSV (caminho_xml, caminho_csv) são lidos numa thread
+        """
         super().__init__()
         
         self.catalogo = catalogo
         self.nome_arquivo_xml = nome_arquivo_xml
+        self.caminho_xml = caminho_xml
+        self.caminho_csv = caminho_csv
         self.grafo_curso = None
         self.figura_atual = None
         self.estado_hover = None
+        # Hover: última posição do mouse, callback agendado (after) e fundo salvo pro blit
+        # (fundo_apagado = o mesmo fundo com as setas apagadas, por baixo do destaque).
+        # area_setas = retângulo onde os dois fundos diferem; area_destaque = o que o destaque ocupa na tela
+        self.posicao_hover = None
+        self.hover_agendado = None
+        self.fundo = None
+        self.fundo_apagado = None
+        self.area_setas = None
+        self.area_destaque = None
         self.grafo_textos = {}
-        self.grafo_setas = {}
+        self.grafo_setas = None
         self.grafo_caixas = {}
+        self.grafo_mapas = {}
+        self.selos = {"retencao": None, "elegiveis": None}
+        # Mapas de calor que ainda estão chegando (gerador do viz) e o after do próximo lote
+        self.mapas_pendentes = None
+        self.lote_mapas_agendado = None
         self.ordem_heatmap = 'decrescente'
-        self.ra_sequencia = self.obter_ras_ordenados()
+        self.mostrar_retencao = False
+        self.mostrar_elegiveis = False
+        self.ra_sequencia = []
+        # Carga em segundo plano: fila de mensagens da thread, pedido de cancelamento e tempos de cada etapa
+        self.fila_carga = queue.Queue()
+        self.cancelar_carga = threading.Event()
+        self.tempos_carga = {}
+        self.carga_frame = None
         
         # tem que inicializar os frames primeiro
         self.main_frame = None
@@ -49,16 +118,203 @@ class App(tk.Tk):
         style.configure('Wrappable.TLabel', wraplength=wraplength)
         style.configure('Italic.TLabel', font=('Arial', 10, 'italic'))
 
-        # Criar widgets imediatamente
-        self.create_widgets()
+        if catalogo is not None:
+            # Catálogo já carregado: calcula o resto aqui mesmo e cria os widgets imediatamente
+            self._aplicar_dados(self._preparar_dados(lambda etapa, detalhe=None: None))
+            self.create_widgets()
+        else:
+            self._iniciar_carga()
 
-    def obter_ras_ordenados(self):
-        """Obtém lista ordenada de todos os RAs únicos do catálogo"""
-        ras = set()
-        for disciplina in self.catalogo.disciplinas.values():
-            for registro in disciplina.registros:
-                ras.add(registro['ra'])
-        return sorted(ras)
+    def _preparar_dados(self, avisar):
+        """
+        Tudo que é pesado antes do primeiro desenho: catálogo, grafo, índices, layout e projeção.
+        Roda na thread de carga, então NÃO pode mexer em widget nenhum: só chama avisar(etapa, detalhe)
+        e retorna um dicionário com os resultados (aplicado depois por _aplicar_dados, na thread da Tk)
+        """
+        dados = {}
+        tempos = {}
+
+        def etapa(chave):
+            avisar(chave)
+            tempos[chave] = time.perf_counter()
+
+        def fim(chave):
+            inicio = tempos[chave]
+            tempos[chave] = time.perf_counter() - inicio
+            instrumentacao.registrar_trecho(f"gui.carga.{chave}", inicio, tempos[chave])
+            avisar(chave, tempos[chave])
+
+        etapa("catalogo")
+        catalogo = self.catalogo
+        if catalogo is None:
+            # Em blocos pra dar pra mostrar as linhas lidas e cancelar no meio do CSV
+            catalogo = cache.carregar_catalogo(
+                self.caminho_xml, self.caminho_csv, streaming=True,
+                ao_progresso=lambda linhas: avisar("catalogo", f"{linhas} linhas")
+            )
+        dados["catalogo"] = catalogo
+        fim("catalogo")
+
+        etapa("ras")
+        dados["ra_sequencia"] = catalogo.ras_ordenados()
+        fim("ras")
+
+        etapa("grafo")
+        print("GUI: Gerando grafo do catálogo...")
+        grafo = viz.criar_grafo_do_catalogo(catalogo)
+        dados["grafo_curso"] = grafo
+        fim("grafo")
+
+        #pré-calcular caminhos mais longos, fontes e sumidouros
+        etapa("caminhos")
+        print("GUI: Pré-calculando caminhos mais longos...")
+        dados["indice_caminhos"] = IndiceCaminhos(grafo)
+        avisar("caminhos")  # confere o Cancelar entre os dois índices
+        # Fecho transitivo: o que cada disciplina libera / o que bloqueia ela
+        dados["indice_alcance"] = IndiceAlcance(grafo)
+        # Nós "fonte" (início do curso, sem pré-requisitos)
+        dados["sources"] = [n for n in grafo.nodes() if grafo.in_degree(n) == 0]
+        # Nós "sumidouro" (fim de trilha, sem sucessores)
+        dados["sinks"] = [n for n in grafo.nodes() if grafo.out_degree(n) == 0]
+        fim("caminhos")
+
+        # Grade espacial com as caixas dos nós pro hover. O layout só depende do grafo,
+        # então ela é montada uma vez aqui e não quando o grafo é redesenhado
+        etapa("layout")
+        dados["layout"] = viz.calcular_layout(grafo)
+        avisar("layout")
+        dados["indice_espacial"] = viz.IndiceEspacial(dados["layout"])
+        fim("layout")
+
+        # Projeção de conclusão da turma inteira (mínimo de semestres que faltam pra cada aluno)
+        etapa("projecao")
+        dados["projecao"] = ProjecaoConclusao(catalogo, grafo, dados["ra_sequencia"],
+                                              indice_caminhos=dados["indice_caminhos"])
+        fim("projecao")
+
+        dados["tempos"] = tempos
+        return dados
+
+    def _aplicar_dados(self, dados):
+        #Copia os resultados de _preparar_dados pros atributos da janela (thread da Tk)
+        self.catalogo = dados["catalogo"]
+        self.ra_sequencia = dados["ra_sequencia"]
+        self.grafo_curso = dados["grafo_curso"]
+        self.indice_caminhos = dados["indice_caminhos"]
+        self.indice_alcance = dados["indice_alcance"]
+        self.sources = dados["sources"]
+        self.sinks = dados["sinks"]
+        self.layout = dados["layout"]
+        self.indice_espacial = dados["indice_espacial"]
+        self.projecao = dados["projecao"]
+        self.tempos_carga = dados["tempos"]
+
+    def _iniciar_carga(self):
+        """
+        Mostra a tela de carregamento (barra de progresso, etapa atual, tempo de cada etapa e Cancelar)
+        e dispara a thread de carga. A thread só conversa com a janela pela fila_carga
+        """
+        self.carga_frame = ttk.Frame(self, padding=40)
+        self.carga_frame.place(relx=0.5, rely=0.4, anchor="center")
+
+        ttk.Label(self.carga_frame, text="Carregando...", font=("Arial", 16, "bold")).pack(anchor="w")
+        ttk.Label(self.carga_frame, text=f"{self.nome_arquivo_xml}", foreground="darkblue",
+                  style='Italic.TLabel').pack(anchor="w", pady=(0, 10))
+
+        self.barra_carga = ttk.Progressbar(self.carga_frame, length=400, mode="determinate",
+                                           maximum=len(ETAPAS_CARGA))
+        self.barra_carga.pack(fill="x")
+        self.lbl_etapa_carga = ttk.Label(self.carga_frame, text="")
+        self.lbl_etapa_carga.pack(anchor="w", pady=(5, 10))
+
+        # Uma linha por etapa, preenchida com o tempo quando ela termina
+        self.lbls_tempos_carga = {}
+        for chave, texto in ETAPAS_CARGA:
+            lbl = ttk.Label(self.carga_frame, text=f"  {texto}", foreground="#888888")
+            lbl.pack(anchor="w")
+            self.lbls_tempos_carga[chave] = lbl
+
+        self.btn_cancelar_carga = ttk.Button(self.carga_frame, text="Cancelar", command=self.on_cancelar_carga)
+        self.btn_cancelar_carga.pack(anchor="e", pady=(15, 0))
+        # Fechar a janela durante a carga também cancela
+        self.protocol("WM_DELETE_WINDOW", self.on_cancelar_carga)
+
+        self.inicio_carga = time.perf_counter()
+        thread = threading.Thread(target=self._carregar_em_segundo_plano, daemon=True)
+        thread.start()
+        self.after(INTERVALO_CARGA_MS, self._verificar_carga)
+
+    def _carregar_em_segundo_plano(self):
+        #Corpo da thread de carga: nada de Tk aqui, tudo vai pela fila
+        def avisar(etapa, detalhe=None):
+            if self.cancelar_carga.is_set():
+                raise CargaCancelada()
+            self.fila_carga.put(("etapa", etapa, detalhe))
+
+        try:
+            dados = self._preparar_dados(avisar)
+        except CargaCancelada:
+            self.fila_carga.put(("cancelado", None, None))
+        except Exception as e:
+            self.fila_carga.put(("erro", None, f"{type(e).__name__}: {e}"))
+        else:
+            self.fila_carga.put(("fim", None, dados))
+
+    def _verificar_carga(self):
+        """Lê as mensagens da thread de carga e atualiza a tela (roda de INTERVALO_CARGA_MS em INTERVALO_CARGA_MS)"""
+        textos = dict(ETAPAS_CARGA)
+        ordem = [chave for chave, _ in ETAPAS_CARGA]
+        while True:
+            try:
+                tipo, etapa, detalhe = self.fila_carga.get_nowait()
+            except queue.Empty:
+                break
+
+            if tipo == "etapa":
+                if isinstance(detalhe, float):
+                    # Etapa terminou: detalhe é o tempo dela
+                    self.barra_carga["value"] = ordem.index(etapa) + 1
+                    self.lbls_tempos_carga[etapa].configure(text=f"✓ {textos[etapa]}: {detalhe:.2f}s",
+                                                            foreground="black")
+                else:
+                    texto = textos[etapa] + (f" ({detalhe})" if detalhe else "") + "..."
+                    self.lbl_etapa_carga.configure(text=texto)
+            elif tipo == "fim":
+                self._aplicar_dados(detalhe)
+                print("\n--- Resumo da Carga ---")
+                print(self.catalogo)  # Mostra o __repr__ do catálogo
+                print(f"Pronto em {time.perf_counter() - self.inicio_carga:.2f}s")
+                print("-------------------------")
+                self.carga_frame.destroy()
+                self.carga_frame = None
+                self.protocol("WM_DELETE_WINDOW", self.on_fechar)
+                self.create_widgets()
+                return
+            elif tipo == "cancelado":
+                print("GUI: Carga cancelada.")
+                self.destroy()
+                return
+            elif tipo == "erro":
+                print(f"GUI: Erro na carga: {detalhe}")
+                messagebox.showerror("Erro ao carregar", detalhe, parent=self)
+                self.destroy()
+                return
+
+        self.after(INTERVALO_CARGA_MS, self._verificar_carga)
+
+    def on_cancelar_carga(self):
+        """Pede pra thread de carga parar (ela para no próximo bloco do CSV ou na próxima etapa)"""
+        self.cancelar_carga.set()
+        self.btn_cancelar_carga.configure(state="disabled")
+        self.lbl_etapa_carga.configure(text="Cancelando...")
+
+    def on_fechar(self):
+        """Fechar a janela depois da carga: para os mapas de calor que ainda estão chegando e sai"""
+        self.cancelar_carga.set()
+        if self.lote_mapas_agendado is not None:
+            self.after_cancel(self.lote_mapas_agendado)
+            self.lote_mapas_agendado = None
+        self.destroy()
 
     def create_widgets(self):
         # Criar frame principal
@@ -75,25 +331,19 @@ class App(tk.Tk):
         ttk.Label(self.sidebar_frame, text=f"Currículo:", font=("Arial", 11, "bold")).pack(pady=(10, 0), anchor="w")
         ttk.Label(self.sidebar_frame, text=f"{self.nome_arquivo_xml}", foreground="darkblue", style='Italic.TLabel').pack(anchor="w")
 
-        # Estatísticas
-        print("GUI: Gerando grafo do catálogo...")
-        self.grafo_curso = viz.criar_grafo_do_catalogo(self.catalogo)
-
-        #pré-calcular grafo ponderado, fontes e sumidouros
-        print("GUI: Pré-calculando grafo ponderado para caminhos longos...")
-        self.grafo_ponderado = self.grafo_curso.copy()
-        for u, v in self.grafo_ponderado.edges():
-            self.grafo_ponderado[u][v]['weight'] = -1
-        
-        # Nós "fonte" (início do curso, sem pré-requisitos)
-        self.sources = [n for n in self.grafo_curso.nodes() if self.grafo_curso.in_degree(n) == 0]
-        # Nós "sumidouro" (fim de trilha, sem sucessores)
-        self.sinks = [n for n in self.grafo_curso.nodes() if self.grafo_curso.out_degree(n) == 0]
-        
+        # Estatísticas (o grafo, os índices e a projeção já vieram prontos de _preparar_dados)
         ttk.Label(self.sidebar_frame, text="Estatísticas:", font=("Arial", 11, "bold")).pack(pady=(20, 0), anchor="w")
         ttk.Label(self.sidebar_frame, text=f"Disciplinas: {len(self.grafo_curso.nodes())}").pack(anchor="w")
         ttk.Label(self.sidebar_frame, text=f"Alunos: {self.catalogo.total_alunos}").pack(anchor="w")
 
+        # Projeção de conclusão da turma inteira (mínimo de semestres que faltam pra cada aluno)
+        resumo = self.projecao.resumo()
+        if resumo['mediana_restantes'] is not None:
+            ttk.Label(self.sidebar_frame, text=f"Semestres restantes (mediana): {resumo['mediana_restantes']:.0f}").pack(anchor="w")
+        if resumo['limite_semestres'] is not None:
+            ttk.Label(self.sidebar_frame, text=f"Em risco de passar do prazo ({resumo['limite_semestres']} sem.): {resumo['em_risco']}",
+                      style='Wrappable.TLabel').pack(anchor="w")
+
         # Controle de ordenação do mapa de calor
         ttk.Separator(self.sidebar_frame, orient="horizontal").pack(fill="x", pady=10)
         
@@ -102,11 +352,21 @@ class App(tk.Tk):
         
         self.ordem_var = tk.StringVar(value=self.ordem_heatmap)
         ordem_combo = ttk.Combobox(self.sidebar_frame, textvariable=self.ordem_var,
-                                  values=['decrescente', 'crescente', 'ra'],
+                                  values=list(viz.ORDENS_MAPA),
                                   state='readonly', width=15)
         ordem_combo.pack(anchor="w", pady=(5, 15))
         ordem_combo.bind('<<ComboboxSelected>>', self.on_ordem_change)
 
+        # Selo com quantos alunos refizeram cada disciplina
+        self.retencao_var = tk.BooleanVar(value=self.mostrar_retencao)
+        ttk.Checkbutton(self.sidebar_frame, text="Mostrar retenção (↻)", variable=self.retencao_var,
+                        command=self.on_retencao_change).pack(anchor="w", pady=(0, 2))
+
+        # Selo com quantos alunos podem cursar cada disciplina e ainda não cursaram
+        self.elegiveis_var = tk.BooleanVar(value=self.mostrar_elegiveis)
+        ttk.Checkbutton(self.sidebar_frame, text="Mostrar elegíveis (✓)", variable=self.elegiveis_var,
+                        command=self.on_elegiveis_change).pack(anchor="w", pady=(0, 10))
+
         ttk.Separator(self.sidebar_frame, orient="horizontal").pack(fill="x", pady=10)
 
         # Info das disciplinas
@@ -120,6 +380,18 @@ class App(tk.Tk):
         
         self.lbl_creditos_disciplina = ttk.Label(self.sidebar_frame, text="Créditos: N/A")
         self.lbl_creditos_disciplina.pack(anchor="w")
+
+        self.lbl_alunos_disciplina = ttk.Label(self.sidebar_frame, text="Cursaram: N/A")
+        self.lbl_alunos_disciplina.pack(anchor="w")
+
+        self.lbl_media_disciplina = ttk.Label(self.sidebar_frame, text="Média: N/A")
+        self.lbl_media_disciplina.pack(anchor="w")
+
+        self.lbl_bloqueios_disciplina = ttk.Label(self.sidebar_frame, text="Pré-requisitos (todos): N/A")
+        self.lbl_bloqueios_disciplina.pack(anchor="w")
+
+        self.lbl_libera_disciplina = ttk.Label(self.sidebar_frame, text="Libera: N/A")
+        self.lbl_libera_disciplina.pack(anchor="w")
         
         ttk.Separator(self.sidebar_frame, orient="horizontal").pack(fill="x", pady=20)
         
@@ -137,8 +409,48 @@ class App(tk.Tk):
         nova_ordem = self.ordem_var.get()
         if nova_ordem != self.ordem_heatmap:
             self.ordem_heatmap = nova_ordem
-            self.regenerar_grafo()
+            self.reordenar_mapas()
 
+    @instrumentacao.medido("gui.reordenar_mapas")
+    def reordenar_mapas(self):
+        """
+        Troca a ordem dos mapas de calor na figura que já está aberta: só as cores dos quadradinhos
+        mudam, o canvas, a barra de ferramentas e o zoom continuam como estavam
+        """
+        print(f"GUI: Reordenando mapas de calor: {self.ordem_heatmap}")
+        for mapa in self.grafo_mapas.values():
+            mapa.reordenar(self.ordem_heatmap)
+        self.canvas.draw_idle()
+
+    def on_retencao_change(self):
+        """Liga/desliga o selo de retenção nos nós"""
+        self.mostrar_retencao = self.retencao_var.get()
+        self.alternar_selos("retencao", self.mostrar_retencao)
+
+    def on_elegiveis_change(self):
+        """Liga/desliga o selo de elegíveis que ainda não cursaram"""
+        self.mostrar_elegiveis = self.elegiveis_var.get()
+        self.alternar_selos("elegiveis", self.mostrar_elegiveis)
+
+    @instrumentacao.medido("gui.alternar_selos")
+    def alternar_selos(self, tipo, ligado):
+        """
+        Mostra/esconde os selos de um tipo na figura que já está aberta (o canvas, a barra de ferramentas
+        e o zoom continuam como estavam). Na primeira vez que o selo é ligado eles são criados
+        (viz.desenhar_selos); depois é só set_visible
+        """
+        print(f"GUI: Selos de {tipo} {'ligados' if ligado else 'desligados'}")
+        ax = self.figura_atual.axes[0]
+        if self.selos[tipo] is None:
+            if not ligado:
+                return
+            contagens = viz.contagens_selo(tipo, self.catalogo, self.grafo_curso, self.ra_sequencia)
+            self.selos[tipo] = viz.desenhar_selos(ax, self.layout, tipo, contagens)
+        else:
+            ax.recorte_visivel.ligar(self.selos[tipo], ligado)
+        self.canvas.draw_idle()
+
+    @instrumentacao.medido("gui.regenerar_grafo")
     def regenerar_grafo(self):
         """Regera o grafo com os parâmetros atuais de ordenação"""
         print(f"GUI: Regenerando grafo com ordem: {self.ordem_heatmap}")
@@ -147,13 +459,23 @@ class App(tk.Tk):
         if not hasattr(self, 'graph_frame') or self.graph_frame is None:
             print("Erro: graph_frame não está definido")
             return
+
+        # Se a figura anterior ainda estava recebendo mapas, para
+        if self.lote_mapas_agendado is not None:
+            self.after_cancel(self.lote_mapas_agendado)
+            self.lote_mapas_agendado = None
             
-        # Gerar nova figura com os parâmetros de ordenação
+        # Gerar nova figura com os parâmetros de ordenação. Só o esqueleto (colunas, caixas, setas)
+        # sai desenhado, os mapas de calor chegam depois em lotes (_desenhar_lote_mapas),
+        # então a janela aparece no mesmo tempo qualquer que seja o tamanho da turma
         self.figura_atual = viz.desenhar_grafo_em_camadas(
             self.grafo_curso, 
             self.catalogo, 
             self.ordem_heatmap,
-            self.ra_sequencia
+            self.ra_sequencia,
+            self.mostrar_retencao,
+            self.mostrar_elegiveis,
+            progressivo=True
         )
 
         # Destruir canvas existente se houver
@@ -162,9 +484,8 @@ class App(tk.Tk):
             if hasattr(self, 'toolbar'):
                 self.toolbar.destroy()
 
-        # Criar novo canvas
-        self.canvas = FigureCanvasTkAgg(self.figura_atual, master=self.graph_frame)
-        self.canvas.draw()
+        # Criar novo canvas (o primeiro desenho é lá embaixo, depois de ligar o draw_event)
+        self.canvas = CanvasMedido(self.figura_atual, master=self.graph_frame)
         
         self.toolbar = NavigationToolbar2Tk(self.canvas, self.graph_frame)
         self.toolbar.update()
@@ -174,24 +495,110 @@ class App(tk.Tk):
 
         # Recoletar referências dos elementos gráficos
         ax = self.figura_atual.axes[0]
-        self.grafo_textos = {t.get_text(): t for t in ax.texts}
+        # Só os textos dos nós (o gid é o código da disciplina), sem os títulos "Sem X" e os selos
+        self.grafo_textos = {t.get_gid(): t for t in ax.texts if t.get_gid() in self.grafo_curso}
         
-        self.grafo_setas = {}
-        for artista in ax.get_children():
-            if isinstance(artista, FancyArrowPatch):
-                gid = artista.get_gid()
-                if gid:
-                    self.grafo_setas[gid] = artista
+        # Todas as setas são uma coleção só (viz.ColecaoSetas), com o índice de cada aresta
+        self.grafo_setas = next((c for c in ax.collections if c.get_gid() == "arestas"), None)
+        if self.grafo_setas is not None:
+            # Cada desenho completo guarda a figura antes/depois das setas, pro fundo apagado (_ao_desenhar)
+            self.grafo_setas.guardar_fundos = True
         
         self.grafo_caixas = {}
         for artista in ax.get_children():
             if isinstance(artista, FancyBboxPatch) and artista.get_gid() is not None:
                 self.grafo_caixas[artista.get_gid()] = artista
 
-        # Reconectar eventos
+        # Mapas de calor (um viz.MapaCalor por nó, que já guarda as notas),
+        # pra trocar a ordenação sem redesenhar o grafo. Vão entrando aqui conforme chegam
+        self.grafo_mapas = {}
+        self.mapas_pendentes = ax.mapas_pendentes
+        # Selos de cada tipo ({no: selo}), pra ligar/desligar sem regerar a figura.
+        # None = ainda não criados (o selo estava desligado quando a figura foi gerada)
+        self.selos = {
+            "retencao": {} if self.mostrar_retencao else None,
+            "elegiveis": {} if self.mostrar_elegiveis else None,
+        }
+
+        # Destaque do hover em camada separada, desenhado com blit
+        self.estado_hover = None
+        self.fundo = None
+        self.fundo_apagado = None
+        self._criar_camada_destaque(ax)
+
+        # Reconectar eventos. O draw() já passa pelo _ao_desenhar, que guarda os fundos
+        self.canvas.mpl_connect('draw_event', self._ao_desenhar)
+        self.canvas.draw()
         self.canvas.mpl_connect('pick_event', self.on_pick)
         self.canvas.mpl_connect("motion_notify_event", self.on_hover)
 
+        if self.mapas_pendentes is not None:
+            self.lote_mapas_agendado = self.after_idle(self._desenhar_lote_mapas)
+
+    @instrumentacao.medido("gui.lote_mapas")
+    def _desenhar_lote_mapas(self):
+        """
+        Tira mapas de calor do gerador até gastar ORCAMENTO_LOTE_MAPAS_MS e pinta só eles por cima
+        da imagem que já está na tela (blit), sem redesenhar o grafo inteiro. Depois agenda o próximo lote
+        """
+        self.lote_mapas_agendado = None
+        ax = self.figura_atual.axes[0]
+        limite = time.perf_counter() + ORCAMENTO_LOTE_MAPAS_MS / 1000
+        novos = []
+        terminou = False
+        while time.perf_counter() < limite:
+            # Cancelar/fechar no meio dos mapas: para o gerador já no próximo nó
+            if self.cancelar_carga.is_set():
+                self.mapas_pendentes.close()
+                self.mapas_pendentes = None
+                print("GUI: Mapas de calor cancelados.")
+                return
+            try:
+                node, artistas = next(self.mapas_pendentes)
+            except StopIteration:
+                terminou = True
+                break
+            for artista in artistas:
+                gid = artista.get_gid() or ""
+                tipo = gid.split(":")[0]
+                if tipo == "mapa":
+                    # O usuário pode ter trocado a ordem enquanto os mapas chegavam
+                    if artista.ordem != self.ordem_heatmap:
+                        artista.reordenar(self.ordem_heatmap)
+                    self.grafo_mapas[node] = artista
+                elif tipo in viz.SELOS:
+                    # O usuário pode ter desligado o selo enquanto os mapas chegavam
+                    self.selos[tipo][node] = artista
+                    if not (self.mostrar_retencao if tipo == "retencao" else self.mostrar_elegiveis):
+                        ax.recorte_visivel.ligar({node: artista}, False)
+            novos.extend(artistas)
+
+        # Pinta os novos em cima dos dois fundos sem destaque (o apagado primeiro, então no fim
+        # a imagem é a do fundo normal), guarda os fundos e recoloca o destaque do hover
+        if self.fundo is not None and novos:
+            if self.fundo_apagado is not None:
+                self.canvas.restore_region(self.fundo_apagado)
+                for artista in sorted(novos, key=lambda a: a.get_zorder()):
+                    if artista.get_visible():
+                        ax.draw_artist(artista)
+                self.fundo_apagado = self.canvas.copy_from_bbox(self.figura_atual.bbox)
+            self.canvas.restore_region(self.fundo)
+            for artista in sorted(novos, key=lambda a: a.get_zorder()):
+                if artista.get_visible():
+                    ax.draw_artist(artista)
+            self.fundo = self.canvas.copy_from_bbox(self.figura_atual.bbox)
+            self.area_destaque = None
+            if self.estado_hover is not None:
+                self._desenhar_destaque(self.figura_atual.bbox)
+            else:
+                self.canvas.blit(self.figura_atual.bbox)
+
+        if terminou:
+            self.mapas_pendentes = None
+            print(f"GUI: {len(self.grafo_mapas)} mapas de calor prontos")
+        else:
+            self.lote_mapas_agendado = self.after(1, self._desenhar_lote_mapas)
+
     def create_heatmap_legend(self):
         ttk.Label(self.sidebar_frame, text="Mapa de Calor:", font=("Arial", 11, "bold")).pack(pady=(0, 5), anchor="w")
         
@@ -207,7 +614,8 @@ class App(tk.Tk):
 
         # Legenda de 0 a 10
         notas_legenda = np.linspace(0, 10, 6)
-        cores_legenda = [viz.map_nota_para_cor(n) for n in notas_legenda]
+        # Mesma tabela de cores dos mapas de calor do grafo
+        cores_legenda = viz.cores_das_notas(notas_legenda)
 
         for i, (nota, cor) in enumerate(zip(notas_legenda, cores_legenda)):
             x_pos = 0.05 + (i * 0.16)
@@ -245,167 +653,227 @@ class App(tk.Tk):
     def encontrar_caminho_mais_longo(self, no_inicial):
         """
         Encontra o caminho mais longo que passa pelo nó, tanto para frente (dependências)
-        quanto para trás (pré-requisitos)
+        quanto para trás (pré-requisitos). Os caminhos já estão pré-calculados no
+        IndiceCaminhos, aqui só anda por eles (custo = tamanho do caminho)
         """
-        caminhos_encontrados = set([no_inicial])
-    
-    # 1. Encontrar o caminho mais longo de PRÉ-REQUISITOS (para trás)
-        try:
-            # Encontrar todos os antecessores no caminho mais longo
-            antecessores = list(nx.ancestors(self.grafo_curso, no_inicial))
-            if antecessores:
-                # Encontrar o nó "raiz" mais distante (sem pré-requisitos)
-                nos_raiz = [node for node in antecessores if self.grafo_curso.in_degree(node) == 0]
-                if not nos_raiz:
-                    # Se não há raiz, pegar o antecessor mais distante
-                    nos_raiz = [max(antecessores, key=lambda x: len(list(nx.ancestors(self.grafo_curso, x))))]
-            
-                # Para cada raiz, encontrar o caminho mais longo até o nó inicial
-                for raiz in nos_raiz:
-                    try:
-                        # Encontrar TODOS os caminhos simples da raiz até o nó
-                        todos_caminhos = list(nx.all_simple_paths(self.grafo_curso, raiz, no_inicial))
-                        if todos_caminhos:
-                            caminho_mais_longo = max(todos_caminhos, key=len)
-                            caminhos_encontrados.update(caminho_mais_longo)
-                    except nx.NetworkXNoPath:
-                        continue
-        except:
-            pass
-    
-        # 2. Encontrar o caminho mais longo de DEPENDÊNCIAS (para frente)
-        try:
-            # Encontrar todos os sucessores no caminho mais longo
-            sucessores = list(nx.descendants(self.grafo_curso, no_inicial))
-            if sucessores:
-                # Encontrar os nós "folha" mais distantes (sem dependências)
-                nos_folha = [node for node in sucessores if self.grafo_curso.out_degree(node) == 0]
-                if not nos_folha:
-                    # Se não há folha, pegar o sucessor mais distante
-                    nos_folha = [max(sucessores, key=lambda x: len(list(nx.descendants(self.grafo_curso, x))))]
-            
-                # Para cada folha, encontrar o caminho mais longo do nó inicial até ela
-                for folha in nos_folha:
-                    try:
-                        # Encontrar TODOS os caminhos simples do nó até a folha
-                        todos_caminhos = list(nx.all_simple_paths(self.grafo_curso, no_inicial, folha))
-                        if todos_caminhos:
-                            caminho_mais_longo = max(todos_caminhos, key=len)
-                            caminhos_encontrados.update(caminho_mais_longo)
-                    except nx.NetworkXNoPath:
-                        continue
-        except:
-            pass
-    
-        return caminhos_encontrados
-        
+        instrumentacao.contar("gui.consultas_caminho")
+        with instrumentacao.trecho("gui.caminho_mais_longo", no=no_inicial):
+            caminho = self.indice_caminhos.caminho_mais_longo(no_inicial)
+        return set(caminho) if caminho else set([no_inicial])
 
     def on_hover(self, event):
         """
         Detecta quando o mouse passa sobre qualquer parte do nó (caixa ou texto)
-        e destaca todo o caminho conectado
+        e destaca todo o caminho conectado.
+        Só guarda a última posição do mouse: os eventos que chegam no mesmo quadro (~16 ms)
+        são juntados num só processamento, em vez de um redesenho por movimento
         """
         if event.inaxes is None:
+            self.posicao_hover = None
+        else:
+            self.posicao_hover = (event.xdata, event.ydata)
+        if self.hover_agendado is None:
+            self.hover_agendado = self.after(INTERVALO_HOVER_MS, self._processar_hover)
+
+    @instrumentacao.medido("gui.hover")
+    def _processar_hover(self):
+        self.hover_agendado = None
+        if self.posicao_hover is None:
             self.resetar_destaque()
             return
 
-        ax = event.inaxes
-
-        # Verificar se o mouse está sobre alguma caixa de nó
-        hovered_label = None
-        
-        # Primeiro: verificar caixas
-        for gid, caixa in self.grafo_caixas.items():
-            contains, _ = caixa.contains(event)
-            if contains:
-                hovered_label = gid
-                break
-        
-        # se nao , tem que verificar texto
-        if hovered_label is None:
-            min_dist = float("inf")
-            for label, text_obj in self.grafo_textos.items():
-                x, y = text_obj.get_position()
-                dist = np.hypot(event.xdata - x, event.ydata - y)
-                if dist < 0.5 and dist < min_dist:
-                    hovered_label = label
-                    min_dist = dist
+        # Verificar se o mouse está sobre alguma caixa de nó (o texto fica dentro da caixa):
+        # uma consulta na grade espacial em vez de testar todas as caixas
+        hovered_label = self.indice_espacial.no_em(*self.posicao_hover)
+        instrumentacao.contar("gui.consultas_hover")
 
         if hovered_label:
             if self.estado_hover == hovered_label:
                 return
             self.estado_hover = hovered_label
-
-            # Encontrar TODOS os nós conectados
-            # connected_nodes = self.encontrar_caminhos_completos(hovered_label)
-            connected_nodes = self.encontrar_caminho_mais_longo(hovered_label)
-
-            # Destacar textos
-            for label, text_obj in self.grafo_textos.items():
-                if label == hovered_label:
-                    text_obj.set_color("blue")
-                    text_obj.set_fontsize(10)
-                elif label in connected_nodes:
-                    text_obj.set_color("blue")
-                else:
-                    text_obj.set_color("black")
-                    text_obj.set_fontweight("normal")
-                    text_obj.set_fontsize(9)
-
-            # Destacar caixas
-            for gid, caixa in self.grafo_caixas.items():
-                if gid == hovered_label:
-                    caixa.set_edgecolor("blue")
-                    caixa.set_linewidth(2.5)
-                elif gid in connected_nodes:
-                    caixa.set_edgecolor("blue")
-                    caixa.set_linewidth(2.0)
-                else:
-                    caixa.set_edgecolor("black")
-                    caixa.set_linewidth(1.3)
-
-            # Destacar setas
-            for seta_id, seta in self.grafo_setas.items():
-                if "->" in seta_id:
-                    start, end = seta_id.split("->")
-                    # Destacar se ambos os nós da seta estão no caminho
-                    if start in connected_nodes and end in connected_nodes:
-                        seta.set_color("blue")
-                        seta.set_linewidth(3.0)
-                        seta.set_alpha(1.0)
-                    else:
-                        seta.set_color("#262626")
-                        seta.set_linewidth(1.8)
-                        seta.set_alpha(0.3)
-
-            self.canvas.draw_idle()
-
+            self._desenhar_destaque()
         else:
             self.resetar_destaque()
 
+    def _criar_camada_destaque(self, ax):
+        """
+        Cria (escondidos) os artistas do destaque: um contorno azul e um texto azul por nó
+        e uma cópia azul da coleção de setas. São 'animated', então o canvas.draw() normal não desenha eles;
+        no hover só os do caminho são desenhados por cima do fundo salvo (blit).
+        O texto azul tem fundo branco, então cobre o código preto da caixa (que continua no fundo salvo)
+        """
+        self.destaque_caixas = {}
+        self.destaque_textos = {}
+        for node, caixa in self.grafo_caixas.items():
+            contorno = FancyBboxPatch(
+                (caixa.get_x(), caixa.get_y()), caixa.get_width(), caixa.get_height(),
+                boxstyle="round,pad=0.1", facecolor='none', edgecolor='blue',
+                linewidth=2.0, zorder=7, animated=True
+            )
+            ax.add_patch(contorno)
+            self.destaque_caixas[node] = contorno
+        for node, texto in self.grafo_textos.items():
+            x, y = texto.get_position()
+            self.destaque_textos[node] = ax.text(
+                x, y, node, ha='center', va='center', fontweight='bold', fontsize=8,
+                color='blue', zorder=8, animated=True,
+                bbox=dict(boxstyle="square,pad=0.15", facecolor='white', edgecolor='none')
+            )
+        # Cópia azul da coleção de setas: no hover ela só desenha as arestas do caminho (selecionar)
+        self.destaque_setas = None
+        if self.grafo_setas is not None:
+            self.destaque_setas = viz.ColecaoSetas(
+                self.grafo_setas.inicio, self.grafo_setas.fim, self.grafo_setas.arestas,
+                colors='blue', linewidths=3.0, zorder=6, animated=True
+            )
+            ax.add_collection(self.destaque_setas, autolim=False)
+
+    def _ao_desenhar(self, event):
+        # Depois de todo redesenho completo (abrir, zoom, pan, redimensionar) guarda o fundo sem destaque
+        # e o fundo apagado, e recoloca o destaque atual por cima
+        self.fundo = self.canvas.copy_from_bbox(self.figura_atual.bbox)
+        self._criar_fundo_apagado()
+        self.area_destaque = None
+        if self.estado_hover is not None:
+            self._desenhar_destaque(self.figura_atual.bbox)
+
+    @instrumentacao.medido("gui.fundo_apagado")
+    def _criar_fundo_apagado(self):
+        """
+        Fundo do destaque: o grafo com todas as setas em alpha 0.3 (as do caminho voltam em azul por cima).
+        Sai das imagens que a coleção de setas guardou antes/depois de se desenhar nesse mesmo redesenho
+        (viz.apagar_setas), então é feito uma vez por redesenho, sem outro figure.draw e fora do hover
+        """
+        self.fundo_apagado = None
+        self.area_setas = None
+        if self.grafo_setas is None or self.grafo_setas.fundos is None:
+            return
+        antes, depois = self.grafo_setas.fundos
+        self.grafo_setas.fundos = None
+        fundo_apagado = self.canvas.copy_from_bbox(self.figura_atual.bbox)
+        imagem = np.asarray(fundo_apagado)
+        caixa = viz.apagar_setas(antes, depois, imagem)
+        if caixa is None:
+            return
+        self.fundo_apagado = fundo_apagado
+        # caixa em linhas da imagem (y pra baixo) -> coordenadas da tela (y pra cima)
+        x0, y0, x1, y1 = caixa
+        altura = imagem.shape[0]
+        self.area_setas = Bbox([[x0, altura - y1], [x1, altura - y0]])
+
+    def _restaurar(self, fundo, area):
+        # Volta só o retângulo 'area' (coordenadas da tela) do fundo salvo.
+        # O restore_region com bbox conta o y de cima pra baixo, a partir do canto do fundo (xy=(0, 0))
+        altura = self.figura_atual.bbox.height
+        self.canvas.restore_region(
+            fundo, bbox=(math.floor(area.x0), math.floor(altura - area.y1),
+                         math.ceil(area.x1), math.ceil(altura - area.y0)),
+            xy=(0, 0)
+        )
+
+    def _area_do_destaque(self, setas, nos, textos, renderer):
+        """
+        Retângulo (coordenadas da tela) que o destaque acabou de ocupar: as setas do caminho,
+        as caixas dos nós (as do índice espacial, já com o pad do contorno, numa transformação só)
+        e os textos com o fundo branco deles, tudo com a folga de MARGEM_BLIT_PT
+        """
+        folga = renderer.points_to_pixels(MARGEM_BLIT_PT)
+        areas = []
+        if setas:
+            areas.append(self.destaque_setas.get_window_extent(renderer).padded(folga))
+        caixas = [self.indice_espacial.caixas[no] for no in nos if no in self.indice_espacial.caixas]
+        if caixas:
+            cantos = self.figura_atual.axes[0].transData.transform(np.reshape(caixas, (-1, 2)))
+            areas.append(Bbox([cantos.min(axis=0), cantos.max(axis=0)]).padded(folga))
+        for texto in textos:
+            # pad=0.15 do fundo branco do texto (em frações do tamanho da fonte)
+            areas.append(texto.get_window_extent(renderer).padded(
+                folga + renderer.points_to_pixels(0.15 * texto.get_fontsize())))
+        return Bbox.union(areas) if areas else None
+
+    @instrumentacao.medido("gui.hover.blit")
+    def _desenhar_destaque(self, area=None):
+        """
+        Desenha o destaque do nó do hover e manda pra tela só o que mudou: o destaque anterior,
+        o novo e, quando o destaque aparece, as setas que ficam apagadas (area_setas).
+        'area' = mais um retângulo pra atualizar (a figura toda depois de um redesenho)
+        """
+        if self.fundo is None:
+            return
+        connected_nodes = self.encontrar_caminho_mais_longo(self.estado_hover)
+        ax = self.figura_atual.axes[0]
+        renderer = self.canvas.get_renderer()
+
+        # Fora do destaque anterior a tela já é o fundo certo (as setas fora do caminho ficam apagadas)
+        mudou = [a for a in (self.area_destaque, area) if a is not None]
+        if self.area_destaque is None and self.area_setas is not None:
+            mudou.append(self.area_setas)
+        if mudou:
+            self._restaurar(self.fundo_apagado if self.fundo_apagado is not None else self.fundo,
+                            Bbox.union(mudou))
+
+        setas = False
+        textos = []
+        # Setas com os dois nós no caminho, pelo índice da aresta na coleção
+        if self.destaque_setas is not None:
+            indice = self.destaque_setas.indice
+            selecao = [
+                indice[(start, end)]
+                for start in connected_nodes
+                for end in self.grafo_curso.successors(start)
+                if end in connected_nodes and (start, end) in indice
+            ]
+            if selecao:
+                self.destaque_setas.selecionar(selecao)
+                ax.draw_artist(self.destaque_setas)
+                setas = True
+
+        # Caixas e textos (o nó do hover com contorno mais grosso e texto maior)
+        for node in connected_nodes:
+            principal = node == self.estado_hover
+            if node in self.destaque_caixas:
+                contorno = self.destaque_caixas[node]
+                contorno.set_linewidth(2.5 if principal else 2.0)
+                ax.draw_artist(contorno)
+            if node in self.destaque_textos:
+                texto = self.destaque_textos[node]
+                texto.set_fontsize(10 if principal else 8)
+                ax.draw_artist(texto)
+                textos.append(texto)
+
+        self.area_destaque = self._area_do_destaque(setas, connected_nodes, textos, renderer)
+        if self.area_destaque is not None:
+            mudou.append(self.area_destaque)
+        if mudou:
+            self.canvas.blit(Bbox.union(mudou))
+
     def resetar_destaque(self):
         if self.estado_hover is not None:
-            # Resetar textos
-            for text_obj in self.grafo_textos.values():
-                text_obj.set_color("black")
-                text_obj.set_fontweight("normal")
-                text_obj.set_fontsize(10)
-            
-            # Resetar caixas
-            for caixa in self.grafo_caixas.values():
-                caixa.set_edgecolor("black")
-                caixa.set_linewidth(1.3)
-            
-            # Resetar setas
-            for seta in self.grafo_setas.values():
-                seta.set_color("#262626")
-                seta.set_linewidth(1.8)
-                seta.set_alpha(1.0)
-            
-            self.canvas.draw_idle()
             self.estado_hover = None
+            # Só volta o fundo salvo (o grafo em si nunca foi alterado) onde estava o destaque e nas setas
+            mudou = [a for a in (self.area_destaque, self.area_setas) if a is not None]
+            self.area_destaque = None
+            if self.fundo is not None and mudou:
+                area = Bbox.union(mudou)
+                self._restaurar(self.fundo, area)
+                self.canvas.blit(area)
 
     def update_sidebar(self, disciplina: Disciplina):
         self.lbl_nome_disciplina.config(text=f"{disciplina.nome}")
         self.lbl_id_disciplina.config(text=f"ID: {disciplina.codigo}")
         self.lbl_creditos_disciplina.config(text=f"Créditos: {disciplina.creditos}")
+
+        # Estatísticas da última tentativa (lê só a coluna dessa disciplina na base de notas)
+        estatisticas = self.catalogo.estatisticas_disciplina(disciplina.codigo)
+        self.lbl_alunos_disciplina.config(
+            text=f"Cursaram: {estatisticas['alunos']} (aprovados: {estatisticas['aprovados']})")
+        if estatisticas['media'] is None:
+            self.lbl_media_disciplina.config(text="Média: N/A")
+        else:
+            self.lbl_media_disciplina.config(text=f"Média: {estatisticas['media']:.2f}")
+
+        # Alcance no grafo (diretos + indiretos), direto do índice de bitsets
+        self.lbl_bloqueios_disciplina.config(
+            text=f"Pré-requisitos (todos): {self.indice_alcance.num_ancestrais(disciplina.codigo)}")
+        self.lbl_libera_disciplina.config(
+            text=f"Libera: {self.indice_alcance.num_descendentes(disciplina.codigo)} disciplinas")
@@ -0,0 +1,190 @@
+# indices_grafo.py -> estruturas pré-calculadas sobre o grafo de pré-requisitos (viz.criar_grafo_do_catalogo)
+#
+# - IndiceCaminhos: caminho mais longo que entra e que sai de cada nó (programação dinâmica na ordem topológica)
+# - IndiceAlcance: fecho transitivo com um bitset (int do Python) por nó, pra ancestrais/descendentes em O(1)
+#
+# Tudo é calculado uma vez por grafo, as consultas do hover só andam pelo caminho já guardado.
+
+import numpy as np
+from collections import deque
+
+
+def ordem_topologica(grafo):
+    """
+    Ordem topológica do grafo (Kahn), desempatando pelo código da disciplina.
+    Se o XML tiver ciclo de pré-requisitos, os nós do ciclo vão pro final em ordem alfabética
+    e as arestas entre eles são ignoradas pelos índices (não trava, só não segue o ciclo).
+    """
+    grau = {n: grafo.in_degree(n) for n in grafo.nodes()}
+    fila = deque(sorted(n for n, g in grau.items() if g == 0))
+    ordem = []
+    while fila:
+        n = fila.popleft()
+        ordem.append(n)
+        for s in sorted(grafo.successors(n)):
+            grau[s] -= 1
+            if grau[s] == 0:
+                fila.append(s)
+    if len(ordem) < len(grau):
+        vistos = set(ordem)
+        ordem.extend(sorted(n for n in grau if n not in vistos))
+    return ordem
+
+
+class IndiceCaminhos:
+    """
+    Caminho mais longo (em número de arestas) que passa por cada nó.
+
+    - entrada[n]: tamanho do maior caminho que TERMINA em n (cadeia de pré-requisitos)
+    - saida[n]: tamanho do maior caminho que COMEÇA em n (cadeia de dependentes)
+    - anterior[n] / proximo[n]: o vizinho escolhido, pra remontar o caminho em O(tamanho do caminho)
+    """
+    def __init__(self, grafo):
+        self.ordem = ordem_topologica(grafo)
+        self.posicao = {n: i for i, n in enumerate(self.ordem)}
+        self.entrada = {}
+        self.anterior = {}
+        self.saida = {}
+        self.proximo = {}
+
+        # Para frente: entrada[n] = 1 + maior entrada entre os pré-requisitos
+        for n in self.ordem:
+            melhor, escolhido = 0, None
+            for p in sorted(grafo.predecessors(n)):
+                if self.posicao[p] < self.posicao[n] and self.entrada[p] + 1 > melhor:
+                    melhor, escolhido = self.entrada[p] + 1, p
+            self.entrada[n], self.anterior[n] = melhor, escolhido
+
+        # Para trás: saida[n] = 1 + maior saida entre os dependentes
+        for n in reversed(self.ordem):
+            melhor, escolhido = 0, None
+            for s in sorted(grafo.successors(n)):
+                if self.posicao[s] > self.posicao[n] and self.saida[s] + 1 > melhor:
+                    melhor, escolhido = self.saida[s] + 1, s
+            self.saida[n], self.proximo[n] = melhor, escolhido
+
+    def caminho_mais_longo(self, no):
+        #Lista de nós do maior caminho que passa por 'no', da raiz até a folha
+        if no not in self.entrada:
+            return []
+        antes = []
+        atual = self.anterior[no]
+        while atual is not None:
+            antes.append(atual)
+            atual = self.anterior[atual]
+        depois = []
+        atual = self.proximo[no]
+        while atual is not None:
+            depois.append(atual)
+            atual = self.proximo[atual]
+        return antes[::-1] + [no] + depois
+
+    def comprimento_passando_por(self, no):
+        #Número de arestas do maior caminho que passa pelo nó
+        return self.entrada[no] + self.saida[no]
+
+    def caminho_critico(self):
+        #Maior caminho do grafo inteiro (a cadeia de pré-requisitos mais comprida do curso)
+        if not self.ordem:
+            return []
+        inicio = max(self.ordem, key=lambda n: (self.entrada[n] + self.saida[n], -self.posicao[n]))
+        return self.caminho_mais_longo(inicio)
+
+
+class IndiceAlcance:
+    """
+    Fecho transitivo do grafo de pré-requisitos: cada nó tem um bitset (int do Python)
+    com todos os ancestrais (o que bloqueia ele) e outro com todos os descendentes (o que ele libera).
+    O bit i corresponde a self.nos[i], que segue a ordem topológica.
+
+    Responde "A é pré-requisito (direto ou indireto) de B?" com um AND e permite juntar
+    o alcance de vários nós com OR (ex.: tudo que fica travado pelas disciplinas reprovadas).
+    """
+    def __init__(self, grafo):
+        self.nos = ordem_topologica(grafo)
+        self.indice = {n: i for i, n in enumerate(self.nos)}
+        self.ancestrais_bits = {}
+        self.descendentes_bits = {}
+
+        for n in self.nos:
+            bits = 0
+            for p in grafo.predecessors(n):
+                if self.indice[p] < self.indice[n]:
+                    bits |= self.ancestrais_bits[p] | (1 << self.indice[p])
+            self.ancestrais_bits[n] = bits
+
+        for n in reversed(self.nos):
+            bits = 0
+            for s in grafo.successors(n):
+                if self.indice[s] > self.indice[n]:
+                    bits |= self.descendentes_bits[s] | (1 << self.indice[s])
+            self.descendentes_bits[n] = bits
+
+    def _nos_do_bitset(self, bits):
+        nos = set()
+        while bits:
+            menor = bits & -bits
+            nos.add(self.nos[menor.bit_length() - 1])
+            bits ^= menor
+        return nos
+
+    def _bitset_de(self, nos):
+        bits = 0
+        for n in nos:
+            if n in self.indice:
+                bits |= 1 << self.indice[n]
+        return bits
+
+    def ancestrais(self, no):
+        #Todas as disciplinas que precisam ser feitas antes de 'no' (o que bloqueia ele)
+        return self._nos_do_bitset(self.ancestrais_bits.get(no, 0))
+
+    def descendentes(self, no):
+        #Todas as disciplinas que dependem de 'no', direta ou indiretamente (o que ele libera)
+        return self._nos_do_bitset(self.descendentes_bits.get(no, 0))
+
+    def num_ancestrais(self, no):
+        return bin(self.ancestrais_bits.get(no, 0)).count("1")
+
+    def num_descendentes(self, no):
+        return bin(self.descendentes_bits.get(no, 0)).count("1")
+
+    def eh_pre_requisito(self, a, b):
+        #True se 'a' é pré-requisito (direto ou indireto) de 'b'
+        if a not in self.indice or b not in self.indice:
+            return False
+        return bool((self.ancestrais_bits[b] >> self.indice[a]) & 1)
+
+    def descendentes_de(self, nos, incluir_proprios=False):
+        #União de tudo que depende de qualquer um dos nós (ex.: tudo abaixo das reprovações de um aluno)
+        bits = 0
+        for n in nos:
+            bits |= self.descendentes_bits.get(n, 0)
+        if incluir_proprios:
+            bits |= self._bitset_de(nos)
+        return self._nos_do_bitset(bits)
+
+    def ancestrais_de(self, nos, incluir_proprios=False):
+        #União de tudo que bloqueia qualquer um dos nós
+        bits = 0
+        for n in nos:
+            bits |= self.ancestrais_bits.get(n, 0)
+        if incluir_proprios:
+            bits |= self._bitset_de(nos)
+        return self._nos_do_bitset(bits)
+
+    def matriz_ancestrais(self, ordem=None):
+        """
+        Matriz booleana numpy M com M[i, j] = True se ordem[i] é pré-requisito (transitivo) de ordem[j].
+        'ordem' é a lista de códigos das linhas/colunas (padrão: self.nos), útil pra relatórios em lote
+        """
+        ordem = self.nos if ordem is None else list(ordem)
+        posicoes = np.array([self.indice.get(n, -1) for n in ordem], dtype=np.int64)
+        tamanho = (len(self.nos) + 7) // 8
+        matriz = np.zeros((len(ordem), len(ordem)), dtype=bool)
+        for j, n in enumerate(ordem):
+            # Desempacota o bitset num vetor de bools (bit i -> self.nos[i]) e pega as linhas pedidas
+            bits = np.unpackbits(np.frombuffer(self.ancestrais_bits.get(n, 0).to_bytes(tamanho, "little"),
+                                               dtype=np.uint8), bitorder="little")
+            matriz[:, j] = np.where(posicoes >= 0, bits[np.maximum(posicoes, 0)], False)
+        return matriz
@@ -0,0 +1,261 @@
+# instrumentacao.py -> marca quanto tempo cada parte do programa levou (trechos) e conta coisas (contadores)
+#
+# - trecho("nome"): bloco 'with' que vira uma barra na linha do tempo (início + duração, por thread)
+# - medido("nome"): o mesmo como decorador de função
+# - contar("nome", n): soma n num contador (linhas lidas, artistas criados, consultas do hover...)
+# - exportar_chrome(caminho): grava tudo no formato "trace event" do Chrome, que abre em chrome://tracing
+#   ou em https://ui.perfetto.dev
+#
+# Desligado (o padrão) cada chamada só olha uma variável global e volta, então pode ficar nos caminhos quentes.
+# Pra ligar: ativar() no código ou a variável de ambiente TCC2025_TRACE=arquivo.json, que liga já no import
+# e grava o arquivo quando o programa termina. Cada processo filho do pool grava o seu, arquivo.<pid>.json,
+# no fim de cada tarefa (gravar_processo), o que funciona com fork, spawn e forkserver
+
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+
+_ativo = False
+_eventos = []
+_contadores = {}
+_nomes_threads = {}
+_trava = threading.Lock()
+_inicio_ns = time.perf_counter_ns()
+
+
+def ativo():
+    return _ativo
+
+
+def ativar():
+    #Liga a coleta (os tempos contam a partir daqui)
+    global _ativo, _inicio_ns
+    if not _ativo:
+        _inicio_ns = time.perf_counter_ns()
+        _ativo = True
+
+
+def desativar():
+    global _ativo
+    _ativo = False
+
+
+def limpar():
+    #Apaga os eventos e contadores coletados até agora
+    with _trava:
+        _eventos.clear()
+        _contadores.clear()
+
+
+def _agora_us():
+    return (time.perf_counter_ns() - _inicio_ns) / 1000
+
+
+def _thread():
+    # Guarda o nome da thread na primeira vez que ela aparece (vira o nome da linha no Chrome)
+    tid = threading.get_ident()
+    if tid not in _nomes_threads:
+        _nomes_threads[tid] = threading.current_thread().name
+    return tid
+
+
+class _Trecho:
+    __slots__ = ("nome", "args", "inicio")
+
+    def __init__(self, nome, args):
+        self.nome = nome
+        self.args = args
+
+    def __enter__(self):
+        self.inicio = _agora_us()
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        fim = _agora_us()
+        evento = {"name": self.nome, "ph": "X", "ts": self.inicio, "dur": fim - self.inicio,
+                  "pid": os.getpid(), "tid": _thread()}
+        if self.args:
+            evento["args"] = self.args
+        with _trava:
+            _eventos.append(evento)
+        return False
+
+
+class _TrechoDesligado:
+    # Um objeto só, reaproveitado por todos os trechos quando a coleta está desligada
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        return False
+
+
+_DESLIGADO = _TrechoDesligado()
+
+
+def trecho(nome, **args):
+    """
+    Bloco medido: with trecho("csv.bloco", linhas=50000): ...
+    Os args aparecem no detalhe do evento no Chrome
+    """
+    if not _ativo:
+        return _DESLIGADO
+    return _Trecho(nome, args)
+
+
+def medido(nome=None):
+    #Decorador: mede cada chamada da função como um trecho (nome padrão: modulo.funcao)
+    def decorador(funcao):
+        rotulo = nome or f"{funcao.__module__}.{funcao.__qualname__}"
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if not _ativo:
+                return funcao(*args, **kwargs)
+            with _Trecho(rotulo, None):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+def registrar_trecho(nome, inicio, duracao, **args):
+    """
+    Trecho medido por fora (inicio = time.perf_counter() do começo, duracao em segundos),
+    pra quando o começo e o fim não cabem num 'with' (ex.: as etapas da carga da GUI)
+    """
+    if not _ativo:
+        return
+    evento = {"name": nome, "ph": "X", "ts": (inicio * 1e9 - _inicio_ns) / 1000, "dur": duracao * 1e6,
+              "pid": os.getpid(), "tid": _thread()}
+    if args:
+        evento["args"] = args
+    with _trava:
+        _eventos.append(evento)
+
+
+def contar(nome, n=1):
+    #Soma n no contador; no Chrome cada contador vira um gráfico do total ao longo do tempo
+    if not _ativo:
+        return
+    evento = {"name": nome, "ph": "C", "ts": _agora_us(), "pid": os.getpid(), "tid": _thread()}
+    with _trava:
+        total = _contadores.get(nome, 0) + n
+        _contadores[nome] = total
+        evento["args"] = {nome: total}
+        _eventos.append(evento)
+
+
+def contadores():
+    with _trava:
+        return dict(_contadores)
+
+
+def resumo():
+    """
+    Totais por nome de trecho: {nome: {"chamadas", "total_ms", "media_ms", "max_ms"}}, do mais caro pro mais barato
+    """
+    totais = {}
+    with _trava:
+        eventos = list(_eventos)
+    for evento in eventos:
+        if evento["ph"] != "X":
+            continue
+        t = totais.setdefault(evento["name"], {"chamadas": 0, "total_ms": 0.0, "max_ms": 0.0})
+        t["chamadas"] += 1
+        t["total_ms"] += evento["dur"] / 1000
+        t["max_ms"] = max(t["max_ms"], evento["dur"] / 1000)
+    for t in totais.values():
+        t["media_ms"] = t["total_ms"] / t["chamadas"]
+    return dict(sorted(totais.items(), key=lambda item: -item[1]["total_ms"]))
+
+
+def imprimir_resumo():
+    print("\n--- Instrumentação ---")
+    print(f"{'trecho':<36} {'chamadas':>9} {'total ms':>10} {'média ms':>10} {'máx ms':>10}")
+    for nome, t in resumo().items():
+        print(f"{nome:<36} {t['chamadas']:>9} {t['total_ms']:>10.1f} {t['media_ms']:>10.3f} {t['max_ms']:>10.1f}")
+    for nome, total in sorted(contadores().items()):
+        print(f"{nome:<36} {total:>9}")
+    print("----------------------")
+
+
+def exportar_chrome(caminho):
+    """
+    Grava os eventos no formato JSON do Chrome (trace event format) e retorna quantos eventos foram gravados
+    """
+    import multiprocessing
+    with _trava:
+        eventos = list(_eventos)
+    pid = os.getpid()
+    # Nomes do processo e das threads, pra linha do tempo mostrar "MainThread", "Thread-1"...
+    metadados = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                  "args": {"name": f"{multiprocessing.current_process().name} ({pid})"}}]
+    metadados += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": nome}}
+                  for tid, nome in list(_nomes_threads.items())]
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": metadados + eventos, "displayTimeUnit": "ms"}, f)
+    return len(eventos)
+
+
+def _caminho_do_processo(caminho):
+    import multiprocessing
+    if multiprocessing.parent_process() is not None:
+        # Processo filho (pool do lote/relatórios/mosaico): um arquivo por processo, pra não sobrescrever
+        raiz, extensao = os.path.splitext(caminho)
+        caminho = f"{raiz}.{os.getpid()}{extensao or '.json'}"
+    return caminho
+
+
+def _exportar_ao_sair(caminho):
+    caminho = _caminho_do_processo(caminho)
+    if _eventos:
+        total = exportar_chrome(caminho)
+        print(f"Trace com {total} eventos gravado em {caminho}")
+
+
+def gravar_processo():
+    """
+    Chamada no fim de cada tarefa dos processos do pool (lote, relatórios, mosaico): regrava o arquivo
+    do processo com tudo que ele coletou até agora. Não depende do processo terminar "direito",
+    então o trace não se perde com spawn/forkserver nem quando o pool mata o processo no final.
+    Sem TCC2025_TRACE não faz nada
+    """
+    caminho = os.environ.get("TCC2025_TRACE")
+    if not _ativo or not caminho or not _eventos:
+        return
+    exportar_chrome(_caminho_do_processo(caminho))
+
+
+class _Processo:
+    # Só pra ter um objeto vivo pro register_after_fork (ele guarda referência fraca)
+    pass
+
+
+_processo = _Processo()
+
+
+def _depois_do_fork(caminho):
+    # Processo filho do multiprocessing (pool do lote/relatórios/mosaico): os eventos copiados são do pai,
+    # e o filho sai com os._exit (o atexit não roda), então a gravação vai pelos finalizadores do multiprocessing
+    from multiprocessing import util
+    limpar()
+    _nomes_threads.clear()
+    util.Finalize(_processo, _exportar_ao_sair, args=(caminho,), exitpriority=0)
+
+
+if os.environ.get("TCC2025_TRACE"):
+    from multiprocessing import util as _util_mp
+    ativar()
+    # Processos filhos (spawn/forkserver importam o módulo de novo) usam o mesmo zero do pai,
+    # assim as linhas do tempo de todos os arquivos batem quando abertas juntas
+    if os.environ.get("TCC2025_TRACE_INICIO"):
+        _inicio_ns = int(os.environ["TCC2025_TRACE_INICIO"])
+    else:
+        os.environ["TCC2025_TRACE_INICIO"] = str(_inicio_ns)
+    atexit.register(_exportar_ao_sair, os.environ["TCC2025_TRACE"])
+    _util_mp.register_after_fork(_processo, lambda _: _depois_do_fork(os.environ["TCC2025_TRACE"]))
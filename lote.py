@@ -0,0 +1,226 @@
+# lote.py -> gera as imagens do grafo sem abrir janela (sem tkinter, backend Agg)
+#
+# - Lê um manifesto JSON com os pares (XML do currículo, CSV da turma)
+# - Para cada par desenha o grafo em todas as ordens do mapa de calor e salva em PNG/SVG/PDF
+# - Os trabalhos são divididos entre processos (ProcessPoolExecutor)
+# - O XML/CSV de cada par é lido uma vez só, no processo principal, e vai pro cache do disco (cache.py);
+#   os processos abrem esse cache com memmap, então todos compartilham os mesmos registros
+#
+# Uso:
+#   python lote.py manifesto.json --saida renders --formatos png svg pdf --processos 4
+#
+# Manifesto (caminhos relativos são relativos à pasta do manifesto):
+#   [
+#     {"xml": "cursos/94.xml", "csv": "turmas/94_2020.csv", "nome": "curso94_2020"},
+#     {"xml": "cursos/42.xml", "csv": "turmas/42_2021.csv"}
+#   ]
+
+import matplotlib
+matplotlib.use("Agg")  # antes de importar o viz: roda sem display
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cache
+import viz
+import instrumentacao
+
+FORMATOS_SUPORTADOS = ("png", "svg", "pdf")
+
+# Catálogos já abertos neste processo (caminho do cache -> Catalogo), pra não reabrir a cada trabalho
+_catalogos_abertos = {}
+
+
+def ler_manifesto(caminho):
+    """
+    Lê o manifesto e retorna a lista de pares [{"xml", "csv", "nome"}] com os caminhos absolutos.
+    Sem "nome", usa o nome do CSV sem extensão.
+    """
+    with open(caminho, encoding="utf-8") as f:
+        entradas = json.load(f)
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    pares = []
+    for i, entrada in enumerate(entradas):
+        if "xml" not in entrada or "csv" not in entrada:
+            raise ValueError(f"Entrada {i} do manifesto sem 'xml' ou 'csv': {entrada}")
+        xml = os.path.join(pasta, entrada["xml"])
+        csv = os.path.join(pasta, entrada["csv"])
+        nome = entrada.get("nome") or os.path.splitext(os.path.basename(csv))[0]
+        pares.append({"xml": xml, "csv": csv, "nome": nome})
+    nomes = [p["nome"] for p in pares]
+    repetidos = sorted({n for n in nomes if nomes.count(n) > 1})
+    if repetidos:
+        raise ValueError(f"Nomes repetidos no manifesto: {', '.join(repetidos)}")
+    return pares
+
+
+def _abrir_catalogo(caminho_cache, caminho_xml, caminho_csv, diretorio_cache):
+    # No processo: abre o cache (memmap) uma vez e guarda. Se o cache não existir, carrega normalmente
+    catalogo = _catalogos_abertos.get(caminho_cache)
+    if catalogo is None:
+        catalogo = cache.carregar_catalogo_do_cache(caminho_cache)
+        if catalogo is None:
+            catalogo = cache.carregar_catalogo(caminho_xml, caminho_csv, diretorio_cache)
+        _catalogos_abertos[caminho_cache] = catalogo
+    return catalogo
+
+
+def renderizar_trabalho(trabalho):
+    """
+    Um trabalho = um par (XML, CSV) em uma ordem do mapa de calor, salvo em todos os formatos pedidos.
+    Roda dentro do processo do pool; retorna um dicionário com os arquivos e os tempos de cada etapa.
+    """
+    tempos = {}
+    inicio = time.perf_counter()
+    catalogo = _abrir_catalogo(trabalho["cache"], trabalho["xml"], trabalho["csv"], trabalho["diretorio_cache"])
+    grafo = viz.criar_grafo_do_catalogo(catalogo)
+    tempos["carregar"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    figura = viz.desenhar_grafo_em_camadas(
+        grafo, catalogo, trabalho["ordem"], catalogo.ras_ordenados(),
+        trabalho["retencao"], trabalho["elegiveis"]
+    )
+    tempos["desenhar"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    os.makedirs(trabalho["pasta"], exist_ok=True)
+    arquivos = []
+    for formato in trabalho["formatos"]:
+        arquivo = os.path.join(trabalho["pasta"], f"{trabalho['nome']}_{trabalho['ordem']}.{formato}")
+        figura.savefig(arquivo, format=formato, dpi=trabalho["dpi"])
+        arquivos.append(arquivo)
+    tempos["salvar"] = time.perf_counter() - inicio
+
+    instrumentacao.gravar_processo()
+    return {"nome": trabalho["nome"], "ordem": trabalho["ordem"], "arquivos": arquivos,
+            "tempos": tempos, "pid": os.getpid()}
+
+
+def _erro_do_par(par, ordens, erro):
+    # Um resultado com "erro" por trabalho que o par teria, pra contar no resumo igual às falhas do pool
+    print(f"  ERRO {par['nome']}: {erro}")
+    return [{"nome": par["nome"], "ordem": ordem, "arquivos": [], "tempos": {}, "erro": erro} for ordem in ordens]
+
+
+def montar_trabalhos(pares, saida, formatos, ordens=None, dpi=100, retencao=False, elegiveis=False, diretorio_cache=None):
+    """
+    Carrega cada par uma vez (preenchendo o cache do disco) e monta a lista de trabalhos (par × ordem).
+    Um par que não dá pra carregar (arquivo faltando, XML ou CSV com erro) não para o lote:
+    vira um resultado com "erro" pra cada ordem e os outros pares seguem.
+    Retorna (trabalhos, tempos_de_carga, erros)
+    """
+    ordens = list(ordens or viz.ORDENS_MAPA)
+    trabalhos = []
+    tempos_carga = {}
+    erros = []
+    for par in pares:
+        faltando = cache.arquivos_faltando(par["xml"], par["csv"])
+        if faltando:
+            erros.extend(_erro_do_par(par, ordens, f"arquivo não encontrado: {', '.join(faltando)}"))
+            continue
+        inicio = time.perf_counter()
+        try:
+            # Lê o XML/CSV aqui (ou acha o cache válido): os processos só abrem o cache pronto
+            catalogo = cache.carregar_catalogo(par["xml"], par["csv"], diretorio_cache)
+            caminho = cache.caminho_cache(par["xml"], par["csv"], diretorio_cache)
+        except Exception as e:
+            erros.extend(_erro_do_par(par, ordens, f"{type(e).__name__}: {e}"))
+            continue
+        if not catalogo.disciplinas:
+            erros.extend(_erro_do_par(par, ordens, f"nenhuma disciplina no XML {par['xml']}"))
+            continue
+        tempos_carga[par["nome"]] = time.perf_counter() - inicio
+        for ordem in ordens:
+            trabalhos.append({
+                "nome": par["nome"], "xml": par["xml"], "csv": par["csv"],
+                "cache": caminho, "diretorio_cache": diretorio_cache,
+                "ordem": ordem, "formatos": list(formatos), "dpi": dpi,
+                "pasta": os.path.join(saida, par["nome"]),
+                "retencao": retencao, "elegiveis": elegiveis,
+            })
+    return trabalhos, tempos_carga, erros
+
+
+def executar(trabalhos, processos=None):
+    #Roda os trabalhos no pool de processos e retorna a lista de resultados (os que falharam têm "erro")
+    resultados = []
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        futuros = {pool.submit(renderizar_trabalho, t): t for t in trabalhos}
+        for futuro in as_completed(futuros):
+            trabalho = futuros[futuro]
+            try:
+                resultado = futuro.result()
+                total = sum(resultado["tempos"].values())
+                print(f"  ok   {resultado['nome']} [{resultado['ordem']}] {total:.2f}s")
+            except Exception as e:
+                resultado = {"nome": trabalho["nome"], "ordem": trabalho["ordem"], "arquivos": [],
+                             "tempos": {}, "erro": f"{type(e).__name__}: {e}"}
+                print(f"  ERRO {trabalho['nome']} [{trabalho['ordem']}] {resultado['erro']}")
+            resultados.append(resultado)
+    resultados.sort(key=lambda r: (r["nome"], r["ordem"]))
+    return resultados
+
+
+def imprimir_resumo(resultados, tempos_carga, tempo_total):
+    print("\n--- Resumo do Lote ---")
+    print(f"{'trabalho':<40} {'carregar':>9} {'desenhar':>9} {'salvar':>9} {'total':>9}")
+    for r in resultados:
+        nome = f"{r['nome']} [{r['ordem']}]"
+        if "erro" in r:
+            print(f"{nome:<40} ERRO: {r['erro']}")
+            continue
+        t = r["tempos"]
+        print(f"{nome:<40} {t['carregar']:>8.2f}s {t['desenhar']:>8.2f}s {t['salvar']:>8.2f}s {sum(t.values()):>8.2f}s")
+    for nome, segundos in tempos_carga.items():
+        print(f"Carga/cache de {nome}: {segundos:.2f}s")
+    falhas = sum(1 for r in resultados if "erro" in r)
+    arquivos = sum(len(r["arquivos"]) for r in resultados)
+    print(f"{len(resultados) - falhas} trabalhos ok, {falhas} com erro, {arquivos} arquivos em {tempo_total:.2f}s")
+    print("----------------------")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera as imagens do grafo para vários pares (XML, CSV) sem abrir a interface.")
+    parser.add_argument("manifesto", help="arquivo JSON com a lista de pares {xml, csv, nome}")
+    parser.add_argument("--saida", default="renders", help="pasta de saída (uma subpasta por par)")
+    parser.add_argument("--formatos", nargs="+", default=["png"], choices=FORMATOS_SUPORTADOS)
+    parser.add_argument("--ordens", nargs="+", choices=list(viz.ORDENS_MAPA),
+                        help="ordens do mapa de calor (padrão: todas)")
+    parser.add_argument("--processos", type=int, default=None, help="número de processos (padrão: número de CPUs)")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--retencao", action="store_true", help="desenha o selo de retenção nos nós")
+    parser.add_argument("--elegiveis", action="store_true", help="desenha o selo de elegíveis nos nós")
+    parser.add_argument("--cache-dir", default=None, help="pasta do cache (padrão: TCC2025_CACHE_DIR ou ~/.cache/tcc2025)")
+    parser.add_argument("--resumo-json", default=None, help="grava também o resumo dos tempos nesse arquivo")
+    args = parser.parse_args(argv)
+
+    print("=== Geração em Lote ===")
+    inicio = time.perf_counter()
+    pares = ler_manifesto(args.manifesto)
+    print(f"{len(pares)} pares no manifesto, formatos: {', '.join(args.formatos)}")
+
+    trabalhos, tempos_carga, erros = montar_trabalhos(
+        pares, args.saida, args.formatos, args.ordens, args.dpi,
+        args.retencao, args.elegiveis, args.cache_dir
+    )
+    print(f"{len(trabalhos)} trabalhos...")
+    resultados = executar(trabalhos, args.processos) if trabalhos else []
+    # Os pares que nem carregaram entram no resumo como trabalhos com erro
+    resultados = sorted(resultados + erros, key=lambda r: (r["nome"], r["ordem"]))
+    tempo_total = time.perf_counter() - inicio
+    imprimir_resumo(resultados, tempos_carga, tempo_total)
+
+    if args.resumo_json:
+        with open(args.resumo_json, "w", encoding="utf-8") as f:
+            json.dump({"tempo_total": tempo_total, "carga": tempos_carga, "trabalhos": resultados}, f, indent=2)
+
+    return 1 if any("erro" in r for r in resultados) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
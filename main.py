@@ -1,10 +1,26 @@
 # main.py
 
 import os
+import importlib
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from model import Catalogo
-import gui 
+
+# A GUI puxa matplotlib (TkAgg), networkx e numpy e a leitura do CSV puxa o pandas: quase um segundo de import.
+# Nada disso é importado aqui em cima: precarregar_modulos() importa numa thread enquanto o usuário
+# escolhe os arquivos, e quando a janela vai abrir o import já terminou (ou só espera o resto dele)
+MODULOS_PESADOS = ("gui", "pandas")
+
+
+def precarregar_modulos(modulos=MODULOS_PESADOS):
+    #Importa os módulos numa thread em segundo plano e retorna a thread
+    def importar():
+        for nome in modulos:
+            importlib.import_module(nome)
+
+    thread = threading.Thread(target=importar, daemon=True)
+    thread.start()
+    return thread
 
 
 def selecionar_arquivos():
@@ -37,6 +53,9 @@ def selecionar_arquivos():
 
 def main():
     print("=== Sistema de Visualização de Históricos Curriculares ===")
+
+    # Os imports pesados rodam enquanto as janelas de seleção estão abertas
+    precarregar_modulos()
     
     # --- 1. Seleção dos arquivos via interface gráfica ---
     caminho_xml, caminho_csv = selecionar_arquivos()
@@ -50,26 +69,28 @@ def main():
         input("Pressione Enter para sair.")
         return
 
-    # --- 2. Carregamento dos dados ---
+    # --- 2. Iniciar a Aplicação Gráfica ---
+    # A janela abre na hora com a tela de carregamento; o XML/CSV (ou o cache do disco),
+    # o grafo e os índices são montados numa thread enquanto isso (ver gui.App._iniciar_carga)
     print(f"\nCarregando dados...")
     print(f"XML: {os.path.basename(caminho_xml)}")
     print(f"CSV: {os.path.basename(caminho_csv)}")
-    
-    catalogo = Catalogo()
-    catalogo.carregar_dados(caminho_xml, caminho_csv)
-    
-    print("\n--- Resumo da Carga ---")
-    print(catalogo)  # Mostra o __repr__ do catálogo
-    print("-------------------------")
     print("Iniciando a interface gráfica...")
 
-    # --- 3. Iniciar a Aplicação Gráfica ---
     # Extrai apenas o nome do arquivo para passar para a GUI
     nome_xml = os.path.basename(caminho_xml)
-    
-    app = gui.App(catalogo, nome_xml)
+
+    # Se a thread de precarregamento ainda estiver importando, o import espera ela terminar
+    import gui
+
+    app = gui.App(None, nome_xml, caminho_xml=caminho_xml, caminho_csv=caminho_csv)
     
     app.mainloop()
+
+    # Com TCC2025_TRACE=arquivo.json: tabela dos trechos mais caros (o trace é gravado ao sair, ver instrumentacao.py)
+    import instrumentacao
+    if instrumentacao.ativo():
+        instrumentacao.imprimir_resumo()
     
     print("Aplicação gráfica fechada. Programa encerrado.")
 
@@ -1,39 +1,419 @@
 # model.py  -> a estrutura dos dados das disciplinas
-import pandas as pd
+import os
+import json
+import time
+import numpy as np
+# pandas só é importado quando um CSV é lido de verdade (_importar_pandas): abrir o catálogo do cache não precisa dele
 import xml.etree.ElementTree as ET #a biblioteca pro xml que o Guilherme usou no GradeGen
+import instrumentacao
+
+#Quantas linhas do CSV são lidas por vez no modo streaming
+TAMANHO_BLOCO_PADRAO = 50_000
+#Com limite de memória, o primeiro pedaço tem só essas linhas (pra medir quanto cada linha ocupa)
+LINHAS_AMOSTRA_MEMORIA = 1_000
+
+_NAN = object()
+
+def _importar_pandas():
+    # O import do pandas leva uns 0.2s; só quem lê CSV paga (e a GUI lê numa thread, ver gui.App._iniciar_carga)
+    import pandas as pd
+    return pd
+
+def _nota_aprovacao():
+    # A nota mínima fica no planejamento; importada aqui dentro pra o model não puxar o planejamento
+    # (e o indices_grafo) no import, nem virar import circular se o planejamento passar a usar o model
+    from planejamento import NOTA_APROVACAO
+    return NOTA_APROVACAO
+
+def _codificar_valores(valores):
+    # Transforma uma lista de valores quaisquer (int, float, str, NaN) em códigos inteiros + vocabulário.
+    # NaN != NaN, então todos os NaN viram uma chave só
+    vocabulario = {}
+    codigos = np.fromiter((vocabulario.setdefault(v if v == v else _NAN, len(vocabulario)) for v in valores),
+                          dtype=np.int32, count=len(valores))
+    return codigos, [float("nan") if v is _NAN else v for v in vocabulario]
+
+def _codificar_com_vocabulario(valores, vocabulario):
+    # Igual ao _codificar_valores, mas continua o vocabulário {valor: código} das chamadas anteriores
+    # (a carga em blocos usa um vocabulário só pro arquivo inteiro). O pd.factorize resolve o pedaço
+    # de uma vez, o dict só vê os valores distintos. NaN/None viram uma chave só, como lá
+    pd = _importar_pandas()
+    locais, distintos = pd.factorize(np.asarray(valores, dtype=object).ravel())
+    mapa = np.fromiter((vocabulario.setdefault(v, len(vocabulario)) for v in distintos.tolist()),
+                       dtype=np.int32, count=len(distintos))
+    if (locais < 0).any():
+        mapa = np.append(mapa, np.int32(vocabulario.setdefault(_NAN, len(vocabulario))))  # locais == -1
+    return mapa[locais].reshape(np.shape(valores))
+
+def _vocabulario_como_lista(vocabulario):
+    return [float("nan") if v is _NAN else v for v in vocabulario]
+
+def _sem_registro_csv(blocos):
+    # '--' (célula sem registro) já vira NaN no read_csv, só nas colunas de nota e frequência:
+    # assim elas chegam como float e não precisam passar pelo pd.to_numeric coluna por coluna
+    return {col: ['--'] for trios in blocos.values() for _, nota, freq in trios for col in (nota, freq)}
+
+def _colunas_numericas(df, colunas):
+    # Matriz float das colunas. Se alguma veio com texto que não é '--' (célula estragada), um to_numeric só
+    # na matriz inteira achatada faz o papel do errors='coerce' antigo (o texto vira NaN, que é descartado)
+    valores = df[colunas].to_numpy()
+    if valores.dtype.kind not in "fiu":
+        pd = _importar_pandas()
+        valores = pd.to_numeric(valores.ravel(), errors='coerce').reshape(valores.shape)
+    return valores.astype(float, copy=False)
+
+def _inteiro_do_xml(elemento, padrao=0):
+    # Texto de uma tag do XML como int. Tag faltando, vazia, só com espaços ou que não é número vira 'padrao'
+    if elemento is None or not elemento.text or not elemento.text.strip():
+        return padrao
+    try:
+        return int(elemento.text.strip())
+    except ValueError:
+        print(f"Aviso: valor inválido '{elemento.text.strip()}' em <{elemento.tag}> no XML, usando {padrao}.")
+        return padrao
+
+
+class BaseNotas:
+    """
+    Guarda os registros de todas as disciplinas em arrays numpy.
+
+    - Tentativas (uma por registro do CSV), agrupadas por disciplina no estilo CSR:
+      as tentativas da disciplina j ficam em [ptr[j], ptr[j+1]), na ordem original do CSV
+    - ras: RAs únicos ordenados (int64 quando todos são números), linha i das matrizes = ras[i]
+    - Matrizes aluno × disciplina com a ÚLTIMA tentativa de cada aluno (NaN / -1 = não cursou):
+      notas, frequencias e ultima (posição do registro). Ficam em ordem de coluna (order='F'),
+      então a coluna de uma disciplina é contínua na memória (e no disco, quando abre como memmap)
+    - Índice esparso das tentativas, só com os pares (aluno, disciplina) que existem:
+      os pares da disciplina j são [ptr_pares[j], ptr_pares[j+1]), com o aluno de cada um em par_aluno
+      (em ordem, então achar um aluno é uma busca binária). As tentativas do par k são
+      ordem_tentativas[ptr_tentativas[k]:ptr_tentativas[k+1]], da primeira pra última.
+      Serve pra listar as tentativas, contar quantas foram, comparar primeira × última nota e medir
+      retenção sem varrer registros
+
+    Pode ficar toda na memória ou ser salva com salvar() e aberta com abrir() como memmap,
+    aí só as páginas que forem lidas (uma coluna, a fatia de uma disciplina) vão pra RAM.
+    """
+    # Arrays que vão pro disco, um .npy cada (os das outras linhas são derivados, montados em _montar_indices)
+    ARRAYS = ("ptr", "aluno", "turma", "nota", "frequencia",
+              "ultima", "notas", "frequencias",
+              "ptr_pares", "par_aluno", "ptr_tentativas", "ordem_tentativas")
+
+    def __init__(self, codigos, ptr, aluno, turma, nota, frequencia, ras, turmas, indices=None):
+        self.codigos = list(codigos)
+        self.coluna = {codigo: j for j, codigo in enumerate(self.codigos)}
+        self.ptr = ptr
+        self.aluno = aluno
+        self.turma = turma
+        self.nota = nota
+        self.frequencia = frequencia
+        self.ras = ras
+        self.turmas = turmas
+        self._indice_ra = None  # str(RA) -> linha, só é montado se os RAs não forem numéricos
+        if indices is None:
+            self._montar_indices()
+        else:
+            for nome, array in indices.items():
+                setattr(self, nome, array)
+
+    @classmethod
+    def construir_codificado(cls, codigos, pedacos, vocab_ras, vocab_turmas):
+        """
+        Igual ao construir, mas com os RAs e as turmas já em códigos int32 (posições em vocab_ras e
+        vocab_turmas), que é como a carga em blocos junta os pedaços sem guardar arrays de objetos.
+        RAs do vocabulário sem nenhum registro ficam de fora
+        """
+        vazio = (np.empty(0, dtype=np.int32),) * 2 + (np.empty(0),) * 2
+        colunas = [pedacos.get(codigo, vazio) for codigo in codigos]
+        ptr = np.cumsum([0] + [len(c[0]) for c in colunas], dtype=np.int64)
+        codigos_ra, turma, notas, frequencias = (
+            np.concatenate([np.asarray(c[k], dtype=tipo) for c in colunas]) if colunas else np.empty(0, dtype=tipo)
+            for k, tipo in enumerate((np.int32, np.int32, np.float64, np.float64))
+        )
+
+        usados = np.zeros(len(vocab_ras), dtype=bool)
+        usados[codigos_ra] = True
+        valores = np.array([None] * len(vocab_ras), dtype=object)
+        valores[:] = list(vocab_ras)
+        valores = valores[usados]
+        try:
+            ordem = np.argsort(valores, kind="stable")
+        except TypeError:
+            # RAs de tipos misturados (número e texto): ordena pelo texto
+            ordem = np.argsort([str(v) for v in valores], kind="stable")
+        # código do vocabulário -> linha (RA na ordem)
+        linha = np.full(len(vocab_ras), -1, dtype=np.int64)
+        linha[np.flatnonzero(usados)[ordem]] = np.arange(len(ordem))
+        ras = valores[ordem]
+        if all(type(ra) is int for ra in ras.tolist()):
+            ras = ras.astype(np.int64)  # RAs numéricos: busca com searchsorted e dá pra mapear do disco
+        return cls(codigos, ptr, linha[codigos_ra].astype(np.int32), turma, notas, frequencias,
+                   ras, np.array(list(vocab_turmas), dtype=object))
+
+    @classmethod
+    def construir(cls, codigos, pedacos):
+        #Monta a base a partir de {codigo: (ras, turmas, notas, frequencias)} (arrays na ordem do CSV)
+        vazio = (np.empty(0, dtype=object),) * 2 + (np.empty(0),) * 2
+        colunas = [pedacos.get(codigo, vazio) for codigo in codigos]
+        tamanhos = [len(c[0]) for c in colunas]
+        ptr = np.cumsum([0] + tamanhos, dtype=np.int64)
+        ras_todos, turmas_todas, notas, frequencias = (
+            np.concatenate([np.asarray(c[k], dtype=tipo) for c in colunas]) if colunas else np.empty(0, dtype=tipo)
+            for k, tipo in enumerate((object, object, np.float64, np.float64))
+        )
+
+        try:
+            ras, aluno = np.unique(ras_todos, return_inverse=True)
+        except TypeError:
+            # RAs de tipos misturados (número e texto): ordena pelo texto
+            codigos_ra, vocab = _codificar_valores(ras_todos.tolist())
+            ordem = np.argsort([str(v) for v in vocab], kind="stable")
+            ras = np.array(vocab, dtype=object)[ordem]
+            posicao = np.empty(len(vocab), dtype=np.int64)
+            posicao[ordem] = np.arange(len(vocab))
+            aluno = posicao[codigos_ra]
+        if all(type(ra) is int for ra in ras.tolist()):
+            ras = ras.astype(np.int64)  # RAs numéricos: busca com searchsorted e dá pra mapear do disco
+        else:
+            ras = ras.astype(object)
+        turma, vocab_turmas = _codificar_valores(turmas_todas.tolist())
+        return cls(codigos, ptr, aluno.astype(np.int32), turma, notas, frequencias,
+                   ras, np.array(vocab_turmas, dtype=object))
+
+    def salvar(self, diretorio):
+        #Escreve a base numa pasta (um .npy por array + base.json) pra ser aberta depois com abrir()
+        os.makedirs(diretorio, exist_ok=True)
+        for nome in self.ARRAYS:
+            np.save(os.path.join(diretorio, f"{nome}.npy"), getattr(self, nome))
+        numericos = self.ras.dtype != object
+        if numericos:
+            np.save(os.path.join(diretorio, "ras.npy"), self.ras)
+        with open(os.path.join(diretorio, "base.json"), "w", encoding="utf-8") as f:
+            # RAs que não são números e turmas vão como JSON, assim os tipos originais voltam iguais
+            json.dump({
+                "codigos": self.codigos,
+                "turmas": self.turmas.tolist(),
+                "ras": None if numericos else self.ras.tolist(),
+            }, f)
+
+    @classmethod
+    def abrir(cls, diretorio, mmap=True):
+        #Abre uma base salva. Com mmap=True os arrays ficam no disco (np.memmap, sem cópia)
+        modo = "r" if mmap else None
+        with open(os.path.join(diretorio, "base.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {nome: np.load(os.path.join(diretorio, f"{nome}.npy"), mmap_mode=modo) for nome in cls.ARRAYS}
+        if meta["ras"] is None:
+            ras = np.load(os.path.join(diretorio, "ras.npy"), mmap_mode=modo)
+        else:
+            ras = np.array(meta["ras"], dtype=object)
+        basicos = [arrays.pop(nome) for nome in ("ptr", "aluno", "turma", "nota", "frequencia")]
+        return cls(meta["codigos"], *basicos, ras, np.array(meta["turmas"], dtype=object), indices=arrays)
+
+    def _montar_indices(self):
+        n_alunos, n_disc = len(self.ras), len(self.codigos)
+        disc = np.repeat(np.arange(n_disc, dtype=np.int64), np.diff(self.ptr))
+        # Chave do par (aluno, disciplina): disciplina * n_alunos + aluno. Ordenar pela chave agrupa
+        # as tentativas por disciplina e, dentro dela, por aluno (estável = na ordem em que aconteceram)
+        chave = disc * n_alunos + self.aluno
+        self.ordem_tentativas = np.argsort(chave, kind="stable")
+        ordenada = chave[self.ordem_tentativas]
+
+        # Só os pares que existem: onde a chave ordenada muda começa um par novo
+        inicio_par = np.flatnonzero(np.diff(ordenada, prepend=-1)) if len(ordenada) else np.empty(0, dtype=np.int64)
+        self.ptr_tentativas = np.append(inicio_par, len(ordenada)).astype(np.int64)
+        self.par_aluno = self.aluno[self.ordem_tentativas[inicio_par]].astype(np.int32)
+        disc_par = disc[self.ordem_tentativas[inicio_par]]
+        pares_por_disciplina = np.bincount(disc_par, minlength=n_disc)
+        self.ptr_pares = np.concatenate([[0], np.cumsum(pares_por_disciplina)]).astype(np.int64)
+
+        # Matrizes da última tentativa: a última de cada par é a que fecha a fatia dele em ordem_tentativas
+        self.ultima = np.full((n_alunos, n_disc), -1, dtype=np.int64, order="F")
+        self.ultima[self.par_aluno, disc_par] = self._ultimas()
+        cursou = self.ultima >= 0
+        self.notas = np.asfortranarray(np.where(cursou, self.nota[self.ultima], np.nan))
+        self.frequencias = np.asfortranarray(np.where(cursou, self.frequencia[self.ultima], np.nan))
+
+    def _par(self, j, linha):
+        #Posição do par (aluno da linha, disciplina j) no índice, ou -1 se o aluno não cursou
+        inicio, fim = int(self.ptr_pares[j]), int(self.ptr_pares[j + 1])
+        k = inicio + int(np.searchsorted(self.par_aluno[inicio:fim], linha))
+        return k if k < fim and self.par_aluno[k] == linha else -1
+
+    def _ultimas(self, inicio=0, fim=None):
+        #Registro (posição nos arrays de tentativas) da última tentativa de cada par em [inicio, fim)
+        fim = len(self.par_aluno) if fim is None else fim
+        return self.ordem_tentativas[self.ptr_tentativas[inicio + 1:fim + 1] - 1]
+
+    def linhas_dos_ras(self, ras):
+        #Linha de cada RA (posição em ras, -1 para RA que não aparece em nenhum registro)
+        procurados = np.asarray(ras)
+        if self.ras.dtype != object and procurados.dtype.kind in "iu":
+            # RAs numéricos dos dois lados: busca binária vetorizada, sem dicionário
+            if len(self.ras) == 0:
+                return np.full(len(procurados), -1, dtype=np.int64)
+            linhas = np.minimum(np.searchsorted(self.ras, procurados), len(self.ras) - 1)
+            return np.where(self.ras[linhas] == procurados, linhas, -1).astype(np.int64)
+        # Qualquer outro caso compara pelo texto, igual ao str(ra) == str(ra) de antes
+        if self._indice_ra is None:
+            self._indice_ra = {str(ra): i for i, ra in enumerate(self.ras.tolist())}
+        return np.fromiter((self._indice_ra.get(str(ra), -1) for ra in ras), dtype=np.int64, count=len(ras))
+
+    def coluna_notas(self, codigo, linhas=None):
+        #Últimas notas dos alunos numa disciplina (NaN = não cursou), direto da coluna da matriz.
+        #linhas escolhe/ordena os alunos (None = todos)
+        j = self.coluna[codigo]
+        if linhas is None:
+            return np.asarray(self.notas[:, j])
+        linhas = np.asarray(linhas, dtype=np.int64)
+        coluna = np.full(len(linhas), np.nan)
+        validas = linhas >= 0
+        coluna[validas] = self.notas[linhas[validas], j]
+        return coluna
+
+    def notas_de_quem_cursou(self, codigo):
+        #Últimas notas só dos alunos que cursaram a disciplina (sem os NaN)
+        j = self.coluna[codigo]
+        return np.asarray(self.nota[self._ultimas(int(self.ptr_pares[j]), int(self.ptr_pares[j + 1]))])
+
+    def _registro(self, i):
+        return {
+            "ra": self.ras[self.aluno[i]].item() if self.ras.dtype != object else self.ras[self.aluno[i]],
+            "turma": self.turmas[self.turma[i]],
+            "nota": self.nota[i].item(),
+            "frequencia": self.frequencia[i].item(),
+        }
+
+    def registros_da_disciplina(self, codigo):
+        #Monta a lista de dicionários (formato antigo do Disciplina.registros) de uma disciplina
+        j = self.coluna[codigo]
+        fatia = slice(self.ptr[j], self.ptr[j + 1])
+        return [
+            {"ra": ra, "turma": turma, "nota": nota, "frequencia": frequencia}
+            for ra, turma, nota, frequencia in zip(
+                self.ras[self.aluno[fatia]].tolist(), self.turmas[self.turma[fatia]].tolist(),
+                self.nota[fatia].tolist(), self.frequencia[fatia].tolist())
+        ]
+
+    def num_registros(self, codigo):
+        j = self.coluna[codigo]
+        return int(self.ptr[j + 1] - self.ptr[j])
+
+    def num_tentativas(self):
+        #Quantas vezes o aluno cursou a disciplina, um valor por par (ordem de par_aluno/ptr_pares)
+        return np.diff(self.ptr_tentativas)
+
+    def primeira_nota(self):
+        #Nota da PRIMEIRA tentativa, um valor por par
+        return self.nota[self.ordem_tentativas[self.ptr_tentativas[:-1]]]
+
+    def menor_nota(self):
+        #Pior nota entre todas as tentativas, um valor por par
+        if len(self.par_aluno) == 0:
+            return np.empty(0)
+        return np.minimum.reduceat(self.nota[self.ordem_tentativas], self.ptr_tentativas[:-1])
+
+    def resumo_retencao(self, nota_minima=None):
+        """
+        Números de retenção por disciplina (arrays na ordem de self.codigos), para a turma inteira:
+        - alunos: quantos cursaram pelo menos uma vez
+        - refizeram: quantos cursaram mais de uma vez
+        - retidos: quantos reprovaram (nota < nota_minima, padrão planejamento.NOTA_APROVACAO)
+          em pelo menos uma tentativa
+        - tentativas: total de tentativas
+        """
+        if nota_minima is None:
+            nota_minima = _nota_aprovacao()
+        n_disc = len(self.codigos)
+        alunos = np.diff(self.ptr_pares)
+        disc_par = np.repeat(np.arange(n_disc), alunos)
+        return {
+            "alunos": alunos,
+            "refizeram": np.bincount(disc_par[self.num_tentativas() > 1], minlength=n_disc),
+            "retidos": np.bincount(disc_par[self.menor_nota() < nota_minima], minlength=n_disc),
+            "tentativas": np.diff(self.ptr),
+        }
+
+    def tentativas(self, codigo, ra):
+        #Todas as tentativas do aluno na disciplina, da primeira pra última
+        linha = self.linhas_dos_ras([ra])[0]
+        k = self._par(self.coluna[codigo], linha) if linha >= 0 else -1
+        if k < 0:
+            return []
+        return [self._registro(i) for i in self.ordem_tentativas[self.ptr_tentativas[k]:self.ptr_tentativas[k + 1]]]
+
+    def ultimo_registro(self, codigo, ra):
+        #Última tentativa do aluno na disciplina (uma posição da matriz ultima), ou None se ele não cursou
+        linha = self.linhas_dos_ras([ra])[0]
+        i = self.ultima[linha, self.coluna[codigo]] if linha >= 0 else -1
+        if i < 0:
+            return None
+        return self._registro(i)
+
 
 class Disciplina:
     #Representa uma disciplina e armazena todos os registros dos alunos que cursaram ela, a turma, as notas e a frequencia
-    def __init__(self, codigo, nome="Não definido", creditos=0, semestre_offer=0, pre_requisitos=None):
+    #Depois da carga do CSV os registros ficam na BaseNotas do catálogo e a disciplina é só uma visão da coluna dela
+    def __init__(self, codigo, nome="Não definido", creditos=0, semestre_offer=0, pre_requisitos=None,
+                 cadeia_pre_requisito=None):
         # Os atributos do XML (id, nome, creditos e semestre oferecido)
         self.codigo = codigo
         self.nome = nome
         self.creditos = creditos
         self.semestre_offer = semestre_offer
         self.pre_requisitos = pre_requisitos if pre_requisitos is not None else [] #Garante que pre_requisitos seja sempre uma lista
+        self.cadeia_pre_requisito = cadeia_pre_requisito #no_cadeia_pre_requisito do XML
         # Os atributos do CSV, os registros dos alunos, notas, turma e frequência
-        self.registros = []
+        self._base = None        # BaseNotas do catálogo (None = disciplina solta, sem catálogo)
+        self._registros = []     # registros adicionados um a um, fora da carga do CSV
+
+    @property
+    def registros(self):
+        #Lista de dicionários {ra, turma, nota, frequencia}, montada na hora a partir da base
+        if self._base is None:
+            return self._registros
+        return self._base.registros_da_disciplina(self.codigo) + self._registros
 
     def adicionar_registro(self, ra, turma, nota, frequencia):
-        self.registros.append({
+        self._registros.append({
             "ra": ra,
             "turma": turma,
             "nota": nota,
             "frequencia": frequencia
         })
 
+    def adicionar_registros(self, ras, turmas, notas, frequencias):
+        #Versão em lote do adicionar_registro
+        self._registros.extend(
+            {"ra": ra, "turma": turma, "nota": nota, "frequencia": frequencia}
+            for ra, turma, nota, frequencia in zip(
+                np.asarray(ras).tolist(), np.asarray(turmas).tolist(),
+                np.asarray(notas).tolist(), np.asarray(frequencias).tolist())
+        )
+
+    def num_registros(self):
+        base = self._base.num_registros(self.codigo) if self._base is not None else 0
+        return base + len(self._registros)
+
     #Fiz pra encontrar a ultima nota do aluno sempre que for pegar essa informação
     def get_ultima_nota_aluno(self, ra):
-        registros_aluno = [r for r in self.registros if str(r['ra']) == str(ra)]
-        if not registros_aluno:
+        # Registros avulsos vêm depois dos da base, então eles ganham se existirem
+        registros_aluno = [r for r in self._registros if str(r['ra']) == str(ra)]
+        if registros_aluno:
+            return registros_aluno[-1]
+        if self._base is None:
             return None
-        return registros_aluno[-1]
+        return self._base.ultimo_registro(self.codigo, ra)
+
+    def get_tentativas_aluno(self, ra):
+        #Todas as tentativas do aluno, da primeira pra última
+        tentativas = self._base.tentativas(self.codigo, ra) if self._base is not None else []
+        return tentativas + [r for r in self._registros if str(r['ra']) == str(ra)]
 
     #TESTE NA MAIN
     def __repr__(self):
         return (f"Disciplina(Código='{self.codigo}', Nome='{self.nome}', "
                 f"Créditos={self.creditos}, Pré-reqs={self.pre_requisitos}, "
-                f"Alunos registrados={len(self.registros)})")
+                f"Alunos registrados={self.num_registros()})")
 
 class Catalogo:
     #Armazena e gerencia o conjunto de todas as disciplinas, ele vai ser carregado do XML e do CSV
@@ -42,20 +422,28 @@ class Catalogo:
     def __init__(self):
         self.disciplinas = {}
         self.total_alunos = 0 #inicializa contagem de alunos
+        self.max_anos = None #prazo máximo do curso em anos (max_years do XML)
+        self.estatisticas_carga = {} #linhas, registros e vazão da última carga do CSV
+        self.base = None #BaseNotas com os registros e o índice de tentativas (montada na carga do CSV)
 
+    @instrumentacao.medido("model.carregar_xml")
     def _carregar_de_xml(self, caminho_xml):
         #Método privado para carregar o arquivo XML do catálogo do curso
         try:
             tree = ET.parse(caminho_xml)
             root = tree.getroot()
+            #Prazo máximo do curso (em anos) que vem no cat_info
+            self.max_anos = _inteiro_do_xml(root.find('.//cat_info/max_years'), None)
             #Andar na árvore do subject - todas as disicplinas:
             for subject in root.findall('.//subject'):
                 codigo = subject.find('id').text
                 if not codigo: continue # se não tiver ID vou pular - erro no xml
 
                 nome = subject.find('subject_name').text
-                creditos = int(subject.find('credits').text or 0)    #se tiver vazio vou considerar 0
-                semestre_offer = int(subject.find('sem_offer').text or 0)
+                creditos = _inteiro_do_xml(subject.find('credits'))    #se tiver vazio vou considerar 0
+                semestre_offer = _inteiro_do_xml(subject.find('sem_offer'))
+                #tamanho da cadeia de pré-requisitos segundo o XML (None = não veio), conferido no planejamento
+                cadeia_pre_requisito = _inteiro_do_xml(subject.find('no_cadeia_pre_requisito'), None)
                 
                 pre_requisitos = []  #Coleta os pre-requisitos
                 for pre_req in subject.findall('pre_reqs'):
@@ -66,61 +454,259 @@ class Catalogo:
                 if codigo not in self.disciplinas:
                     self.disciplinas[codigo] = Disciplina(
                         codigo=codigo, nome=nome, creditos=creditos,
-                        semestre_offer=semestre_offer, pre_requisitos=pre_requisitos
+                        semestre_offer=semestre_offer, pre_requisitos=pre_requisitos,
+                        cadeia_pre_requisito=cadeia_pre_requisito
                     )
         except FileNotFoundError:
             print(f"Erro: O arquivo '{caminho_xml}' não foi encontrado.")
         except ET.ParseError:
             print(f"Erro: Falha ao analisar o arquivo XML '{caminho_xml}'.")
 
+    @instrumentacao.medido("model.carregar_csv")
     def _carregar_de_csv(self, caminho_csv):
         #Método privado para carregar os registros de alunos do CSV.
+        inicio = time.perf_counter()
         try:
-            df = pd.read_csv(caminho_csv)
+            pd = _importar_pandas()
+            # O cabeçalho antes, pra ler as colunas de nota/frequência já como número
+            colunas = pd.read_csv(caminho_csv, nrows=0).columns
+            blocos = self._resolver_blocos_csv(colunas)
+            df = pd.read_csv(caminho_csv, na_values=_sem_registro_csv(blocos))
             df.rename(columns={df.columns[0]: 'RA'}, inplace=True)   #Renomeando a primeira coluna vazia como RA pra facilitar
             self.total_alunos = df['RA'].nunique() #calcular o total de alunos
         except FileNotFoundError:
             print(f"Erro: O arquivo '{caminho_csv}' não foi encontrado.")
             return
 
+        total_registros = self._adicionar_blocos_csv(self._extrair_blocos_csv(df, blocos))
+        instrumentacao.contar("model.linhas_csv", len(df))
+        instrumentacao.contar("model.registros", total_registros)
+
+        #Relatório de vazão da carga (linhas de alunos por segundo)
+        duracao = time.perf_counter() - inicio
+        self.estatisticas_carga = {
+            "linhas": len(df),
+            "registros": total_registros,
+            "segundos": duracao,
+            "linhas_por_segundo": len(df) / duracao if duracao > 0 else float("inf"),
+        }
+        print(f"   {len(df)} linhas e {total_registros} registros em {duracao:.2f}s "
+              f"({self.estatisticas_carga['linhas_por_segundo']:.0f} linhas/s)")
+
+    def _resolver_blocos_csv(self, colunas):
+        #Descobre os trios (turma, código, frequência) do cabeçalho e agrupa por disciplina.
+        #Retorna {codigo_base: [(col_turma, col_nota, col_frequencia), ...]} na ordem das colunas
+        blocos = {}
         #Itera sobre as colunas, começando da segunda porque a primeira é os RAs
-        for i in range(1, len(df.columns), 3):
+        for i in range(1, len(colunas), 3):
             # Garante que existam 3 colunas no bloco para processar.
-            if i + 2 >= len(df.columns): continue
+            if i + 2 >= len(colunas): continue
 
-            col_codigo_disciplina = df.columns[i+1]
+            col_codigo_disciplina = colunas[i+1]
             #A biblioteca panda quando ve coluna duplicadas coloca um prefixo então se uma disciplina aparece mais que 1 vez ela
             # interpreta que são 2 disciplinas diferentes, isso aqui é pra agrupar as duplicatas e entender que é só 1
-            codigo_base = col_codigo_disciplina.split('.')[0]
-            
+            codigo_base = str(col_codigo_disciplina).split('.')[0]
+
             #buscaando no dicio. que foi criado no XML
-            disciplina_obj = self.get_disciplina(codigo_base)
-            if not disciplina_obj:
+            if not self.get_disciplina(codigo_base):
                 continue # Pula se a disciplina do CSV não existir no catálogo XML
-            
-            #Itera sobre cada linha de aluno
-            for _, row in df.iterrows():
+
+            blocos.setdefault(codigo_base, []).append((colunas[i], col_codigo_disciplina, colunas[i+2]))
+        return blocos
+
+    def _extrair_blocos_csv(self, df, blocos, vocab_ras=None, vocab_turmas=None):
+        #Converte todos os trios de uma vez e separa os registros válidos de cada trio.
+        #Retorna {codigo_base: [(ras, turmas, notas, frequencias) de cada trio, na ordem das colunas]}
+        #Com vocab_ras/vocab_turmas os RAs e as turmas saem como códigos int32 desses vocabulários (carga em blocos)
+        extraidos = {}
+        if not blocos or df.empty:
+            return extraidos
+
+        cols_turma = [b[0] for trios in blocos.values() for b in trios]
+        cols_nota = [b[1] for trios in blocos.values() for b in trios]
+        cols_freq = [b[2] for trios in blocos.values() for b in trios]
+
+        # O '--' já chegou como NaN (_sem_registro_csv); NaN em qualquer um dos dois = sem registro
+        notas = _colunas_numericas(df, cols_nota)
+        frequencias = _colunas_numericas(df, cols_freq)
+        turmas = df[cols_turma].to_numpy(dtype=object)
+        validos = ~(np.isnan(notas) | np.isnan(frequencias))
+        ras = df['RA'].to_numpy(dtype=object)
+        if vocab_ras is not None:
+            ras = _codificar_com_vocabulario(ras, vocab_ras)
+        if vocab_turmas is not None:
+            # Só as células com registro entram no vocabulário (as outras são '--')
+            codigos_turma = np.zeros(turmas.shape, dtype=np.int32)
+            codigos_turma[validos] = _codificar_com_vocabulario(turmas[validos], vocab_turmas)
+            turmas = codigos_turma
+
+        j = 0
+        for codigo_base, trios in blocos.items():
+            extraidos[codigo_base] = []
+            for _ in trios:
+                linhas = np.nonzero(validos[:, j])[0]
+                extraidos[codigo_base].append((ras[linhas], turmas[linhas, j], notas[linhas, j], frequencias[linhas, j]))
+                j += 1
+        return extraidos
+
+    def _adicionar_blocos_csv(self, extraidos):
+        #Junta os trios de cada disciplina e monta a BaseNotas do catálogo. Retorna quantos registros entraram
+        # Ordem original: bloco por bloco (.1, .2 ...) e dentro do bloco linha por linha,
+        # assim o último registro de cada aluno continua sendo a última tentativa
+        pedacos = {
+            codigo_base: tuple(np.concatenate(coluna) for coluna in zip(*trios))
+            for codigo_base, trios in extraidos.items() if trios
+        }
+        self.definir_base(BaseNotas.construir(list(self.disciplinas), pedacos))
+        return len(self.base.nota)
+
+    @instrumentacao.medido("model.carregar_csv_em_blocos")
+    def _carregar_de_csv_em_blocos(self, caminho_csv, tamanho_bloco=TAMANHO_BLOCO_PADRAO, limite_memoria_mb=None,
+                                   ao_progresso=None):
+        #Método privado para carregar o CSV em pedaços de tamanho fixo, sem ler o arquivo inteiro de uma vez.
+        #Se tiver limite de memória, o tamanho do pedaço é recalculado a partir do consumo medido por linha.
+        #ao_progresso(linhas_lidas) é chamado depois de cada pedaço (se levantar exceção, a carga para ali)
+        inicio = time.perf_counter()
+        pd = _importar_pandas()
+        try:
+            colunas = pd.read_csv(caminho_csv, nrows=0).columns
+        except FileNotFoundError:
+            print(f"Erro: O arquivo '{caminho_csv}' não foi encontrado.")
+            return
+        colunas = ['RA'] + list(colunas[1:])
+
+        blocos = self._resolver_blocos_csv(colunas)
+        # Só lê a coluna do RA e as colunas dos trios que existem no XML
+        usadas = {'RA'} | {col for trios in blocos.values() for trio in trios for col in trio}
+        posicoes = [i for i, col in enumerate(colunas) if col in usadas]
+
+        total_linhas = 0
+        # Cada pedaço vira na hora arrays compactos (RA e turma como códigos int32, notas e frequências float),
+        # guardados por trio e só juntados no final, pra manter a mesma ordem (trio por trio) da carga de uma vez só
+        vocab_ras, vocab_turmas = {}, {}
+        pedacos = {codigo: [[] for _ in trios] for codigo, trios in blocos.items()}
+        # Com limite de memória o primeiro pedaço é uma amostra pequena, que mede o consumo por linha
+        tamanho = min(tamanho_bloco, LINHAS_AMOSTRA_MEMORIA) if limite_memoria_mb else tamanho_bloco
+        with pd.read_csv(caminho_csv, usecols=posicoes, na_values=_sem_registro_csv(blocos), iterator=True) as leitor:
+            while True:
                 try:
-                    nota = float(row[col_codigo_disciplina])
-                    frequencia = float(row[df.columns[i+2]])
-                    disciplina_obj.adicionar_registro(   #adicionando o registro a objeto da disciplina
-                        ra=row['RA'],
-                        turma=row[df.columns[i]],
-                        nota=nota,
-                        frequencia=frequencia
-                    )
-                except (ValueError, TypeError):
-                    #isso já resolve o problema de '--' dos valores da coluna
-                    continue
+                    df = leitor.get_chunk(tamanho)
+                except StopIteration:
+                    break
+                df.columns = [colunas[i] for i in posicoes]
+
+                total_linhas += len(df)
+                instrumentacao.contar("model.linhas_csv", len(df))
+                if ao_progresso is not None:
+                    ao_progresso(total_linhas)
+                for codigo, trios in self._extrair_blocos_csv(df, blocos, vocab_ras, vocab_turmas).items():
+                    for j, trio in enumerate(trios):
+                        pedacos[codigo][j].append(trio)
+
+                if limite_memoria_mb and len(df):
+                    # O pedaço em si + as matrizes de notas/frequências da conversão, por isso o fator 2
+                    bytes_por_linha = 2 * df.memory_usage(deep=True).sum() / len(df)
+                    tamanho = max(1, min(tamanho_bloco, int(limite_memoria_mb * 1024 * 1024 / bytes_por_linha)))
 
-    def carregar_dados(self, caminho_xml, caminho_csv):
+        self.total_alunos = len(vocab_ras) - (_NAN in vocab_ras)
+        juntos = {}
+        for codigo, trios in pedacos.items():
+            partes = [parte for trio in trios for parte in trio]  # trio por trio, pedaço por pedaço
+            if partes:
+                juntos[codigo] = tuple(np.concatenate(coluna) for coluna in zip(*partes))
+        self.definir_base(BaseNotas.construir_codificado(
+            list(self.disciplinas), juntos, _vocabulario_como_lista(vocab_ras), _vocabulario_como_lista(vocab_turmas)
+        ))
+        total_registros = len(self.base.nota)
+        instrumentacao.contar("model.registros", total_registros)
+
+        duracao = time.perf_counter() - inicio
+        self.estatisticas_carga = {
+            "linhas": total_linhas,
+            "registros": total_registros,
+            "segundos": duracao,
+            "linhas_por_segundo": total_linhas / duracao if duracao > 0 else float("inf"),
+        }
+        print(f"   {total_linhas} linhas e {total_registros} registros em {duracao:.2f}s "
+              f"({self.estatisticas_carga['linhas_por_segundo']:.0f} linhas/s, em blocos)")
+
+    @instrumentacao.medido("model.carregar_dados")
+    def carregar_dados(self, caminho_xml, caminho_csv, streaming=False,
+                       tamanho_bloco=TAMANHO_BLOCO_PADRAO, limite_memoria_mb=None, diretorio_base=None,
+                       ao_progresso=None):
         #CARREGANDO OS DADOS
+        #streaming=True lê o CSV em pedaços (tamanho_bloco linhas, ou menos se passar de limite_memoria_mb)
+        #diretorio_base: grava a BaseNotas nessa pasta e reabre como memmap (os registros saem da RAM)
+        #ao_progresso(linhas_lidas): chamado a cada pedaço no modo streaming (a GUI usa pra mostrar/cancelar)
         print("1. Carregando metadados do catálogo XML...")
         self._carregar_de_xml(caminho_xml)
         print("2. Carregando registros de alunos do CSV...")
-        self._carregar_de_csv(caminho_csv)
+        if streaming:
+            self._carregar_de_csv_em_blocos(caminho_csv, tamanho_bloco, limite_memoria_mb, ao_progresso)
+        else:
+            self._carregar_de_csv(caminho_csv)
+        if diretorio_base and self.base is not None:
+            self.base.salvar(diretorio_base)
+            self.definir_base(BaseNotas.abrir(diretorio_base))
         print("Carga de dados completa.")
     
+    def definir_base(self, base):
+        #Liga a BaseNotas no catálogo e faz cada disciplina virar uma visão da sua coluna
+        self.base = base
+        for codigo, disciplina in self.disciplinas.items():
+            disciplina._base = base if codigo in base.coluna else None
+
+    def ras_ordenados(self):
+        #Todos os RAs que têm pelo menos um registro, em ordem
+        if self.base is not None:
+            return self.base.ras.tolist()
+        return sorted({r['ra'] for d in self.disciplinas.values() for r in d.registros})
+
+    def linhas_dos_ras(self, ras):
+        #Linha de cada RA na base (-1 = RA sem registro)
+        if self.base is None:
+            return np.full(len(ras), -1, dtype=np.int64)
+        return self.base.linhas_dos_ras(ras)
+
+    def notas_da_disciplina(self, codigo, linhas=None):
+        #Coluna inteira do mapa de calor: última nota de cada aluno (NaN = não cursou).
+        #linhas vem do linhas_dos_ras, pra escolher/ordenar os alunos
+        if self.base is not None and codigo in self.base.coluna:
+            return self.base.coluna_notas(codigo, linhas)
+        return np.full(0 if linhas is None else len(linhas), np.nan)
+
+    def matriz_notas(self, codigos, linhas=None):
+        #Últimas notas (alunos × disciplinas, na ordem de 'codigos'). NaN = não cursou ou disciplina sem registros.
+        #Recorte das colunas da matriz de notas da base nas linhas pedidas (linhas do linhas_dos_ras; None = todos)
+        n = len(self.base.ras) if linhas is None and self.base is not None else (0 if linhas is None else len(linhas))
+        matriz = np.full((n, len(codigos)), np.nan)
+        for j, codigo in enumerate(codigos):
+            if self.base is not None and codigo in self.base.coluna:
+                matriz[:, j] = self.base.coluna_notas(codigo, linhas)
+        return matriz
+
+    def resumo_retencao(self):
+        #{codigo: {alunos, refizeram, retidos, tentativas}} calculado de uma vez para todas as disciplinas
+        if self.base is None:
+            return {}
+        resumo = self.base.resumo_retencao()
+        return {
+            codigo: {chave: int(valores[j]) for chave, valores in resumo.items()}
+            for j, codigo in enumerate(self.base.codigos)
+        }
+
+    def estatisticas_disciplina(self, codigo):
+        #Resumo da última tentativa dos alunos numa disciplina (lê só os pares dela)
+        if self.base is not None and codigo in self.base.coluna:
+            notas = self.base.notas_de_quem_cursou(codigo)
+        else:
+            notas = np.empty(0)
+        notas = notas[~np.isnan(notas)]
+        if notas.size == 0:
+            return {"alunos": 0, "media": None, "aprovados": 0}
+        aprovados = int((notas >= _nota_aprovacao()).sum())
+        return {"alunos": int(notas.size), "media": float(notas.mean()), "aprovados": aprovados}
+
     def get_disciplina(self, codigo):
         # Busca e retorna o código da disciplina
         return self.disciplinas.get(codigo)
@@ -0,0 +1,317 @@
+# mosaico.py -> exporta o grafo como uma pirâmide de tiles Deep Zoom (DZI), pra abrir em visualizadores de zoom
+#
+# - A imagem "cheia" é a figura do viz.desenhar_grafo_em_camadas no dpi pedido, que pode ser enorme
+# - Ela nunca é rasterizada inteira: cada tile (ex.: 256x256) é desenhado sozinho, com os limites do eixo
+#   ajustados pra região dele. O RecorteVisivel/ColecaoSetas do viz só desenham o que cruza o tile,
+#   então a memória de cada processo depende do tamanho do tile e não do tamanho da figura
+# - Cada nível da pirâmide tem metade da resolução do seguinte (o dpi cai junto, igual a um zoom out);
+#   os níveis pequenos demais pra desenhar (dpi < DPI_MINIMO) são a redução dos tiles do nível de cima
+# - Os tiles são divididos entre processos; cada um monta a figura uma vez (catálogo aberto do cache)
+#
+# Saída (formato Deep Zoom, abre no OpenSeadragon e afins):
+#   <saida>/<nome>.dzi
+#   <saida>/<nome>_files/<nivel>/<coluna>_<linha>.png
+#
+# Uso:
+#   python mosaico.py curriculo.xml turma.csv --saida mosaico --dpi 200 --processos 4
+
+import matplotlib
+matplotlib.use("Agg")  # antes de importar o viz: roda sem display
+
+import os
+import sys
+import math
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.image import imsave, imread
+
+import cache
+import viz
+import instrumentacao
+
+TAMANHO_TILE_PADRAO = 256
+
+#Abaixo desse dpi os textos ficam com menos de 1 pixel (e o FreeType nem aceita desenhar):
+#os níveis menores são montados reduzindo os tiles do nível de cima, como nos geradores de Deep Zoom
+DPI_MINIMO = 20
+
+# A figura do processo (montada uma vez no initializer do pool)
+_mosaico = None
+
+
+class PiramideDZI:
+    """
+    Geometria da pirâmide Deep Zoom: nível 0 = 1 pixel, último nível = imagem cheia (largura x altura),
+    cada nível com o dobro da resolução do anterior, cortado em tiles de tamanho_tile
+    (+ sobreposicao pixels repetidos nas bordas internas).
+    """
+    def __init__(self, largura, altura, tamanho_tile=TAMANHO_TILE_PADRAO, sobreposicao=0):
+        self.largura = largura
+        self.altura = altura
+        self.tamanho_tile = tamanho_tile
+        self.sobreposicao = sobreposicao
+        self.niveis = int(math.ceil(math.log2(max(largura, altura, 1)))) + 1
+
+    def tamanho_nivel(self, nivel):
+        #Tamanho (largura, altura) em pixels da imagem do nível
+        escala = 2 ** (self.niveis - 1 - nivel)
+        return max(1, math.ceil(self.largura / escala)), max(1, math.ceil(self.altura / escala))
+
+    def grade_nivel(self, nivel):
+        #Número de (colunas, linhas) de tiles do nível
+        largura, altura = self.tamanho_nivel(nivel)
+        return math.ceil(largura / self.tamanho_tile), math.ceil(altura / self.tamanho_tile)
+
+    def retangulo_tile(self, nivel, coluna, linha):
+        #(x0, y0, x1, y1) do tile em pixels do nível, já com a sobreposição
+        largura, altura = self.tamanho_nivel(nivel)
+        t, s = self.tamanho_tile, self.sobreposicao
+        return (max(0, coluna * t - s), max(0, linha * t - s),
+                min(largura, (coluna + 1) * t + s), min(altura, (linha + 1) * t + s))
+
+    def tiles_nivel(self, nivel):
+        colunas, linhas = self.grade_nivel(nivel)
+        return [(nivel, c, l) for c in range(colunas) for l in range(linhas)]
+
+    def descritor_dzi(self, formato="png"):
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" TileSize="{self.tamanho_tile}" '
+                f'Overlap="{self.sobreposicao}" Format="{formato}">\n'
+                f'  <Size Width="{self.largura}" Height="{self.altura}"/>\n'
+                '</Image>\n')
+
+
+class RenderizadorTiles:
+    """
+    Desenha tiles da figura do grafo sem rasterizar a figura inteira.
+
+    - piramide: PiramideDZI da imagem cheia (a figura no dpi pedido)
+    - nivel_minimo: primeiro nível desenhado direto (dpi >= DPI_MINIMO), os de baixo são reduzidos
+    - tile(nivel, coluna, linha): imagem RGBA (array numpy) daquele tile
+    """
+    def __init__(self, catalogo, ordem='decrescente', dpi=100, tamanho_tile=TAMANHO_TILE_PADRAO, sobreposicao=0):
+        grafo = viz.criar_grafo_do_catalogo(catalogo)
+        self.figura = viz.desenhar_grafo_em_camadas(grafo, catalogo, ordem, catalogo.ras_ordenados())
+        self.dpi = dpi
+
+        largura_pol, altura_pol = self.figura.get_size_inches()
+        self.largura = int(round(largura_pol * dpi))
+        self.altura = int(round(altura_pol * dpi))
+        self.piramide = PiramideDZI(self.largura, self.altura, tamanho_tile, sobreposicao)
+        ultimo = self.piramide.niveis - 1
+        self.nivel_minimo = next((n for n in range(ultimo + 1) if dpi * self._escala(n) >= DPI_MINIMO), ultimo)
+
+        # Onde o eixo fica na imagem cheia (fração da figura) e quais dados ele mostra,
+        # pra converter um retângulo de pixels em limites do eixo
+        self.ax = self.figura.axes[0]
+        posicao = self.ax.get_position()
+        self.eixo_px = (posicao.x0 * self.largura, posicao.y0 * self.altura,
+                        posicao.width * self.largura, posicao.height * self.altura)
+        self.xlim = self.ax.get_xlim()
+        self.ylim = self.ax.get_ylim()
+
+        # O título da figura fica fora do eixo e não entra nos tiles; o eixo passa a ocupar o tile inteiro
+        self.ax.set_title("")
+        self.ax.set_position([0, 0, 1, 1])
+        self.canvas = FigureCanvasAgg(self.figura)
+
+    def _escala(self, nivel):
+        return self.piramide.tamanho_nivel(nivel)[0] / self.largura if self.largura else 1.0
+
+    def _limites(self, px0, py0, px1, py1):
+        # Pixels da imagem cheia (y pra baixo) -> limites do eixo em coordenadas de dados
+        ex, ey, elargura, ealtura = self.eixo_px
+        (x0, x1), (y0, y1) = self.xlim, self.ylim
+        def para_x(px):
+            return x0 + (px - ex) / elargura * (x1 - x0)
+        def para_y(py):
+            return y0 + (self.altura - py - ey) / ealtura * (y1 - y0)
+        return (para_x(px0), para_x(px1)), (para_y(py1), para_y(py0))
+
+    def tile(self, nivel, coluna, linha):
+        escala = self._escala(nivel)
+        x0, y0, x1, y1 = self.piramide.retangulo_tile(nivel, coluna, linha)
+
+        # O dpi cai junto com o nível, então textos e linhas ficam proporcionais como num zoom out
+        dpi = self.dpi * escala
+        self.figura.set_dpi(dpi)
+        self.figura.set_size_inches((x1 - x0) / dpi, (y1 - y0) / dpi)
+        xlim, ylim = self._limites(x0 / escala, y0 / escala, x1 / escala, y1 / escala)
+        self.ax.set_xlim(xlim)
+        self.ax.set_ylim(ylim)
+
+        self.canvas.draw()
+        imagem = np.asarray(self.canvas.buffer_rgba())
+        # O Agg arredonda o tamanho da figura pra pixels inteiros: garante o tamanho exato do tile
+        imagem = imagem[:y1 - y0, :x1 - x0]
+        falta_y, falta_x = (y1 - y0) - imagem.shape[0], (x1 - x0) - imagem.shape[1]
+        if falta_y or falta_x:
+            imagem = np.pad(imagem, ((0, falta_y), (0, falta_x), (0, 0)), mode="edge")
+        return imagem
+
+
+def reduzir_tile(piramide, pasta, nivel, coluna, linha, formato="png"):
+    """
+    Monta um tile de um nível abaixo do nivel_minimo juntando (sem sobreposição) os tiles do nível
+    de cima que cobrem a mesma região e reduzindo pela metade (média de 2x2 pixels).
+    Só abre os tiles filhos (no máximo uns 3x3), então a memória continua do tamanho de um tile.
+    """
+    x0, y0, x1, y1 = piramide.retangulo_tile(nivel, coluna, linha)
+    acima = nivel + 1
+    largura_acima, altura_acima = piramide.tamanho_nivel(acima)
+    ax0, ay0 = 2 * x0, 2 * y0
+    ax1, ay1 = min(2 * x1, largura_acima), min(2 * y1, altura_acima)
+    regiao = np.zeros((ay1 - ay0, ax1 - ax0, 4), dtype=np.float32)
+
+    t = piramide.tamanho_tile
+    for c in range(ax0 // t, (ax1 - 1) // t + 1):
+        for l in range(ay0 // t, (ay1 - 1) // t + 1):
+            filho = imread(os.path.join(pasta, str(acima), f"{c}_{l}.{formato}"))
+            if filho.dtype == np.uint8:
+                filho = filho / 255.0
+            if filho.shape[2] == 3:
+                filho = np.dstack([filho, np.ones(filho.shape[:2])])
+            # Região do filho no nível de cima e a parte dela que cai dentro desta região
+            fx0, fy0, _, _ = piramide.retangulo_tile(acima, c, l)
+            cx0, cy0 = max(ax0, c * t), max(ay0, l * t)
+            cx1, cy1 = min(ax1, (c + 1) * t), min(ay1, (l + 1) * t)
+            regiao[cy0 - ay0:cy1 - ay0, cx0 - ax0:cx1 - ax0] = filho[cy0 - fy0:cy1 - fy0, cx0 - fx0:cx1 - fx0]
+
+    # Tamanho ímpar: repete a última linha/coluna antes de tirar a média de 2x2
+    alvo_y, alvo_x = y1 - y0, x1 - x0
+    regiao = np.pad(regiao, ((0, 2 * alvo_y - regiao.shape[0]), (0, 2 * alvo_x - regiao.shape[1]), (0, 0)), mode="edge")
+    reduzida = regiao.reshape(alvo_y, 2, alvo_x, 2, 4).mean(axis=(1, 3))
+    return (np.clip(reduzida, 0, 1) * 255).round().astype(np.uint8)
+
+
+def _salvar_imagem(arquivo, imagem, formato):
+    if formato == "png":
+        imsave(arquivo, imagem, format="png", pil_kwargs={"compress_level": 1})
+    else:
+        # JPEG não tem transparência
+        imsave(arquivo, np.ascontiguousarray(imagem[:, :, :3]), format="jpeg")
+
+
+def _iniciar_processo(caminho_cache, caminho_xml, caminho_csv, diretorio_cache, ordem, dpi, tamanho_tile, sobreposicao):
+    global _mosaico
+    catalogo = cache.carregar_catalogo_do_cache(caminho_cache)
+    if catalogo is None:
+        catalogo = cache.carregar_catalogo(caminho_xml, caminho_csv, diretorio_cache)
+    _mosaico = RenderizadorTiles(catalogo, ordem, dpi, tamanho_tile, sobreposicao)
+
+
+def _renderizar_tiles(tiles, pasta, formato):
+    # Roda no processo do pool: grava os tiles desenhados e retorna (quantidade, segundos)
+    inicio = time.perf_counter()
+    for nivel, coluna, linha in tiles:
+        _salvar_imagem(os.path.join(pasta, str(nivel), f"{coluna}_{linha}.{formato}"),
+                       _mosaico.tile(nivel, coluna, linha), formato)
+    instrumentacao.gravar_processo()
+    return len(tiles), time.perf_counter() - inicio
+
+
+def _reduzir_tiles(tiles, pasta, formato):
+    # Roda no processo do pool: grava os tiles reduzidos (de um nível abaixo do nivel_minimo)
+    inicio = time.perf_counter()
+    for nivel, coluna, linha in tiles:
+        _salvar_imagem(os.path.join(pasta, str(nivel), f"{coluna}_{linha}.{formato}"),
+                       reduzir_tile(_mosaico.piramide, pasta, nivel, coluna, linha, formato), formato)
+    instrumentacao.gravar_processo()
+    return len(tiles), time.perf_counter() - inicio
+
+
+def _em_trabalhos(tiles, tamanho):
+    return [tiles[i:i + tamanho] for i in range(0, len(tiles), tamanho)]
+
+
+def exportar_mosaico(caminho_xml, caminho_csv, saida, nome="grafo", ordem='decrescente', dpi=100,
+                     tamanho_tile=TAMANHO_TILE_PADRAO, sobreposicao=0, formato="png", processos=None,
+                     diretorio_cache=None, tiles_por_trabalho=32):
+    """
+    Gera a pirâmide Deep Zoom do grafo em saida/<nome>.dzi + saida/<nome>_files/.
+    Os níveis a partir do nivel_minimo são desenhados direto (em paralelo, tile a tile); os de baixo
+    são reduzidos do nível de cima, um nível por vez (também em paralelo dentro do nível).
+    Retorna um dicionário com o tamanho da imagem cheia, o número de níveis/tiles e os tempos,
+    ou None se o XML/CSV não existir ou o XML não tiver disciplinas (aí nada é gravado).
+    """
+    inicio = time.perf_counter()
+    faltando = cache.arquivos_faltando(caminho_xml, caminho_csv)
+    if faltando:
+        print(f"Erro: arquivo não encontrado: {', '.join(faltando)}")
+        return None
+    # Lê o XML/CSV uma vez aqui (ou acha o cache válido): os processos só abrem o cache pronto
+    catalogo = cache.carregar_catalogo(caminho_xml, caminho_csv, diretorio_cache)
+    if not catalogo.disciplinas:
+        print(f"Erro: nenhuma disciplina no XML '{caminho_xml}'.")
+        return None
+    caminho = cache.caminho_cache(caminho_xml, caminho_csv, diretorio_cache)
+
+    # Monta a figura aqui também, só pra saber o tamanho da pirâmide e escrever o .dzi
+    referencia = RenderizadorTiles(catalogo, ordem, dpi, tamanho_tile, sobreposicao)
+    piramide, nivel_minimo = referencia.piramide, referencia.nivel_minimo
+    del referencia
+    pasta = os.path.join(saida, f"{nome}_files")
+    for nivel in range(piramide.niveis):
+        os.makedirs(os.path.join(pasta, str(nivel)), exist_ok=True)
+    with open(os.path.join(saida, f"{nome}.dzi"), "w", encoding="utf-8") as f:
+        f.write(piramide.descritor_dzi(formato))
+
+    desenhados = [t for n in range(nivel_minimo, piramide.niveis) for t in piramide.tiles_nivel(n)]
+    print(f"Imagem cheia: {piramide.largura}x{piramide.altura} px, {piramide.niveis} níveis "
+          f"({len(desenhados)} tiles desenhados nos níveis {nivel_minimo}-{piramide.niveis - 1}, "
+          f"níveis 0-{nivel_minimo - 1} reduzidos), tiles de {tamanho_tile} px")
+
+    feitos = {"desenhados": 0, "reduzidos": 0}
+    tempos = {}
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo,
+                             initargs=(caminho, caminho_xml, caminho_csv, diretorio_cache,
+                                       ordem, dpi, tamanho_tile, sobreposicao)) as pool:
+        inicio_etapa = time.perf_counter()
+        trabalhos = _em_trabalhos(desenhados, tiles_por_trabalho)
+        for quantidade, _ in pool.map(_renderizar_tiles, trabalhos, [pasta] * len(trabalhos), [formato] * len(trabalhos)):
+            feitos["desenhados"] += quantidade
+        tempos["desenhar"] = time.perf_counter() - inicio_etapa
+
+        # Cada nível reduzido depende do de cima, então vai do maior pro menor
+        inicio_etapa = time.perf_counter()
+        for nivel in range(nivel_minimo - 1, -1, -1):
+            trabalhos = _em_trabalhos(piramide.tiles_nivel(nivel), tiles_por_trabalho)
+            for quantidade, _ in pool.map(_reduzir_tiles, trabalhos, [pasta] * len(trabalhos), [formato] * len(trabalhos)):
+                feitos["reduzidos"] += quantidade
+        tempos["reduzir"] = time.perf_counter() - inicio_etapa
+    tempo_total = time.perf_counter() - inicio
+
+    taxa = feitos["desenhados"] / tempos["desenhar"] if tempos["desenhar"] > 0 else 0
+    print(f"{feitos['desenhados']} tiles desenhados em {tempos['desenhar']:.2f}s ({taxa:.1f} tiles/s), "
+          f"{feitos['reduzidos']} reduzidos em {tempos['reduzir']:.2f}s, total {tempo_total:.2f}s")
+    return {"largura": piramide.largura, "altura": piramide.altura, "niveis": piramide.niveis,
+            "nivel_minimo": nivel_minimo, "tiles": feitos, "tempos": tempos, "tempo_total": tempo_total}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta o grafo como uma pirâmide de tiles Deep Zoom (.dzi).")
+    parser.add_argument("xml", help="XML do currículo")
+    parser.add_argument("csv", help="CSV da turma (GradeGen)")
+    parser.add_argument("--saida", default="mosaico", help="pasta de saída")
+    parser.add_argument("--nome", default="grafo", help="nome do .dzi (e da pasta <nome>_files)")
+    parser.add_argument("--ordem", default="decrescente", choices=list(viz.ORDENS_MAPA), help="ordem do mapa de calor")
+    parser.add_argument("--dpi", type=int, default=100, help="dpi da imagem cheia (nível mais alto)")
+    parser.add_argument("--tamanho-tile", type=int, default=TAMANHO_TILE_PADRAO)
+    parser.add_argument("--sobreposicao", type=int, default=0, help="pixels repetidos na borda de cada tile")
+    parser.add_argument("--formato", default="png", choices=["png", "jpg"])
+    parser.add_argument("--processos", type=int, default=None, help="número de processos (padrão: número de CPUs)")
+    parser.add_argument("--cache-dir", default=None, help="pasta do cache (padrão: TCC2025_CACHE_DIR ou ~/.cache/tcc2025)")
+    args = parser.parse_args(argv)
+
+    print("=== Exportação Deep Zoom ===")
+    os.makedirs(args.saida, exist_ok=True)
+    resultado = exportar_mosaico(args.xml, args.csv, args.saida, args.nome, args.ordem, args.dpi,
+                                 args.tamanho_tile, args.sobreposicao, args.formato, args.processos, args.cache_dir)
+    return 1 if resultado is None else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# planejamento.py -> consultas de planejamento pra turma inteira de uma vez (sem laço por aluno)
+#
+# - Elegibilidade: quais disciplinas cada aluno pode cursar agora (todos os pré-requisitos aprovados)
+# - ProjecaoConclusao: quantos semestres, no mínimo, faltam pra cada aluno se formar
+#
+# As contas são feitas em matrizes aluno × disciplina (numpy) em cima da BaseNotas do catálogo
+# e do grafo de pré-requisitos do viz.criar_grafo_do_catalogo.
+
+import numpy as np
+from indices_grafo import IndiceCaminhos
+
+#Nota mínima da última tentativa pra considerar a disciplina aprovada
+NOTA_APROVACAO = 6.0
+
+
+def matriz_pre_requisitos(grafo, codigos):
+    #Matriz P (disciplinas × disciplinas) com P[i, j] = 1 se codigos[i] é pré-requisito direto de codigos[j]
+    posicao = {c: i for i, c in enumerate(codigos)}
+    P = np.zeros((len(codigos), len(codigos)), dtype=np.float32)
+    for u, v in grafo.edges():
+        if u in posicao and v in posicao:
+            P[posicao[u], posicao[v]] = 1.0
+    return P
+
+
+def conferir_cadeias(catalogo, indice_caminhos):
+    """
+    Compara o no_cadeia_pre_requisito do XML com a cadeia calculada no grafo (IndiceCaminhos.entrada,
+    número de pré-requisitos no maior caminho que termina na disciplina).
+    Retorna {codigo: (valor_do_xml, valor_do_grafo)} só das que não batem (sem o valor no XML não confere)
+    """
+    divergentes = {}
+    for codigo, calculada in indice_caminhos.entrada.items():
+        disciplina = catalogo.get_disciplina(codigo)
+        cadeia = disciplina.cadeia_pre_requisito if disciplina is not None else None
+        if cadeia is not None and cadeia != calculada:
+            divergentes[codigo] = (cadeia, calculada)
+    return divergentes
+
+
+class Elegibilidade:
+    """
+    Elegibilidade da turma inteira, calculada de uma vez.
+
+    - codigos: disciplinas (colunas), ras: alunos (linhas)
+    - aprovado[a, d]: a última nota do aluno a na disciplina d é >= NOTA_APROVACAO
+    - cursou[a, d]: o aluno tem pelo menos uma tentativa em d
+    - elegivel[a, d]: todos os pré-requisitos de d estão aprovados pro aluno a
+    """
+    def __init__(self, catalogo, grafo, ra_sequencia=None, nota_aprovacao=NOTA_APROVACAO):
+        self.codigos = sorted(grafo.nodes())
+        self.ras = list(ra_sequencia) if ra_sequencia is not None else catalogo.ras_ordenados()
+        linhas = catalogo.linhas_dos_ras(self.ras)
+
+        notas = catalogo.matriz_notas(self.codigos, linhas)
+        self.cursou = ~np.isnan(notas)
+        self.aprovado = np.nan_to_num(notas, nan=-1.0) >= nota_aprovacao
+
+        # Quantos pré-requisitos diretos ainda faltam: (não aprovados) @ P. Elegível = não falta nenhum
+        P = matriz_pre_requisitos(grafo, self.codigos)
+        faltando = (~self.aprovado).astype(np.float32) @ P
+        self.elegivel = faltando == 0
+        self._posicoes = None  # RA -> linha, montado na primeira consulta individual
+
+    def elegiveis_nao_cursadas(self):
+        #Matriz aluno × disciplina: pode cursar e ainda não cursou nenhuma vez
+        return self.elegivel & ~self.cursou
+
+    def contagens(self):
+        #{codigo: {elegiveis, elegiveis_nao_cursaram, aprovados}} somando a turma inteira
+        elegiveis = self.elegivel.sum(axis=0)
+        novos = self.elegiveis_nao_cursadas().sum(axis=0)
+        aprovados = self.aprovado.sum(axis=0)
+        return {
+            codigo: {"elegiveis": int(elegiveis[j]), "elegiveis_nao_cursaram": int(novos[j]),
+                     "aprovados": int(aprovados[j])}
+            for j, codigo in enumerate(self.codigos)
+        }
+
+    def disciplinas_elegiveis(self, ra, so_nao_cursadas=True):
+        #Lista de códigos que o aluno pode cursar agora
+        if self._posicoes is None:
+            self._posicoes = {ra: i for i, ra in enumerate(self.ras)}
+        if ra not in self._posicoes:
+            return []
+        i = self._posicoes[ra]
+        linha = self.elegivel[i] & ~self.cursou[i] if so_nao_cursadas else self.elegivel[i]
+        return [c for c, ok in zip(self.codigos, linha) if ok]
+
+
+class ProjecaoConclusao:
+    """
+    Projeção do tempo até a formatura pra turma inteira de uma vez.
+
+    Para cada aluno, o mínimo de semestres que ainda faltam considerando:
+    - as disciplinas já aprovadas (última nota >= nota_aprovacao);
+    - a cadeia de pré-requisitos: uma disciplina só pode ser feita no semestre seguinte
+      ao término do último pré-requisito (é o caminho crítico do grafo, mas só com o que falta);
+    - a paridade do semestre de oferta (sem_offer ímpar = só no 1º semestre do ano, par = só no 2º).
+    Não tem limite de créditos por semestre, então é um limite inferior.
+
+    As disciplinas são percorridas na ordem topológica do IndiceCaminhos e cada passo é
+    uma operação vetorizada em cima de todos os alunos.
+
+    - semestres_cursados: quantos semestres cada aluno já fez (número ou array). Se não vier,
+      é estimado pelo maior sem_offer entre as disciplinas que o aluno já cursou
+    - proximo_semestre_impar: True se o próximo semestre é o 1º do ano
+    """
+    def __init__(self, catalogo, grafo, ra_sequencia=None, semestres_cursados=None,
+                 proximo_semestre_impar=True, nota_aprovacao=NOTA_APROVACAO, indice_caminhos=None):
+        indice = indice_caminhos or IndiceCaminhos(grafo)
+        self.codigos = list(indice.ordem)
+        # A projeção usa a cadeia do grafo; se o XML disser outra coisa, avisa (pré-requisito faltando no XML?)
+        self.cadeias_divergentes = conferir_cadeias(catalogo, indice)
+        if self.cadeias_divergentes:
+            exemplos = ", ".join(f"{c} (XML {x}, grafo {g})" for c, (x, g) in list(self.cadeias_divergentes.items())[:5])
+            print(f"Aviso: no_cadeia_pre_requisito do XML difere do grafo em "
+                  f"{len(self.cadeias_divergentes)} disciplina(s): {exemplos}")
+        self.ras = list(ra_sequencia) if ra_sequencia is not None else catalogo.ras_ordenados()
+        posicao = {c: j for j, c in enumerate(self.codigos)}
+
+        notas = catalogo.matriz_notas(self.codigos, catalogo.linhas_dos_ras(self.ras))
+        aprovado = np.nan_to_num(notas, nan=-1.0) >= nota_aprovacao
+        semestres_offer = np.array([grafo.nodes[c].get('semestre', 0) or 0 for c in self.codigos])
+
+        # termino[a, d] = em qual semestre (contando a partir do próximo = 1) o aluno a termina d; 0 = já aprovado
+        termino = np.zeros(notas.shape, dtype=np.int32)
+        for j, codigo in enumerate(self.codigos):
+            pre = [posicao[p] for p in grafo.predecessors(codigo) if posicao[p] < j]
+            inicio = termino[:, pre].max(axis=1) + 1 if pre else np.ones(len(self.ras), dtype=np.int32)
+            sem = semestres_offer[j]
+            if sem > 0:
+                # Semestre relativo k é ímpar no ano quando (k ímpar) == proximo_semestre_impar
+                paridade = sem % 2 if proximo_semestre_impar else 1 - sem % 2
+                inicio = inicio + (inicio % 2 != paridade)
+            termino[:, j] = np.where(aprovado[:, j], 0, inicio)
+
+        self.termino = termino
+        self.semestres_restantes = termino.max(axis=1) if termino.size else np.zeros(len(self.ras), dtype=np.int32)
+
+        if semestres_cursados is None:
+            cursou = ~np.isnan(notas)
+            semestres_cursados = np.where(cursou, semestres_offer[None, :], 0).max(axis=1) if cursou.size else 0
+        self.semestres_cursados = np.broadcast_to(np.asarray(semestres_cursados), (len(self.ras),))
+
+        # Prazo máximo em semestres (max_years do XML). Sem prazo no XML ninguém é marcado
+        self.limite_semestres = 2 * catalogo.max_anos if catalogo.max_anos else None
+        if self.limite_semestres is None:
+            self.em_risco = np.zeros(len(self.ras), dtype=bool)
+        else:
+            self.em_risco = self.semestres_cursados + self.semestres_restantes > self.limite_semestres
+
+    def resumo(self):
+        #Números da turma: alunos, em risco de estourar o prazo e a distribuição dos semestres restantes
+        restantes = self.semestres_restantes
+        return {
+            "alunos": len(self.ras),
+            "em_risco": int(self.em_risco.sum()),
+            "limite_semestres": self.limite_semestres,
+            "mediana_restantes": float(np.median(restantes)) if len(restantes) else None,
+            "maximo_restantes": int(restantes.max()) if len(restantes) else None,
+        }
+
+    def ras_em_risco(self):
+        #RAs de quem não consegue terminar dentro do max_years nem no melhor caso
+        return [ra for ra, risco in zip(self.ras, self.em_risco) if risco]
@@ -0,0 +1,191 @@
+# relatorios.py -> uma imagem por aluno: o grafo do curso com só as notas daquele aluno coloridas
+#
+# - O grafo é desenhado UMA vez por processo, com todos os quadradinhos dos mapas de calor apagados (cinza)
+# - O fundo pronto fica guardado (copy_from_bbox); para cada aluno só é desenhada por cima uma coleção
+#   com um quadradinho por disciplina (a posição do aluno na ordem 'ra') e o texto com o RA
+# - Os alunos são divididos entre processos (ProcessPoolExecutor), cada um abre o catálogo do cache (memmap)
+#
+# Uso:
+#   python relatorios.py curriculo.xml turma.csv --saida relatorios --processos 4
+#   python relatorios.py curriculo.xml turma.csv --ras 123 456 789
+
+import matplotlib
+matplotlib.use("Agg")  # antes de importar o viz: roda sem display
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.image import imsave
+
+import cache
+import viz
+import instrumentacao
+
+#Cor dos quadradinhos dos outros alunos
+COR_APAGADA = '#EEEEEE'
+
+#Quantos alunos cada processo pega de uma vez
+TAMANHO_LOTE_ALUNOS = 64
+
+# O gerador do processo (montado uma vez no initializer do pool)
+_gerador = None
+
+
+class GeradorRelatorios:
+    """
+    Desenha o grafo estático uma vez e gera as variantes por aluno só trocando as cores dos quadradinhos.
+
+    - ras: RAs da turma na ordem dos mapas de calor (a posição i é o quadradinho i de cada disciplina)
+    - salvar(ra, arquivo): grava o PNG do aluno
+    """
+    def __init__(self, catalogo, ras=None, dpi=100):
+        self.catalogo = catalogo
+        self.ras = list(ras) if ras is not None else catalogo.ras_ordenados()
+        self.posicao = {ra: i for i, ra in enumerate(self.ras)}
+        grafo = viz.criar_grafo_do_catalogo(catalogo)
+
+        # Ordem 'ra': o aluno i fica sempre no quadradinho i, em todas as disciplinas.
+        # Sem nível de detalhe: o relatório precisa dos quadradinhos mesmo com a turma grande
+        self.figura = viz.desenhar_grafo_em_camadas(grafo, catalogo, 'ra', self.ras, limite_alunos=None)
+        self.figura.set_dpi(dpi)
+        ax = self.figura.axes[0]
+
+        # Cantos de cada quadradinho e notas de cada disciplina, pra montar a camada do aluno depois
+        self.cantos = {}
+        self.notas = {}
+        for mapa in ax.artists:
+            gid = mapa.get_gid()
+            if not gid or not gid.startswith("mapa:"):
+                continue
+            node = gid[len("mapa:"):]
+            self.cantos[node] = mapa.cantos()
+            self.notas[node] = mapa.notas
+            mapa.colorir(COR_APAGADA)
+        self.nodes = list(self.cantos)
+
+        # Camada do aluno: um quadradinho por disciplina + o RA no topo, fora do desenho normal
+        self.camada = PolyCollection([], edgecolors='black', linewidths=0.8, zorder=4.5, animated=True)
+        ax.add_collection(self.camada, autolim=False)
+        self.titulo = self.figura.text(0.01, 0.99, "", ha='left', va='top', fontsize=16,
+                                       fontweight='bold', animated=True)
+
+        # Desenha tudo uma vez e guarda o fundo
+        self.canvas = FigureCanvasAgg(self.figura)
+        self.canvas.draw()
+        self.fundo = self.canvas.copy_from_bbox(self.figura.bbox)
+
+    def desenhar_aluno(self, ra):
+        #Pinta o aluno por cima do fundo e retorna a imagem RGBA (array numpy)
+        i = self.posicao[ra]
+        self.camada.set_verts([self.cantos[n][i] for n in self.nodes])
+        self.camada.set_facecolor(viz.cores_das_notas(np.array([self.notas[n][i] for n in self.nodes])))
+        self.titulo.set_text(f"RA {ra}")
+
+        self.canvas.restore_region(self.fundo)
+        self.figura.draw_artist(self.camada)
+        self.figura.draw_artist(self.titulo)
+        return np.asarray(self.canvas.buffer_rgba())
+
+    def salvar(self, ra, arquivo):
+        # Quase todo o tempo de um relatório é a compressão do PNG: nível 1 é bem mais rápido e o arquivo
+        # fica só um pouco maior (a imagem é quase toda de cores chapadas)
+        imsave(arquivo, self.desenhar_aluno(ra), format="png", pil_kwargs={"compress_level": 1})
+
+
+def _iniciar_processo(caminho_cache, caminho_xml, caminho_csv, diretorio_cache, ras, dpi):
+    global _gerador
+    catalogo = cache.carregar_catalogo_do_cache(caminho_cache)
+    if catalogo is None:
+        catalogo = cache.carregar_catalogo(caminho_xml, caminho_csv, diretorio_cache)
+    _gerador = GeradorRelatorios(catalogo, ras, dpi)
+
+
+def _gerar_lote(ras, saida):
+    # Roda no processo do pool: um PNG por RA, retorna (quantidade, segundos, pid)
+    inicio = time.perf_counter()
+    for ra in ras:
+        _gerador.salvar(ra, os.path.join(saida, f"{ra}.png"))
+    instrumentacao.gravar_processo()
+    return len(ras), time.perf_counter() - inicio, os.getpid()
+
+
+def gerar_relatorios(caminho_xml, caminho_csv, saida, ras=None, processos=None, dpi=100, diretorio_cache=None):
+    """
+    Gera saida/<RA>.png para cada RA (padrão: todos os alunos da turma) usando 'processos' processos.
+    Retorna um dicionário com o total de relatórios, o tempo e a taxa (relatórios por segundo),
+    ou None se o XML/CSV não existir ou o XML não tiver disciplinas (aí nenhum processo é aberto).
+    """
+    inicio = time.perf_counter()
+    faltando = cache.arquivos_faltando(caminho_xml, caminho_csv)
+    if faltando:
+        print(f"Erro: arquivo não encontrado: {', '.join(faltando)}")
+        return None
+    # Lê o XML/CSV uma vez aqui (ou acha o cache válido): os processos só abrem o cache pronto
+    catalogo = cache.carregar_catalogo(caminho_xml, caminho_csv, diretorio_cache)
+    if not catalogo.disciplinas:
+        print(f"Erro: nenhuma disciplina no XML '{caminho_xml}'.")
+        return None
+    caminho = cache.caminho_cache(caminho_xml, caminho_csv, diretorio_cache)
+    turma = catalogo.ras_ordenados()
+    if ras is None:
+        ras = turma
+    else:
+        existentes = set(turma)
+        faltando = [ra for ra in ras if ra not in existentes]
+        if faltando:
+            print(f"Aviso: {len(faltando)} RAs não estão no CSV e foram ignorados: {faltando[:10]}")
+        ras = [ra for ra in ras if ra in existentes]
+    os.makedirs(saida, exist_ok=True)
+    tempo_carga = time.perf_counter() - inicio
+
+    lotes = [ras[i:i + TAMANHO_LOTE_ALUNOS] for i in range(0, len(ras), TAMANHO_LOTE_ALUNOS)]
+    inicio_geracao = time.perf_counter()
+    por_processo = {}
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo,
+                             initargs=(caminho, caminho_xml, caminho_csv, diretorio_cache, turma, dpi)) as pool:
+        for quantidade, segundos, pid in pool.map(_gerar_lote, lotes, [saida] * len(lotes)):
+            feitos, tempo = por_processo.get(pid, (0, 0.0))
+            por_processo[pid] = (feitos + quantidade, tempo + segundos)
+    tempo_geracao = time.perf_counter() - inicio_geracao
+
+    total = len(ras)
+    taxa = total / tempo_geracao if tempo_geracao > 0 else 0.0
+    print("\n--- Resumo dos Relatórios ---")
+    for pid, (feitos, tempo) in sorted(por_processo.items()):
+        print(f"Processo {pid}: {feitos} relatórios, {feitos / tempo if tempo > 0 else 0:.1f}/s (sem contar o desenho inicial)")
+    print(f"Carga/cache: {tempo_carga:.2f}s")
+    print(f"{total} relatórios em {tempo_geracao:.2f}s -> {taxa:.1f} relatórios/s")
+    print("-----------------------------")
+    return {"relatorios": total, "tempo_carga": tempo_carga, "tempo_geracao": tempo_geracao, "relatorios_por_segundo": taxa}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera uma imagem do grafo por aluno, com só as notas dele coloridas.")
+    parser.add_argument("xml", help="XML do currículo")
+    parser.add_argument("csv", help="CSV da turma (GradeGen)")
+    parser.add_argument("--saida", default="relatorios", help="pasta de saída (um <RA>.png por aluno)")
+    parser.add_argument("--ras", nargs="+", default=None, help="RAs a gerar (padrão: todos)")
+    parser.add_argument("--processos", type=int, default=None, help="número de processos (padrão: número de CPUs)")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--cache-dir", default=None, help="pasta do cache (padrão: TCC2025_CACHE_DIR ou ~/.cache/tcc2025)")
+    args = parser.parse_args(argv)
+
+    ras = args.ras
+    if ras is not None and not cache.arquivos_faltando(args.xml, args.csv):
+        # Na linha de comando os RAs chegam como texto; no catálogo eles podem ser números
+        turma = cache.carregar_catalogo(args.xml, args.csv, args.cache_dir).ras_ordenados()
+        por_texto = {str(ra): ra for ra in turma}
+        ras = [por_texto.get(ra, ra) for ra in ras]
+
+    print("=== Relatórios por Aluno ===")
+    resultado = gerar_relatorios(args.xml, args.csv, args.saida, ras, args.processos, args.dpi, args.cache_dir)
+    return 1 if resultado is None else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# sintetico.py -> gera um currículo XML e um CSV no formato do GradeGen com dados inventados, do tamanho que quiser
+#
+# - XML: 'disciplinas' disciplinas espalhadas em 'semestres' semestres, cada uma com em média 'densidade'
+#   pré-requisitos tirados dos dois semestres anteriores (então o grafo é sempre acíclico)
+# - CSV: uma linha por aluno, com um trio (turma, nota, frequência) por disciplina e por tentativa.
+#   '--' = não cursou. Quem reprovou refaz com probabilidade 'taxa_refazer' (o trio se repete no cabeçalho,
+#   igual ao GradeGen, e o pandas vira 'D001.1', 'D001.2'...)
+# - A mesma semente gera sempre os mesmos arquivos (serve pros benchmarks: benchmark.py escala)
+#
+# Uso:
+#   python sintetico.py saida/curso --disciplinas 60 --alunos 10000 --densidade 1.5 --taxa-refazer 0.3
+
+import os
+import sys
+import random
+import argparse
+import numpy as np
+#Nota mínima pra aprovar (abaixo disso o aluno pode refazer), a mesma do planejamento
+from planejamento import NOTA_APROVACAO
+
+
+def gerar_xml(caminho, disciplinas=40, semestres=10, densidade=1.5, max_anos=6, semente=0):
+    """
+    Escreve o XML do currículo e retorna a lista de (codigo, semestre, [pré-requisitos]).
+    Os códigos são D000, D001... na ordem dos semestres
+    """
+    rnd = random.Random(semente)
+    codigos = [f"D{i:03d}" for i in range(disciplinas)]
+    semestre = {c: 1 + i * semestres // disciplinas for i, c in enumerate(codigos)}
+
+    estrutura = []
+    cadeia = {}  # tamanho da maior cadeia de pré-requisitos até a disciplina (vai no no_cadeia_pre_requisito)
+    for c in codigos:
+        # Candidatos: disciplinas dos dois semestres anteriores
+        candidatos = [p for p in codigos if semestre[c] - 2 <= semestre[p] < semestre[c]]
+        chance = min(1.0, densidade / len(candidatos)) if candidatos else 0.0
+        pre_requisitos = [p for p in candidatos if rnd.random() < chance]
+        cadeia[c] = max((cadeia[p] + 1 for p in pre_requisitos), default=0)
+        estrutura.append((c, semestre[c], pre_requisitos))
+
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write("<all_configs>\n  <cat_info>\n    <course_id>0</course_id>\n    <year>2020</year>\n"
+                f"    <max_years>{max_anos}</max_years>\n  </cat_info>\n  <subjects>\n")
+        for c, sem, pre_requisitos in estrutura:
+            f.write(f"    <subject>\n      <id>{c}</id>\n      <subject_name>Disciplina {c}</subject_name>\n"
+                    f"      <credits>4</credits>\n      <sem_offer>{sem}</sem_offer>\n")
+            if pre_requisitos:
+                f.writelines(f"      <pre_reqs>{p}</pre_reqs>\n" for p in pre_requisitos)
+            else:
+                f.write("      <pre_reqs/>\n")
+            f.write(f"      <no_cadeia_pre_requisito>{cadeia[c]}</no_cadeia_pre_requisito>\n    </subject>\n")
+        f.write("  </subjects>\n</all_configs>\n")
+    return estrutura
+
+
+def gerar_csv(caminho, codigos, alunos=1000, taxa_refazer=0.3, max_tentativas=3, taxa_cursou=0.85, semente=0):
+    """
+    Escreve o CSV do GradeGen: primeira coluna vazia com o RA e um trio (turma, nota, frequência)
+    por disciplina e tentativa. Retorna o número de registros (trios preenchidos)
+    """
+    gerador = np.random.default_rng(semente)
+    ras = 100000 + gerador.permutation(alunos * 10)[:alunos]
+
+    # tentativas[codigo][k] = (notas, frequencias, turmas) da k-ésima tentativa (NaN = não cursou)
+    tentativas = {}
+    for codigo in codigos:
+        cursou = gerador.random(alunos) < taxa_cursou
+        tentativas[codigo] = []
+        for _ in range(max_tentativas):
+            notas = np.where(cursou, np.round(gerador.uniform(0, 10, alunos), 1), np.nan)
+            frequencias = np.where(cursou, np.round(gerador.uniform(0.5, 1.0, alunos), 2), np.nan)
+            turmas = gerador.choice(np.array(["A", "B", "C"]), alunos)
+            tentativas[codigo].append((notas, frequencias, turmas))
+            # Só volta na próxima tentativa quem reprovou e resolveu refazer
+            cursou = cursou & (notas < NOTA_APROVACAO) & (gerador.random(alunos) < taxa_refazer)
+
+    # O GradeGen põe as tentativas de novo no final do cabeçalho, na ordem das disciplinas.
+    # Trio de refazer sem ninguém fica de fora
+    colunas = [(codigo, *tentativas[codigo][k]) for k in range(max_tentativas) for codigo in codigos
+               if k == 0 or not np.isnan(tentativas[codigo][k][0]).all()]
+    textos = []
+    registros = 0
+    for _, notas, frequencias, turmas in colunas:
+        vazio = np.isnan(notas)
+        registros += int((~vazio).sum())
+        textos.append((np.where(vazio, "--", turmas),
+                       np.where(vazio, "--", np.char.mod("%.1f", notas)),
+                       np.where(vazio, "--", np.char.mod("%.2f", frequencias))))
+
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write("," + ",".join(f"turma,{codigo},frequencia" for codigo, *_ in colunas) + "\n")
+        for i in range(alunos):
+            f.write(str(ras[i]) + "," + ",".join(f"{t[i]},{n[i]},{q[i]}" for t, n, q in textos) + "\n")
+    return registros
+
+
+def gerar_curso(prefixo, disciplinas=40, semestres=10, densidade=1.5, alunos=1000, taxa_refazer=0.3,
+                max_tentativas=3, semente=0):
+    """
+    Gera prefixo.xml e prefixo.csv e retorna (caminho_xml, caminho_csv, resumo)
+    """
+    caminho_xml, caminho_csv = prefixo + ".xml", prefixo + ".csv"
+    estrutura = gerar_xml(caminho_xml, disciplinas, semestres, densidade, semente=semente)
+    registros = gerar_csv(caminho_csv, [c for c, _, _ in estrutura], alunos, taxa_refazer, max_tentativas,
+                          semente=semente)
+    resumo = {
+        "disciplinas": disciplinas, "semestres": semestres, "densidade": densidade,
+        "pre_requisitos": sum(len(p) for _, _, p in estrutura),
+        "alunos": alunos, "taxa_refazer": taxa_refazer, "max_tentativas": max_tentativas,
+        "registros": registros, "semente": semente,
+    }
+    return caminho_xml, caminho_csv, resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um XML de currículo e um CSV do GradeGen sintéticos.")
+    parser.add_argument("prefixo", help="gera <prefixo>.xml e <prefixo>.csv")
+    parser.add_argument("--disciplinas", type=int, default=40)
+    parser.add_argument("--semestres", type=int, default=10)
+    parser.add_argument("--densidade", type=float, default=1.5, help="média de pré-requisitos por disciplina")
+    parser.add_argument("--alunos", type=int, default=1000)
+    parser.add_argument("--taxa-refazer", type=float, default=0.3, help="chance de quem reprovou refazer")
+    parser.add_argument("--max-tentativas", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    xml, csv, resumo = gerar_curso(args.prefixo, args.disciplinas, args.semestres, args.densidade, args.alunos,
+                                   args.taxa_refazer, args.max_tentativas, args.semente)
+    print(f"{xml}: {resumo['disciplinas']} disciplinas, {resumo['pre_requisitos']} pré-requisitos")
+    print(f"{csv}: {resumo['alunos']} alunos, {resumo['registros']} registros")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
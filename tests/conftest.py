@@ -0,0 +1,77 @@
+# Fixtures dos testes: cursos sintéticos pequenos (sintetico.py) gerados uma vez por sessão
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use("Agg")  # testes sem display
+
+
+@pytest.fixture(scope="session")
+def curso_pequeno(tmp_path_factory):
+    #(xml, csv) com 12 disciplinas e 300 alunos, com gente refazendo disciplina
+    import sintetico
+    pasta = tmp_path_factory.mktemp("curso_pequeno")
+    xml, csv, _ = sintetico.gerar_curso(str(pasta / "curso"), disciplinas=12, semestres=4, alunos=300,
+                                        taxa_refazer=0.6, semente=1)
+    return xml, csv
+
+
+@pytest.fixture(scope="session")
+def curso_grande(tmp_path_factory):
+    #(xml, csv) com mais alunos que viz.LIMITE_ALUNOS_DETALHE (mapas de calor começam como histograma na tela)
+    import sintetico
+    pasta = tmp_path_factory.mktemp("curso_grande")
+    xml, csv, _ = sintetico.gerar_curso(str(pasta / "curso"), disciplinas=4, semestres=2, alunos=1200, semente=2)
+    return xml, csv
+
+
+@pytest.fixture(autouse=True)
+def cache_isolado(tmp_path, monkeypatch):
+    # Nenhum teste lê ou grava o cache do usuário (~/.cache/tcc2025)
+    monkeypatch.setenv("TCC2025_CACHE_DIR", str(tmp_path / "cache"))
+
+
+def carregar_referencia(caminho_xml, caminho_csv):
+    """
+    Carga do jeito antigo (o laço do model.py original, linha por linha com iterrows), pra comparar:
+    {codigo: [(ra, turma, nota, frequencia), ...]} na ordem em que os registros foram adicionados
+    """
+    import pandas as pd
+    from model import Catalogo
+    catalogo = Catalogo()
+    catalogo._carregar_de_xml(caminho_xml)
+    df = pd.read_csv(caminho_csv)
+    df.rename(columns={df.columns[0]: 'RA'}, inplace=True)
+    registros = {codigo: [] for codigo in catalogo.disciplinas}
+    for i in range(1, len(df.columns), 3):
+        if i + 2 >= len(df.columns):
+            continue
+        col_codigo = df.columns[i + 1]
+        codigo_base = col_codigo.split('.')[0]
+        if codigo_base not in registros:
+            continue
+        for _, row in df.iterrows():
+            try:
+                nota = float(row[col_codigo])
+                frequencia = float(row[df.columns[i + 2]])
+            except (ValueError, TypeError):
+                continue
+            registros[codigo_base].append((int(row['RA']), str(row[df.columns[i]]), nota, frequencia))
+    return registros
+
+
+@pytest.fixture(scope="session")
+def referencia_pequeno(curso_pequeno):
+    return carregar_referencia(*curso_pequeno)
+
+
+@pytest.fixture(scope="session")
+def catalogo_pequeno(curso_pequeno):
+    from model import Catalogo
+    catalogo = Catalogo()
+    catalogo.carregar_dados(*curso_pequeno)
+    return catalogo
@@ -0,0 +1,92 @@
+import os
+import json
+import shutil
+
+import numpy as np
+import pytest
+
+import cache
+
+
+@pytest.fixture
+def curso_copiado(curso_pequeno, tmp_path):
+    #Cópia do curso pequeno que o teste pode alterar
+    xml, csv = (shutil.copy(caminho, tmp_path / os.path.basename(caminho)) for caminho in curso_pequeno)
+    return str(xml), str(csv)
+
+
+def _mesmos_dados(a, b):
+    assert list(a.disciplinas) == list(b.disciplinas)
+    assert a.total_alunos == b.total_alunos and a.max_anos == b.max_anos
+    for codigo, disciplina in a.disciplinas.items():
+        outra = b.get_disciplina(codigo)
+        assert (disciplina.pre_requisitos, disciplina.cadeia_pre_requisito) == \
+            (outra.pre_requisitos, outra.cadeia_pre_requisito)
+        assert disciplina.registros == outra.registros
+    np.testing.assert_array_equal(a.matriz_notas(list(a.disciplinas)), b.matriz_notas(list(b.disciplinas)))
+
+
+def _pastas_do_cache():
+    pasta = cache.diretorio_cache()
+    return sorted(os.listdir(pasta)) if os.path.isdir(pasta) else []
+
+
+def test_segunda_carga_vem_do_cache(curso_copiado, capsys):
+    primeira = cache.carregar_catalogo(*curso_copiado)
+    assert "Catálogo carregado do cache" not in capsys.readouterr().out
+    segunda = cache.carregar_catalogo(*curso_copiado)
+    assert "Catálogo carregado do cache" in capsys.readouterr().out
+    assert isinstance(segunda.base.nota, np.memmap)
+    _mesmos_dados(primeira, segunda)
+    assert _pastas_do_cache() == [os.path.basename(cache.caminho_cache(*curso_copiado))]
+
+
+@pytest.mark.parametrize("modo", ["mtime", "hash"])
+def test_csv_alterado_invalida_o_cache(curso_copiado, modo):
+    xml, csv = curso_copiado
+    cache.carregar_catalogo(xml, csv, modo=modo)
+    antigo = cache.caminho_cache(xml, csv, modo=modo)
+
+    # Tira o último aluno do CSV (muda o tamanho, o conteúdo e a data)
+    with open(csv, encoding="utf-8") as f:
+        linhas = f.readlines()
+    with open(csv, "w", encoding="utf-8") as f:
+        f.writelines(linhas[:-1])
+    os.utime(csv, ns=(os.stat(csv).st_atime_ns, os.stat(csv).st_mtime_ns + 10**9))
+
+    novo = cache.caminho_cache(xml, csv, modo=modo)
+    assert novo != antigo
+    catalogo = cache.carregar_catalogo(xml, csv, modo=modo)
+    assert catalogo.total_alunos == len(linhas) - 2
+    # O cache do CSV antigo foi apagado e não sobrou pasta temporária
+    assert _pastas_do_cache() == [os.path.basename(novo)]
+
+
+def test_cache_de_outra_versao_e_ignorado(curso_copiado):
+    cache.carregar_catalogo(*curso_copiado)
+    caminho = cache.caminho_cache(*curso_copiado)
+    arquivo = os.path.join(caminho, "catalogo.json")
+    with open(arquivo, encoding="utf-8") as f:
+        metadados = json.load(f)
+    metadados["versao"] = cache.CACHE_VERSAO - 1
+    with open(arquivo, "w", encoding="utf-8") as f:
+        json.dump(metadados, f)
+    assert cache.carregar_catalogo_do_cache(caminho) is None
+
+
+def test_cache_incompleto_e_ignorado(curso_copiado):
+    cache.carregar_catalogo(*curso_copiado)
+    caminho = cache.caminho_cache(*curso_copiado)
+    os.remove(os.path.join(caminho, "base", "nota.npy"))
+    assert cache.carregar_catalogo_do_cache(caminho) is None
+    # Uma carga nova regrava o cache por cima do quebrado
+    cache.carregar_catalogo(*curso_copiado)
+    assert cache.carregar_catalogo_do_cache(caminho) is not None
+
+
+def test_salvar_catalogo_nao_deixa_pasta_temporaria(catalogo_pequeno, tmp_path):
+    caminho = str(tmp_path / "cache" / "entrada")
+    cache.salvar_catalogo(catalogo_pequeno, caminho)
+    cache.salvar_catalogo(catalogo_pequeno, caminho)  # por cima de um que já existe
+    assert os.listdir(tmp_path / "cache") == ["entrada"]
+    _mesmos_dados(catalogo_pequeno, cache.carregar_catalogo_do_cache(caminho))
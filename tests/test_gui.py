@@ -0,0 +1,160 @@
+import functools
+import queue
+import threading
+
+import numpy as np
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.transforms import Bbox
+
+import benchmark
+import cache
+import gui
+import viz
+
+
+@pytest.fixture
+def app(curso_pequeno):
+    #O gui.App sem janela do benchmark (o hover de verdade em cima de um canvas Agg)
+    catalogo = cache.carregar_catalogo(*curso_pequeno)
+    grafo = viz.criar_grafo_do_catalogo(catalogo)
+    figura = viz.desenhar_grafo_em_camadas(grafo, catalogo, 'decrescente', catalogo.ras_ordenados())
+    figura.set_dpi(40)
+    app = benchmark._app_simulada(catalogo, grafo, figura, FigureCanvasAgg(figura))
+    app.blits = []
+    app.canvas.blit = app.blits.append
+    return app
+
+
+def _tela(app):
+    return np.asarray(app.canvas.buffer_rgba()).copy()
+
+
+def _hover(app, no):
+    app.estado_hover = no
+    app._desenhar_destaque()
+
+
+def test_apagar_setas_so_onde_nada_cobriu_a_seta():
+    antes = np.full((4, 5, 4), 255, dtype=np.uint8)
+    depois = antes.copy()
+    depois[1, 1:4] = (0, 0, 0, 255)   # a seta
+    final = depois.copy()
+    final[1, 3] = (10, 20, 30, 255)   # uma caixa por cima de um pedaço da seta
+    caixa = viz.apagar_setas(antes, depois, final)
+    assert caixa == (1, 1, 3, 2)
+    np.testing.assert_array_equal(final[1, 1:3], [(178, 178, 178, 255)] * 2)
+    np.testing.assert_array_equal(final[1, 3], (10, 20, 30, 255))
+    assert viz.apagar_setas(antes, antes, final) is None
+
+
+def test_fundo_apagado_sai_do_mesmo_desenho(app, monkeypatch):
+    assert app.fundo_apagado is not None and app.area_setas is not None
+    assert not np.array_equal(np.asarray(app.fundo), np.asarray(app.fundo_apagado))
+
+    # O hover não desenha a figura de novo
+    desenhos = []
+    monkeypatch.setattr(app.figura_atual, "draw", desenhos.append)
+    for no in list(app.grafo_curso)[:4]:
+        _hover(app, no)
+    app.resetar_destaque()
+    assert desenhos == []
+
+
+def test_blit_so_do_que_mudou(app):
+    nos = sorted(app.grafo_curso, key=lambda no: len(app.encontrar_caminho_mais_longo(no)))
+    inicial = _tela(app)
+    figura = app.figura_atual.bbox
+
+    # Entrar no destaque troca as setas pelas apagadas: a área delas vai junto
+    _hover(app, nos[0])
+    assert app.blits[-1].contains(app.area_setas.x0 + 1, app.area_setas.y0 + 1)
+    anterior = app.area_destaque
+    # Entre dois nós só vão os dois destaques (as setas já estão apagadas na tela)
+    _hover(app, nos[1])
+    np.testing.assert_allclose(app.blits[-1].extents, Bbox.union([anterior, app.area_destaque]).extents)
+    assert app.blits[-1].width * app.blits[-1].height < figura.width * figura.height / 2
+
+    # O mesmo resultado de ir direto pro segundo nó, e sair volta a tela do começo
+    tela = _tela(app)
+    app.resetar_destaque()
+    np.testing.assert_array_equal(_tela(app), inicial)
+    _hover(app, nos[1])
+    np.testing.assert_array_equal(_tela(app), tela)
+
+
+def test_selos_ligam_e_desligam_sem_regerar_a_figura(app):
+    app.ra_sequencia = app.catalogo.ras_ordenados()
+    app.selos = {"retencao": None, "elegiveis": None}
+    ax = app.figura_atual.axes[0]
+    ax.set_xlim(0, 12)  # um zoom qualquer, que tem que continuar igual
+    artistas = len(ax.get_children())
+
+    app.alternar_selos("retencao", True)
+    selos = app.selos["retencao"]
+    assert selos and all(s.get_gid() == f"retencao:{no}" for no, s in selos.items())
+    assert {no for no, s in selos.items() if s.get_visible()} == set(selos) & ax.recorte_visivel.visiveis
+
+    app.alternar_selos("retencao", False)
+    assert not any(s.get_visible() for s in selos.values())
+    ax.set_xlim(0, 40)  # o recorte da tela não traz de volta os desligados
+    assert not any(s.get_visible() for s in selos.values())
+
+    app.alternar_selos("retencao", True)
+    assert app.selos["retencao"] is selos and len(ax.get_children()) == artistas + len(selos)
+    assert ax.get_xlim() == (0, 40)
+    assert {no for no, s in selos.items() if s.get_visible()} == set(selos) & ax.recorte_visivel.visiveis
+
+
+def _app_carregando(curso):
+    #O gui.App sem janela só com o que a thread de carga usa
+    app = gui.App.__new__(gui.App)
+    app.catalogo = None
+    app.caminho_xml, app.caminho_csv = curso
+    app.fila_carga = queue.Queue()
+    app.cancelar_carga = threading.Event()
+    return app
+
+
+def _mensagens(app):
+    mensagens = []
+    while not app.fila_carga.empty():
+        mensagens.append(app.fila_carga.get_nowait())
+    return mensagens
+
+
+def test_carga_avisa_as_etapas_em_ordem(curso_pequeno):
+    app = _app_carregando(curso_pequeno)
+    app._carregar_em_segundo_plano()
+    mensagens = _mensagens(app)
+    tipo, _, dados = mensagens.pop()
+    assert tipo == "fim" and all(m[0] == "etapa" for m in mensagens)
+
+    ordem = [chave for chave, _ in gui.ETAPAS_CARGA]
+    iniciadas = list(dict.fromkeys(etapa for _, etapa, detalhe in mensagens if not isinstance(detalhe, float)))
+    terminadas = [etapa for _, etapa, detalhe in mensagens if isinstance(detalhe, float)]
+    assert iniciadas == ordem and terminadas == ordem
+    assert ("etapa", "catalogo", "300 linhas") in mensagens
+    assert list(dados["tempos"]) == ordem
+    assert dados["catalogo"].ras_ordenados() == dados["ra_sequencia"]
+    assert set(dados["layout"]["pos"]) == set(dados["grafo_curso"])
+
+
+def test_cancelar_no_meio_do_csv(curso_pequeno, monkeypatch):
+    # Pedaços de 100 linhas: o CSV de 300 alunos vira 3 avisos, como um CSV grande com o bloco padrão
+    monkeypatch.setattr(cache, "carregar_catalogo", functools.partial(cache.carregar_catalogo, tamanho_bloco=100))
+    app = _app_carregando(curso_pequeno)
+    avisos = app.fila_carga.put
+
+    def put(mensagem):
+        # Cancelar assim que chegar o primeiro pedaço do CSV
+        avisos(mensagem)
+        if mensagem[2] and str(mensagem[2]).endswith("linhas"):
+            app.cancelar_carga.set()
+
+    app.fila_carga.put = put
+    app._carregar_em_segundo_plano()
+    mensagens = _mensagens(app)
+    assert mensagens == [("etapa", "catalogo", None), ("etapa", "catalogo", "100 linhas"), ("cancelado", None, None)]
+    # Uma carga cancelada não deixa cache pela metade
+    assert cache.carregar_catalogo_do_cache(cache.caminho_cache(*curso_pequeno)) is None
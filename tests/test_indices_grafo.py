@@ -0,0 +1,91 @@
+import functools
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from indices_grafo import IndiceAlcance, IndiceCaminhos, ordem_topologica
+
+
+def _grafo_aleatorio(nos, chance, semente):
+    #DAG com arestas só de um nó pra um de número maior (os nomes embaralhados, pra ordem não ser a alfabética)
+    rnd = random.Random(semente)
+    nomes = [f"N{i:02d}" for i in range(nos)]
+    rnd.shuffle(nomes)
+    grafo = nx.DiGraph()
+    grafo.add_nodes_from(nomes)
+    grafo.add_edges_from((nomes[i], nomes[j]) for i in range(nos) for j in range(i + 1, nos) if rnd.random() < chance)
+    return grafo
+
+
+GRAFOS = [_grafo_aleatorio(30, 0.12, semente) for semente in range(4)] + [nx.DiGraph()]
+
+
+@pytest.mark.parametrize("grafo", GRAFOS)
+def test_alcance_igual_ao_networkx(grafo):
+    indice = IndiceAlcance(grafo)
+    for no in grafo.nodes():
+        assert indice.ancestrais(no) == nx.ancestors(grafo, no)
+        assert indice.descendentes(no) == nx.descendants(grafo, no)
+        assert indice.num_ancestrais(no) == len(nx.ancestors(grafo, no))
+        assert indice.num_descendentes(no) == len(nx.descendants(grafo, no))
+    for a in list(grafo.nodes())[:10]:
+        for b in grafo.nodes():
+            assert indice.eh_pre_requisito(a, b) == (a in nx.ancestors(grafo, b))
+    assert indice.ancestrais("NAO_EXISTE") == set()
+    assert not indice.eh_pre_requisito("NAO_EXISTE", next(iter(grafo.nodes()), "X"))
+
+
+@pytest.mark.parametrize("grafo", GRAFOS[:2])
+def test_alcance_de_varios_nos(grafo):
+    indice = IndiceAlcance(grafo)
+    nos = sorted(grafo.nodes())[::4]
+    esperado = set().union(*(nx.descendants(grafo, n) for n in nos))
+    assert indice.descendentes_de(nos) == esperado
+    assert indice.descendentes_de(nos, incluir_proprios=True) == esperado | set(nos)
+    assert indice.ancestrais_de(nos) == set().union(*(nx.ancestors(grafo, n) for n in nos))
+
+
+@pytest.mark.parametrize("grafo", GRAFOS[:2])
+def test_matriz_ancestrais(grafo):
+    indice = IndiceAlcance(grafo)
+    ordem = sorted(grafo.nodes()) + ["NAO_EXISTE"]
+    matriz = indice.matriz_ancestrais(ordem)
+    fecho = nx.transitive_closure_dag(grafo)
+    for i, a in enumerate(ordem):
+        for j, b in enumerate(ordem):
+            assert matriz[i, j] == fecho.has_edge(a, b)
+    np.testing.assert_array_equal(indice.matriz_ancestrais(),
+                                  indice.matriz_ancestrais(indice.nos))
+
+
+@pytest.mark.parametrize("grafo", GRAFOS)
+def test_caminhos_iguais_a_forca_bruta(grafo):
+    indice = IndiceCaminhos(grafo)
+
+    @functools.lru_cache(maxsize=None)
+    def entrada(no):
+        return max((entrada(p) + 1 for p in grafo.predecessors(no)), default=0)
+
+    @functools.lru_cache(maxsize=None)
+    def saida(no):
+        return max((saida(s) + 1 for s in grafo.successors(no)), default=0)
+
+    for no in grafo.nodes():
+        assert (indice.entrada[no], indice.saida[no]) == (entrada(no), saida(no))
+        caminho = indice.caminho_mais_longo(no)
+        assert no in caminho
+        assert len(caminho) - 1 == entrada(no) + saida(no) == indice.comprimento_passando_por(no)
+        assert all(grafo.has_edge(u, v) for u, v in zip(caminho, caminho[1:]))
+    critico = indice.caminho_critico()
+    assert len(critico) - 1 == (nx.dag_longest_path_length(grafo) if len(grafo) else -1)
+    assert indice.caminho_mais_longo("NAO_EXISTE") == []
+
+
+def test_ordem_topologica_com_ciclo():
+    grafo = nx.DiGraph([("A", "B"), ("B", "C"), ("C", "B"), ("C", "D")])
+    assert ordem_topologica(grafo) == ["A", "B", "C", "D"]
+    # As arestas do ciclo são ignoradas, os índices não travam
+    assert IndiceAlcance(grafo).ancestrais("C") == {"A", "B"}
+    assert IndiceCaminhos(grafo).entrada["C"] == 2
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import instrumentacao
+
+
+@pytest.fixture
+def coleta():
+    # Liga a coleta só durante o teste, começando vazia
+    ligada = instrumentacao.ativo()
+    instrumentacao.limpar()
+    instrumentacao.ativar()
+    yield
+    instrumentacao.limpar()
+    if not ligada:
+        instrumentacao.desativar()
+
+
+@instrumentacao.medido("teste.funcao")
+def _funcao(x):
+    return x * 2
+
+
+def _trace(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_desligada_nao_guarda_nada(tmp_path):
+    if instrumentacao.ativo():
+        pytest.skip("TCC2025_TRACE ligado no ambiente")
+    instrumentacao.limpar()
+    with instrumentacao.trecho("teste.trecho", linhas=3) as t:
+        pass
+    assert t is instrumentacao._DESLIGADO
+    assert _funcao(2) == 4
+    instrumentacao.contar("teste.contador")
+    instrumentacao.registrar_trecho("teste.fora", time.perf_counter(), 0.1)
+    assert instrumentacao.resumo() == {} and instrumentacao.contadores() == {}
+    assert instrumentacao.exportar_chrome(tmp_path / "trace.json") == 0
+
+
+def test_trace_no_formato_do_chrome(coleta, tmp_path):
+    with instrumentacao.trecho("teste.trecho", linhas=3):
+        time.sleep(0.002)
+    assert _funcao(5) == 10
+    instrumentacao.registrar_trecho("teste.fora", time.perf_counter() - 0.5, 0.25, no="A")
+    instrumentacao.contar("teste.contador", 2)
+    instrumentacao.contar("teste.contador")
+    thread = threading.Thread(target=lambda: instrumentacao.contar("teste.outra"), name="Trabalhadora")
+    thread.start()
+    thread.join()
+
+    assert instrumentacao.exportar_chrome(tmp_path / "trace.json") == 6
+    trace = _trace(tmp_path / "trace.json")
+    assert trace["displayTimeUnit"] == "ms"
+    eventos = trace["traceEvents"]
+    pid = os.getpid()
+    assert all(e["pid"] == pid and isinstance(e["tid"], int) for e in eventos)
+
+    metadados = [e for e in eventos if e["ph"] == "M"]
+    assert [e["name"] for e in metadados][0] == "process_name"
+    nomes_threads = {e["tid"]: e["args"]["name"] for e in metadados if e["name"] == "thread_name"}
+    assert nomes_threads[threading.get_ident()] == threading.current_thread().name
+    assert nomes_threads[thread.ident] == "Trabalhadora"
+
+    trechos = {e["name"]: e for e in eventos if e["ph"] == "X"}
+    assert set(trechos) == {"teste.trecho", "teste.funcao", "teste.fora"}
+    assert trechos["teste.trecho"]["args"] == {"linhas": 3} and trechos["teste.trecho"]["dur"] >= 2000
+    assert "args" not in trechos["teste.funcao"]
+    assert trechos["teste.fora"]["dur"] == pytest.approx(250_000)
+    assert trechos["teste.fora"]["args"] == {"no": "A"}
+    assert all(e["ts"] >= 0 for e in trechos.values() if e["name"] != "teste.fora")
+
+    # Contador: cada evento leva o total até ali
+    contador = [e for e in eventos if e["ph"] == "C" and e["name"] == "teste.contador"]
+    assert [e["args"] for e in contador] == [{"teste.contador": 2}, {"teste.contador": 3}]
+    assert contador[0]["ts"] <= contador[1]["ts"]
+    assert instrumentacao.contadores() == {"teste.contador": 3, "teste.outra": 1}
+
+
+def test_resumo_por_trecho(coleta):
+    agora = time.perf_counter()
+    for duracao in (0.001, 0.003):
+        instrumentacao.registrar_trecho("teste.barato", agora, duracao)
+    instrumentacao.registrar_trecho("teste.caro", agora, 0.010)
+    instrumentacao.contar("teste.contador")
+    resumo = instrumentacao.resumo()
+    assert list(resumo) == ["teste.caro", "teste.barato"]
+    assert resumo["teste.barato"]["chamadas"] == 2
+    assert resumo["teste.barato"]["total_ms"] == pytest.approx(4.0)
+    assert resumo["teste.barato"]["media_ms"] == pytest.approx(2.0)
+    assert resumo["teste.barato"]["max_ms"] == pytest.approx(3.0)
+
+
+def test_gravar_processo_usa_o_arquivo_do_ambiente(coleta, tmp_path, monkeypatch):
+    caminho = tmp_path / "trace.json"
+    monkeypatch.setenv("TCC2025_TRACE", str(caminho))
+    instrumentacao.gravar_processo()
+    assert not caminho.exists()  # nada coletado ainda
+    instrumentacao.contar("teste.contador")
+    instrumentacao.gravar_processo()
+    assert [e["name"] for e in _trace(caminho)["traceEvents"] if e["ph"] == "C"] == ["teste.contador"]
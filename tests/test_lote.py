@@ -0,0 +1,79 @@
+import os
+import json
+
+import pytest
+
+import lote
+import mosaico
+import relatorios
+
+
+def _manifesto(pasta, entradas):
+    caminho = pasta / "manifesto.json"
+    caminho.write_text(json.dumps(entradas), encoding="utf-8")
+    return str(caminho)
+
+
+def test_ler_manifesto_resolve_caminhos_e_nomes(tmp_path):
+    caminho = _manifesto(tmp_path, [
+        {"xml": "cursos/94.xml", "csv": "turmas/94_2020.csv", "nome": "curso94"},
+        {"xml": "/abs/42.xml", "csv": "turmas/42_2021.csv"},
+    ])
+    pares = lote.ler_manifesto(caminho)
+    assert pares == [
+        {"xml": str(tmp_path / "cursos/94.xml"), "csv": str(tmp_path / "turmas/94_2020.csv"), "nome": "curso94"},
+        {"xml": "/abs/42.xml", "csv": str(tmp_path / "turmas/42_2021.csv"), "nome": "42_2021"},
+    ]
+
+
+@pytest.mark.parametrize("entradas, mensagem", [
+    ([{"xml": "a.xml"}], "sem 'xml' ou 'csv'"),
+    ([{"xml": "a.xml", "csv": "x/t.csv"}, {"xml": "b.xml", "csv": "y/t.csv"}], "Nomes repetidos no manifesto: t"),
+])
+def test_ler_manifesto_invalido(tmp_path, entradas, mensagem):
+    with pytest.raises(ValueError, match=mensagem):
+        lote.ler_manifesto(_manifesto(tmp_path, entradas))
+
+
+def test_par_faltando_nao_para_o_lote(curso_pequeno, tmp_path, capsys):
+    xml, csv = curso_pequeno
+    caminho = _manifesto(tmp_path, [
+        {"xml": xml, "csv": csv, "nome": "bom"},
+        {"xml": "nope.xml", "csv": csv, "nome": "sem_xml"},
+        {"xml": xml, "csv": "nope.csv", "nome": "sem_csv"},
+    ])
+    saida = tmp_path / "renders"
+    resumo = tmp_path / "resumo.json"
+    codigo = lote.main([caminho, "--saida", str(saida), "--ordens", "crescente", "ra", "--processos", "1",
+                        "--dpi", "30", "--resumo-json", str(resumo)])
+
+    assert codigo == 1
+    assert sorted(os.listdir(saida / "bom")) == ["bom_crescente.png", "bom_ra.png"]
+    assert not (saida / "sem_xml").exists() and not (saida / "sem_csv").exists()
+    saida_texto = capsys.readouterr().out
+    assert "2 trabalhos ok, 4 com erro, 2 arquivos" in saida_texto
+    assert f"arquivo não encontrado: {tmp_path / 'nope.xml'}" in saida_texto
+
+    trabalhos = json.loads(resumo.read_text(encoding="utf-8"))["trabalhos"]
+    assert [(t["nome"], t["ordem"], "erro" in t) for t in trabalhos] == [
+        ("bom", "crescente", False), ("bom", "ra", False),
+        ("sem_csv", "crescente", True), ("sem_csv", "ra", True),
+        ("sem_xml", "crescente", True), ("sem_xml", "ra", True),
+    ]
+
+
+def test_xml_sem_disciplinas_vira_erro_do_par(curso_pequeno, tmp_path):
+    _, csv = curso_pequeno
+    vazio = tmp_path / "vazio.xml"
+    vazio.write_text("<all_configs><subjects></subjects></all_configs>", encoding="utf-8")
+    trabalhos, tempos, erros = lote.montar_trabalhos(
+        [{"xml": str(vazio), "csv": csv, "nome": "vazio"}], str(tmp_path), ["png"], ["ra"])
+    assert trabalhos == [] and tempos == {}
+    assert erros[0]["erro"] == f"nenhuma disciplina no XML {vazio}"
+
+
+@pytest.mark.parametrize("modulo", [relatorios, mosaico])
+def test_cli_de_um_par_com_arquivo_faltando(curso_pequeno, tmp_path, capsys, modulo):
+    xml, _ = curso_pequeno
+    assert modulo.main([xml, str(tmp_path / "nope.csv"), "--saida", str(tmp_path / "saida")]) == 1
+    assert f"Erro: arquivo não encontrado: {tmp_path / 'nope.csv'}" in capsys.readouterr().out
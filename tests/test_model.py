@@ -0,0 +1,212 @@
+import numpy as np
+import pytest
+
+import planejamento
+from model import LINHAS_AMOSTRA_MEMORIA, BaseNotas, Catalogo
+
+
+def _normalizar(registros):
+    return [(int(r["ra"]), str(r["turma"]), r["nota"], r["frequencia"]) for r in registros]
+
+
+def _tentativas_por_aluno(referencia, codigo):
+    # {ra: [(turma, nota, frequencia), ...]} da primeira pra última tentativa
+    por_aluno = {}
+    for ra, turma, nota, frequencia in referencia[codigo]:
+        por_aluno.setdefault(ra, []).append((turma, nota, frequencia))
+    return por_aluno
+
+
+@pytest.mark.parametrize("opcoes", [
+    {},
+    {"streaming": True},
+    {"streaming": True, "tamanho_bloco": 37},
+    {"streaming": True, "limite_memoria_mb": 0.05},
+], ids=["inteiro", "blocos", "blocos_pequenos", "limite_memoria"])
+def test_carga_igual_a_referencia(curso_pequeno, referencia_pequeno, opcoes):
+    catalogo = Catalogo()
+    catalogo.carregar_dados(*curso_pequeno, **opcoes)
+    for codigo, esperados in referencia_pequeno.items():
+        assert _normalizar(catalogo.get_disciplina(codigo).registros) == esperados
+    assert catalogo.total_alunos == len({ra for regs in referencia_pequeno.values() for ra, *_ in regs})
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_celula_com_texto_vira_sem_registro(tmp_path, streaming):
+    xml = tmp_path / "curso.xml"
+    xml.write_text("<all_configs><subjects><subject><id>A</id><subject_name>A</subject_name>"
+                   "<pre_reqs/></subject></subjects></all_configs>", encoding="utf-8")
+    csv = tmp_path / "turma.csv"
+    csv.write_text(",turma,A,frequencia\n1,T1,7.5,0.9\n2,T1,abc,0.8\n3,--,--,--\n4,T2,5,x\n5,2,6,1\n",
+                   encoding="utf-8")
+    catalogo = Catalogo()
+    catalogo.carregar_dados(str(xml), str(csv), streaming=streaming)
+    assert _normalizar(catalogo.get_disciplina("A").registros) == [(1, "T1", 7.5, 0.9), (5, "2", 6.0, 1.0)]
+
+
+def test_carga_em_blocos_le_amostra_antes_do_limite(curso_grande):
+    linhas_lidas = []
+    catalogo = Catalogo()
+    catalogo.carregar_dados(*curso_grande, streaming=True, tamanho_bloco=50_000, limite_memoria_mb=0.05,
+                            ao_progresso=linhas_lidas.append)
+    # O primeiro pedaço é a amostra, mesmo com tamanho_bloco grande; os outros saem do consumo medido
+    assert linhas_lidas[0] == LINHAS_AMOSTRA_MEMORIA
+    assert linhas_lidas[-1] == 1200
+    assert len(linhas_lidas) > 2
+
+
+def test_coluna_notas_so_nas_linhas_pedidas(catalogo_pequeno, referencia_pequeno):
+    ras = catalogo_pequeno.ras_ordenados()
+    pedidos = ras[::-3] + [123, ras[0]]  # fora de ordem, um RA que não existe e um repetido
+    linhas = catalogo_pequeno.linhas_dos_ras(pedidos)
+    assert linhas[-2] == -1
+    for codigo in referencia_pequeno:
+        por_aluno = _tentativas_por_aluno(referencia_pequeno, codigo)
+        esperado = [por_aluno[ra][-1][1] if ra in por_aluno else np.nan for ra in pedidos]
+        np.testing.assert_array_equal(catalogo_pequeno.notas_da_disciplina(codigo, linhas), esperado)
+        completo = [por_aluno[ra][-1][1] if ra in por_aluno else np.nan for ra in ras]
+        np.testing.assert_array_equal(catalogo_pequeno.notas_da_disciplina(codigo), completo)
+
+
+def test_matriz_notas(catalogo_pequeno, referencia_pequeno):
+    codigos = sorted(referencia_pequeno)[::-1] + ["NAO_EXISTE"]
+    ras = catalogo_pequeno.ras_ordenados()[:40]
+    matriz = catalogo_pequeno.matriz_notas(codigos, catalogo_pequeno.linhas_dos_ras(ras))
+    assert matriz.shape == (len(ras), len(codigos))
+    assert np.isnan(matriz[:, -1]).all()
+    for j, codigo in enumerate(codigos[:-1]):
+        por_aluno = _tentativas_por_aluno(referencia_pequeno, codigo)
+        np.testing.assert_array_equal(matriz[:, j], [por_aluno[ra][-1][1] if ra in por_aluno else np.nan
+                                                     for ra in ras])
+
+
+def test_matrizes_da_ultima_tentativa(catalogo_pequeno, referencia_pequeno):
+    base = catalogo_pequeno.base
+    assert base.notas.shape == base.frequencias.shape == base.ultima.shape == (len(base.ras), len(base.codigos))
+    assert base.notas.flags.f_contiguous  # coluna de uma disciplina contínua
+    linha = {ra: i for i, ra in enumerate(base.ras.tolist())}
+    for j, codigo in enumerate(base.codigos):
+        notas = np.full(len(base.ras), np.nan)
+        frequencias = np.full(len(base.ras), np.nan)
+        for ra, tentativas in _tentativas_por_aluno(referencia_pequeno, codigo).items():
+            _, notas[linha[ra]], frequencias[linha[ra]] = tentativas[-1]
+        np.testing.assert_array_equal(base.notas[:, j], notas)
+        np.testing.assert_array_equal(base.frequencias[:, j], frequencias)
+        cursou = base.ultima[:, j] >= 0
+        np.testing.assert_array_equal(cursou, ~np.isnan(notas))
+        np.testing.assert_array_equal(base.nota[base.ultima[cursou, j]], notas[cursou])
+
+
+@pytest.mark.parametrize("nota_aprovacao", [6.0, 7.5])
+def test_estatisticas_disciplina(catalogo_pequeno, referencia_pequeno, monkeypatch, nota_aprovacao):
+    monkeypatch.setattr(planejamento, "NOTA_APROVACAO", nota_aprovacao)
+    codigo = sorted(referencia_pequeno)[0]
+    ultimas = [t[-1][1] for t in _tentativas_por_aluno(referencia_pequeno, codigo).values()]
+    estatisticas = catalogo_pequeno.estatisticas_disciplina(codigo)
+    assert estatisticas["alunos"] == len(ultimas)
+    assert estatisticas["media"] == pytest.approx(np.mean(ultimas))
+    assert estatisticas["aprovados"] == sum(n >= nota_aprovacao for n in ultimas)
+
+
+def test_base_salva_e_aberta_com_memmap(catalogo_pequeno, tmp_path):
+    base = catalogo_pequeno.base
+    base.salvar(str(tmp_path / "base"))
+    aberta = BaseNotas.abrir(str(tmp_path / "base"), mmap=True)
+    for nome in BaseNotas.ARRAYS:
+        np.testing.assert_array_equal(getattr(aberta, nome), getattr(base, nome))
+    assert isinstance(aberta.notas, np.memmap) and aberta.notas.flags.f_contiguous
+    codigo = base.codigos[0]
+    np.testing.assert_array_equal(aberta.coluna_notas(codigo), base.coluna_notas(codigo))
+    assert aberta.ultimo_registro(codigo, base.ras[0].item()) == base.ultimo_registro(codigo, base.ras[0].item())
+    ra = base.ras[0].item()
+    assert aberta.tentativas(codigo, ra) == base.tentativas(codigo, ra)
+
+
+def test_base_vazia():
+    base = BaseNotas.construir(["A", "B"], {})
+    assert len(base.par_aluno) == 0 and base.notas.shape == (0, 2)
+    assert np.isnan(base.coluna_notas("A", [-1, -1])).all()
+    assert base.tentativas("A", 1) == []
+    assert base.ultimo_registro("B", 1) is None
+    assert base.resumo_retencao()["alunos"].tolist() == [0, 0]
+
+
+def test_ras_de_texto_e_turmas_misturadas():
+    base = BaseNotas.construir(["A"], {"A": (
+        np.array(["x2", "x1", "x2"], dtype=object), np.array(["T1", 3, "T1"], dtype=object),
+        np.array([4.0, 7.0, 8.0]), np.array([0.9, 0.8, 0.7]),
+    )})
+    assert base.ras.tolist() == ["x1", "x2"]
+    assert base.coluna_notas("A").tolist() == [7.0, 8.0]
+    assert [r["nota"] for r in base.tentativas("A", "x2")] == [4.0, 8.0]
+    assert base.ultimo_registro("A", "x1")["turma"] == 3
+
+
+def test_ultimo_registro_e_tentativas_iguais_a_busca_linear(catalogo_pequeno, referencia_pequeno):
+    ras = catalogo_pequeno.ras_ordenados()
+    for codigo in referencia_pequeno:
+        disciplina = catalogo_pequeno.get_disciplina(codigo)
+        por_aluno = _tentativas_por_aluno(referencia_pequeno, codigo)
+        for ra in ras[::7] + [-1]:
+            esperadas = por_aluno.get(ra, [])
+            tentativas = [(str(r["turma"]), r["nota"], r["frequencia"]) for r in disciplina.get_tentativas_aluno(ra)]
+            assert tentativas == esperadas
+            ultimo = disciplina.get_ultima_nota_aluno(ra)
+            if esperadas:
+                assert (str(ultimo["turma"]), ultimo["nota"], ultimo["frequencia"]) == esperadas[-1]
+            else:
+                assert ultimo is None
+
+
+def test_indice_por_par_igual_a_referencia(catalogo_pequeno, referencia_pequeno):
+    base = catalogo_pequeno.base
+    # Um valor por par (aluno, disciplina) que existe, na ordem de ptr_pares/par_aluno
+    esperado_num, esperado_primeira, esperado_menor = [], [], []
+    for codigo in base.codigos:
+        por_aluno = _tentativas_por_aluno(referencia_pequeno, codigo)
+        for ra in sorted(por_aluno):
+            notas = [nota for _, nota, _ in por_aluno[ra]]
+            esperado_num.append(len(notas))
+            esperado_primeira.append(notas[0])
+            esperado_menor.append(min(notas))
+        j = base.coluna[codigo]
+        alunos = base.par_aluno[base.ptr_pares[j]:base.ptr_pares[j + 1]]
+        assert base.ras[alunos].tolist() == sorted(por_aluno)
+    np.testing.assert_array_equal(base.num_tentativas(), esperado_num)
+    np.testing.assert_array_equal(base.primeira_nota(), esperado_primeira)
+    np.testing.assert_array_equal(base.menor_nota(), esperado_menor)
+    # O índice de tentativas não tem nada do tamanho alunos × disciplinas
+    assert len(base.ptr_tentativas) == len(base.par_aluno) + 1 <= len(base.nota) + 1
+
+
+@pytest.mark.parametrize("nota_aprovacao", [6.0, 7.5])
+def test_resumo_retencao(catalogo_pequeno, referencia_pequeno, monkeypatch, nota_aprovacao):
+    monkeypatch.setattr(planejamento, "NOTA_APROVACAO", nota_aprovacao)
+    resumo = catalogo_pequeno.resumo_retencao()
+    for codigo, registros in referencia_pequeno.items():
+        por_aluno = _tentativas_por_aluno(referencia_pequeno, codigo)
+        assert resumo[codigo] == {
+            "alunos": len(por_aluno),
+            "refizeram": sum(len(t) > 1 for t in por_aluno.values()),
+            "retidos": sum(min(nota for _, nota, _ in t) < nota_aprovacao for t in por_aluno.values()),
+            "tentativas": len(registros),
+        }
+
+
+def test_xml_com_valores_invalidos(tmp_path, capsys):
+    caminho = tmp_path / "curso.xml"
+    caminho.write_text(
+        "<all_configs><cat_info><max_years> </max_years></cat_info><subjects>"
+        "<subject><id>A</id><subject_name>A</subject_name><credits>x</credits><sem_offer>1</sem_offer>"
+        "<pre_reqs/><no_cadeia_pre_requisito></no_cadeia_pre_requisito></subject>"
+        "<subject><id>B</id><subject_name>B</subject_name><credits>4</credits><sem_offer> 2 </sem_offer>"
+        "<pre_reqs>A</pre_reqs><no_cadeia_pre_requisito>1</no_cadeia_pre_requisito></subject>"
+        "</subjects></all_configs>", encoding="utf-8")
+    catalogo = Catalogo()
+    catalogo._carregar_de_xml(str(caminho))
+    assert catalogo.max_anos is None
+    a, b = catalogo.get_disciplina("A"), catalogo.get_disciplina("B")
+    assert (a.creditos, a.cadeia_pre_requisito) == (0, None)
+    assert (b.creditos, b.semestre_offer, b.pre_requisitos, b.cadeia_pre_requisito) == (4, 2, ["A"], 1)
+    assert "valor inválido 'x'" in capsys.readouterr().out
+
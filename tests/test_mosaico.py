@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pytest
+from matplotlib.image import imread
+
+import mosaico
+from mosaico import PiramideDZI
+
+
+def test_niveis_e_grade_da_piramide():
+    piramide = PiramideDZI(1000, 300, tamanho_tile=256, sobreposicao=1)
+    assert piramide.niveis == 11
+    assert piramide.tamanho_nivel(10) == (1000, 300)
+    assert piramide.tamanho_nivel(9) == (500, 150)
+    assert piramide.tamanho_nivel(8) == (250, 75)
+    assert piramide.tamanho_nivel(0) == (1, 1)
+    assert piramide.grade_nivel(10) == (4, 2)
+    assert piramide.grade_nivel(8) == (1, 1)
+    assert len(piramide.tiles_nivel(10)) == 8
+
+    # A sobreposição só nas bordas internas
+    assert piramide.retangulo_tile(10, 0, 0) == (0, 0, 257, 257)
+    assert piramide.retangulo_tile(10, 1, 0) == (255, 0, 513, 257)
+    assert piramide.retangulo_tile(10, 3, 1) == (767, 255, 1000, 300)
+
+
+@pytest.mark.parametrize("largura, altura, tamanho_tile", [(1000, 300, 256), (513, 257, 128), (1, 1, 256)])
+def test_tiles_cobrem_cada_nivel(largura, altura, tamanho_tile):
+    piramide = PiramideDZI(largura, altura, tamanho_tile)
+    for nivel in range(piramide.niveis):
+        nivel_largura, nivel_altura = piramide.tamanho_nivel(nivel)
+        cobertura = np.zeros((nivel_altura, nivel_largura), dtype=int)
+        for _, coluna, linha in piramide.tiles_nivel(nivel):
+            x0, y0, x1, y1 = piramide.retangulo_tile(nivel, coluna, linha)
+            assert 0 < x1 - x0 <= tamanho_tile and 0 < y1 - y0 <= tamanho_tile
+            cobertura[y0:y1, x0:x1] += 1
+        assert (cobertura == 1).all()
+
+
+def test_descritor_dzi():
+    descritor = PiramideDZI(1000, 300, 256, 1).descritor_dzi("jpeg")
+    assert 'TileSize="256"' in descritor and 'Overlap="1"' in descritor and 'Format="jpeg"' in descritor
+    assert '<Size Width="1000" Height="300"/>' in descritor
+
+
+def test_reduzir_tile_igual_a_reduzir_a_imagem_cheia(tmp_path):
+    piramide = PiramideDZI(600, 300, tamanho_tile=128, sobreposicao=2)
+    cima = piramide.niveis - 1
+    cheia = np.random.default_rng(0).integers(0, 256, (300, 600, 4), dtype=np.uint8)
+    os.makedirs(tmp_path / str(cima))
+    for _, coluna, linha in piramide.tiles_nivel(cima):
+        x0, y0, x1, y1 = piramide.retangulo_tile(cima, coluna, linha)
+        mosaico._salvar_imagem(str(tmp_path / str(cima) / f"{coluna}_{linha}.png"), cheia[y0:y1, x0:x1], "png")
+
+    esperada = cheia.reshape(150, 2, 300, 2, 4).mean(axis=(1, 3))
+    for _, coluna, linha in piramide.tiles_nivel(cima - 1):
+        x0, y0, x1, y1 = piramide.retangulo_tile(cima - 1, coluna, linha)
+        tile = mosaico.reduzir_tile(piramide, str(tmp_path), cima - 1, coluna, linha)
+        assert np.abs(tile.astype(float) - esperada[y0:y1, x0:x1]).max() <= 1
+
+
+def test_exportar_mosaico(curso_pequeno, tmp_path):
+    resultado = mosaico.exportar_mosaico(*curso_pequeno, str(tmp_path), nome="g", dpi=25,
+                                         tamanho_tile=128, sobreposicao=1, processos=1)
+    piramide = PiramideDZI(resultado["largura"], resultado["altura"], 128, 1)
+    assert resultado["niveis"] == piramide.niveis
+    with open(tmp_path / "g.dzi", encoding="utf-8") as f:
+        assert f.read() == piramide.descritor_dzi()
+
+    total = 0
+    for nivel in range(piramide.niveis):
+        tiles = piramide.tiles_nivel(nivel)
+        assert sorted(os.listdir(tmp_path / "g_files" / str(nivel))) == sorted(f"{c}_{l}.png" for _, c, l in tiles)
+        for _, coluna, linha in tiles:
+            x0, y0, x1, y1 = piramide.retangulo_tile(nivel, coluna, linha)
+            assert imread(tmp_path / "g_files" / str(nivel) / f"{coluna}_{linha}.png").shape[:2] == (y1 - y0, x1 - x0)
+        total += len(tiles)
+    assert resultado["tiles"]["desenhados"] + resultado["tiles"]["reduzidos"] == total
+    assert resultado["nivel_minimo"] > 0 and resultado["tiles"]["reduzidos"] > 0
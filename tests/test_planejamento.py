@@ -0,0 +1,123 @@
+import functools
+
+import numpy as np
+import pytest
+
+from model import BaseNotas, Catalogo, Disciplina
+from indices_grafo import IndiceCaminhos
+from planejamento import NOTA_APROVACAO, Elegibilidade, ProjecaoConclusao, conferir_cadeias
+from viz import criar_grafo_do_catalogo
+
+
+def _catalogo(disciplinas, registros, max_anos=None):
+    #Catálogo montado à mão: disciplinas = [(codigo, semestre, [pré-requisitos])], registros = [(ra, codigo, nota)]
+    catalogo = Catalogo()
+    catalogo.max_anos = max_anos
+    for codigo, semestre, pre_requisitos in disciplinas:
+        catalogo.disciplinas[codigo] = Disciplina(codigo, semestre_offer=semestre, pre_requisitos=pre_requisitos)
+    pedacos = {}
+    for codigo in catalogo.disciplinas:
+        do_codigo = [(ra, nota) for ra, c, nota in registros if c == codigo]
+        if do_codigo:
+            ras, notas = zip(*do_codigo)
+            pedacos[codigo] = (np.array(ras, dtype=object), np.array(["A"] * len(ras), dtype=object),
+                               np.array(notas, dtype=float), np.ones(len(ras)))
+    catalogo.definir_base(BaseNotas.construir(list(catalogo.disciplinas), pedacos))
+    catalogo.total_alunos = len(catalogo.base.ras)
+    return catalogo
+
+
+def _aprovado(catalogo, ra, codigo):
+    ultimo = catalogo.get_disciplina(codigo).get_ultima_nota_aluno(ra)
+    return ultimo is not None and ultimo["nota"] >= NOTA_APROVACAO
+
+
+def test_elegibilidade_igual_a_consulta_por_aluno(catalogo_pequeno):
+    grafo = criar_grafo_do_catalogo(catalogo_pequeno)
+    elegibilidade = Elegibilidade(catalogo_pequeno, grafo)
+    for i, ra in enumerate(elegibilidade.ras):
+        for j, codigo in enumerate(elegibilidade.codigos):
+            cursou = catalogo_pequeno.get_disciplina(codigo).get_ultima_nota_aluno(ra) is not None
+            elegivel = all(_aprovado(catalogo_pequeno, ra, p) for p in grafo.predecessors(codigo))
+            assert elegibilidade.cursou[i, j] == cursou
+            assert elegibilidade.aprovado[i, j] == _aprovado(catalogo_pequeno, ra, codigo)
+            assert elegibilidade.elegivel[i, j] == elegivel
+        assert elegibilidade.disciplinas_elegiveis(ra) == [
+            c for j, c in enumerate(elegibilidade.codigos) if elegibilidade.elegivel[i, j] and not elegibilidade.cursou[i, j]
+        ]
+    contagens = elegibilidade.contagens()
+    assert sum(c["aprovados"] for c in contagens.values()) == int(elegibilidade.aprovado.sum())
+    assert elegibilidade.disciplinas_elegiveis(-1) == []
+
+
+def test_elegibilidade_de_alunos_escolhidos(catalogo_pequeno):
+    grafo = criar_grafo_do_catalogo(catalogo_pequeno)
+    todos = Elegibilidade(catalogo_pequeno, grafo)
+    escolhidos = catalogo_pequeno.ras_ordenados()[::-5]
+    parte = Elegibilidade(catalogo_pequeno, grafo, ra_sequencia=escolhidos)
+    linhas = [todos.ras.index(ra) for ra in escolhidos]
+    np.testing.assert_array_equal(parte.elegivel, todos.elegivel[linhas])
+
+
+def _semestres_restantes(catalogo, grafo, ra, proximo_semestre_impar):
+    # Um aluno por vez, de cima pra baixo: cada disciplina termina depois do último pré-requisito,
+    # no primeiro semestre com a paridade da oferta
+    @functools.lru_cache(maxsize=None)
+    def termino(codigo):
+        if _aprovado(catalogo, ra, codigo):
+            return 0
+        inicio = max((termino(p) for p in grafo.predecessors(codigo)), default=0) + 1
+        semestre = grafo.nodes[codigo]["semestre"]
+        if semestre > 0:
+            impar_no_ano = semestre % 2 == 1
+            while ((inicio % 2 == 1) == proximo_semestre_impar) != impar_no_ano:
+                inicio += 1
+        return inicio
+    return max((termino(c) for c in grafo.nodes()), default=0)
+
+
+@pytest.mark.parametrize("proximo_semestre_impar", [True, False])
+def test_projecao_igual_a_recursao_por_aluno(catalogo_pequeno, proximo_semestre_impar):
+    grafo = criar_grafo_do_catalogo(catalogo_pequeno)
+    projecao = ProjecaoConclusao(catalogo_pequeno, grafo, proximo_semestre_impar=proximo_semestre_impar)
+    esperado = [_semestres_restantes(catalogo_pequeno, grafo, ra, proximo_semestre_impar) for ra in projecao.ras]
+    assert projecao.semestres_restantes.tolist() == esperado
+    assert projecao.cadeias_divergentes == {}
+
+
+def test_projecao_com_cadeia_e_paridade():
+    # A (1º sem) -> B (2º sem) -> C (3º sem), D (1º sem) sem pré-requisito
+    catalogo = _catalogo(
+        [("A", 1, []), ("B", 2, ["A"]), ("C", 3, ["B"]), ("D", 1, [])],
+        [(1, "A", 3.0),                                    # reprovou A: A, B, C em 3 semestres
+         (2, "A", 8.0), (2, "B", 7.0), (2, "D", 9.0),      # só falta C (ímpar): 1 semestre
+         (3, "A", 8.0), (3, "B", 7.0), (3, "C", 6.0), (3, "D", 6.5)],
+        max_anos=1,
+    )
+    grafo = criar_grafo_do_catalogo(catalogo)
+    projecao = ProjecaoConclusao(catalogo, grafo, semestres_cursados=np.array([1, 2, 1]))
+    assert projecao.semestres_restantes.tolist() == [3, 1, 0]
+    # Começando num semestre par, C (ímpar) só no segundo semestre e A também
+    projecao_par = ProjecaoConclusao(catalogo, grafo, proximo_semestre_impar=False)
+    assert projecao_par.semestres_restantes.tolist() == [4, 2, 0]
+    # Prazo de 2 semestres: 1 + 3 e 2 + 1 estouram, quem já terminou não
+    assert projecao.ras_em_risco() == [1, 2]
+    assert projecao.resumo()["em_risco"] == 2
+
+
+def test_conferir_cadeias(curso_pequeno, capsys):
+    catalogo = Catalogo()
+    catalogo.carregar_dados(*curso_pequeno)
+    grafo = criar_grafo_do_catalogo(catalogo)
+    indice = IndiceCaminhos(grafo)
+    # O sintetico.py grava a cadeia de verdade
+    assert conferir_cadeias(catalogo, indice) == {}
+
+    codigo = max(indice.entrada, key=indice.entrada.get)
+    catalogo.get_disciplina(codigo).cadeia_pre_requisito = indice.entrada[codigo] + 1
+    catalogo.get_disciplina("D000").cadeia_pre_requisito = None  # sem valor no XML não confere
+    assert conferir_cadeias(catalogo, indice) == {codigo: (indice.entrada[codigo] + 1, indice.entrada[codigo])}
+    capsys.readouterr()
+    projecao = ProjecaoConclusao(catalogo, grafo, indice_caminhos=indice)
+    assert codigo in projecao.cadeias_divergentes
+    assert "no_cadeia_pre_requisito do XML difere do grafo em 1 disciplina(s)" in capsys.readouterr().out
@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+from matplotlib.colors import to_rgba
+
+import cache
+import relatorios
+import viz
+
+
+def _pixel(gerador, imagem, ponto):
+    # Pixel (RGBA 0..1) do ponto em coordenadas de dados; a imagem tem y pra baixo
+    x, y = gerador.figura.axes[0].transData.transform(ponto)
+    return imagem[imagem.shape[0] - 1 - int(y), int(x)] / 255
+
+
+def test_so_o_aluno_fica_colorido(curso_pequeno):
+    catalogo = cache.carregar_catalogo(*curso_pequeno)
+    gerador = relatorios.GeradorRelatorios(catalogo, dpi=300)  # quadradinhos com uns 10 px de altura
+    ras = gerador.ras
+    no = max(gerador.nodes, key=lambda n: np.count_nonzero(~np.isnan(gerador.notas[n])))
+    i, j = np.flatnonzero(~np.isnan(gerador.notas[no]))[:2]
+    centro_i = gerador.cantos[no][i].mean(axis=0)
+    centro_j = gerador.cantos[no][j].mean(axis=0)
+
+    imagem = gerador.desenhar_aluno(ras[i]).copy()
+    cor = viz.cores_das_notas(np.array([gerador.notas[no][i]]))[0]
+    np.testing.assert_allclose(_pixel(gerador, imagem, centro_i), cor, atol=2 / 255)
+    np.testing.assert_allclose(_pixel(gerador, imagem, centro_j), to_rgba(relatorios.COR_APAGADA), atol=2 / 255)
+    assert gerador.titulo.get_text() == f"RA {ras[i]}"
+
+    # O próximo aluno sai do mesmo fundo: nada do anterior fica pra trás
+    imagem = gerador.desenhar_aluno(ras[j]).copy()
+    np.testing.assert_allclose(_pixel(gerador, imagem, centro_i), to_rgba(relatorios.COR_APAGADA), atol=2 / 255)
+
+
+def test_um_png_por_ra(curso_pequeno, tmp_path, capsys):
+    catalogo = cache.carregar_catalogo(*curso_pequeno)
+    ras = catalogo.ras_ordenados()[:3]
+    saida = tmp_path / "relatorios"
+    resultado = relatorios.gerar_relatorios(*curso_pequeno, str(saida), ras + ["nope"], processos=1, dpi=20)
+    assert resultado["relatorios"] == 3
+    assert sorted(os.listdir(saida)) == sorted(f"{ra}.png" for ra in ras)
+    assert "1 RAs não estão no CSV" in capsys.readouterr().out
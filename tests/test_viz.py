@@ -0,0 +1,171 @@
+import matplotlib
+import numpy as np
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+import cache
+import lote
+import viz
+
+
+def _exportar(curso, ordem, formato, pasta):
+    xml, csv = curso
+    cache.carregar_catalogo(xml, csv)
+    trabalho = {
+        "nome": "curso", "xml": xml, "csv": csv, "cache": cache.caminho_cache(xml, csv),
+        "diretorio_cache": None, "ordem": ordem, "formatos": [formato], "dpi": 50,
+        "pasta": str(pasta), "retencao": False, "elegiveis": False,
+    }
+    arquivo, = lote.renderizar_trabalho(trabalho)["arquivos"]
+    with open(arquivo, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("formato", ["svg", "pdf"])
+def test_exportacao_vetorial_mantem_a_ordem_do_mapa(curso_grande, tmp_path, monkeypatch, formato):
+    # Turma acima do LIMITE_ALUNOS_DETALHE: na tela começa como histograma, mas o arquivo tem que sair
+    # com os quadradinhos na ordem pedida (e a data fixa, pra comparar os bytes)
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "0")
+    monkeypatch.setitem(matplotlib.rcParams, "svg.hashsalt", "teste")
+    crescente = _exportar(curso_grande, "crescente", formato, tmp_path / "a")
+    decrescente = _exportar(curso_grande, "decrescente", formato, tmp_path / "b")
+    de_novo = _exportar(curso_grande, "crescente", formato, tmp_path / "c")
+    assert crescente == de_novo
+    assert crescente != decrescente
+
+
+def test_tela_usa_histograma_e_savefig_usa_celulas(curso_grande, tmp_path):
+    xml, csv = curso_grande
+    catalogo = cache.carregar_catalogo(xml, csv)
+    grafo = viz.criar_grafo_do_catalogo(catalogo)
+    figura = viz.desenhar_grafo_em_camadas(grafo, catalogo, "crescente", catalogo.ras_ordenados())
+    mapas = [a for a in figura.axes[0].get_children() if isinstance(a, viz.MapaCalor)]
+    assert mapas
+
+    FigureCanvasAgg(figura).draw()
+    assert all(m.celulas is None and m.histograma is not None for m in mapas)
+
+    figura.savefig(tmp_path / "grafo.png", dpi=50)
+    assert all(m.celulas is not None for m in mapas)
+    assert not any(m.usa_celulas() for m in mapas)  # fora do savefig volta pro nível de detalhe
+
+
+def _rgba(cor):
+    return list(matplotlib.colors.to_rgba(cor))
+
+
+def test_tabela_de_cores_igual_ao_map_nota_para_cor():
+    assert len(viz.TABELA_CORES) == 10 * viz.RESOLUCAO_TABELA + 1
+    for k, cor in enumerate(viz.TABELA_CORES):
+        assert cor.tolist() == _rgba(viz.map_nota_para_cor(k / viz.RESOLUCAO_TABELA))
+
+
+def test_cores_das_notas_igual_ao_map_nota_para_cor():
+    gerador = np.random.default_rng(0)
+    notas = np.concatenate([
+        np.round(np.arange(0, 10.01, 0.01), 2),  # a grade da tabela
+        np.round(gerador.uniform(0, 10, 500), 1),  # notas do CSV (uma casa)
+        gerador.uniform(0, 10, 500),  # fora da grade
+        [7.125, 5.999, 5.9999999, 6.0000001, 9.995],
+    ])
+    cores = viz.cores_das_notas(notas)
+    for nota, cor in zip(notas, cores):
+        assert cor.tolist() == _rgba(viz.map_nota_para_cor(nota)), nota
+
+
+def test_cores_das_notas_sem_nota():
+    cores = viz.cores_das_notas([None, 8.0, float("nan")])
+    assert cores[0].tolist() == cores[2].tolist() == viz.RGBA_SEM_NOTA.tolist() == _rgba(viz.COR_SEM_NOTA)
+    assert cores[1].tolist() == _rgba(viz.map_nota_para_cor(8.0))
+    assert viz.cores_das_notas(np.array([])).shape == (0, 4)
+
+
+def _caixas_forca_bruta(layout, folga=0.1):
+    meia_largura = layout["box_width"] / 2 + folga
+    meia_altura = layout["box_height"] / 2 + folga
+    return {no: (x - meia_largura, y - meia_altura, x + meia_largura, y + meia_altura)
+            for no, (x, y) in layout["pos"].items()}
+
+
+def test_indice_espacial_igual_a_testar_todas_as_caixas(catalogo_pequeno):
+    layout = viz.calcular_layout(viz.criar_grafo_do_catalogo(catalogo_pequeno))
+    indice = viz.IndiceEspacial(layout)
+    caixas = _caixas_forca_bruta(layout)
+    xs = [x for x, _ in layout["pos"].values()]
+    ys = [y for _, y in layout["pos"].values()]
+    for x in np.linspace(min(xs) - 3, max(xs) + 3, 60):
+        for y in np.linspace(min(ys) - 3, max(ys) + 3, 40):
+            dentro = [no for no, (x0, y0, x1, y1) in caixas.items() if x0 <= x <= x1 and y0 <= y <= y1]
+            assert indice.no_em(x, y) == (dentro[0] if dentro else None)
+    for no, (x, y) in layout["pos"].items():
+        assert indice.no_em(x, y) == no
+    assert indice.no_em(None, None) is None
+
+    regiao = (min(xs), min(ys), (min(xs) + max(xs)) / 2, max(ys) - 1)
+    esperados = {no for no, (x0, y0, x1, y1) in caixas.items()
+                 if x0 <= regiao[2] and x1 >= regiao[0] and y0 <= regiao[3] and y1 >= regiao[1]}
+    assert indice.nos_na_regiao(*regiao) == esperados
+
+
+def test_recorte_esconde_o_que_sai_da_tela(catalogo_pequeno):
+    grafo = viz.criar_grafo_do_catalogo(catalogo_pequeno)
+    figura = viz.desenhar_grafo_em_camadas(grafo, catalogo_pequeno, "decrescente", catalogo_pequeno.ras_ordenados())
+    ax = figura.axes[0]
+    recorte = ax.recorte_visivel
+    setas = next(c for c in ax.collections if c.get_gid() == "arestas")
+    canvas = FigureCanvasAgg(figura)
+    canvas.draw()
+    assert recorte.visiveis == set(grafo)
+    assert len(setas.get_segments()) == 2 * len(setas.arestas)  # curva + ponta de cada seta
+    limites = ax.get_xlim(), ax.get_ylim()
+
+    # Zoom na primeira coluna: só os nós que encostam na tela (+ a margem dos selos) ficam visíveis
+    x = min(caixa[2] for caixa in recorte.indice.caixas.values())
+    ax.set_xlim(x - 0.5, x + 2)
+    (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+    m = recorte.margem
+    esperados = {no for no, (bx0, by0, bx1, by1) in _caixas_forca_bruta(viz.calcular_layout(grafo)).items()
+                 if bx0 <= x1 + m and bx1 >= x0 - m and by0 <= y1 + m and by1 >= y0 - m}
+    assert recorte.visiveis == esperados and 0 < len(esperados) < len(grafo)
+    for no, artistas in recorte.artistas_por_no.items():
+        assert artistas and all(a.get_visible() == (no in esperados) for a in artistas)
+    # As setas que não cruzam a tela nem entram no desenho
+    canvas.draw()
+    assert 0 < len(setas.get_segments()) < 2 * len(setas.arestas)
+
+    ax.set_xlim(*limites[0])
+    ax.set_ylim(*limites[1])
+    assert recorte.visiveis == set(grafo)
+    assert all(a.get_visible() for artistas in recorte.artistas_por_no.values() for a in artistas)
+
+
+def _imagem(figura):
+    figura.set_dpi(40)
+    canvas = FigureCanvasAgg(figura)
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba()).copy()
+
+
+def test_esqueleto_progressivo_mais_os_mapas_igual_a_figura_completa(catalogo_pequeno):
+    grafo = viz.criar_grafo_do_catalogo(catalogo_pequeno)
+    ras = catalogo_pequeno.ras_ordenados()
+    completa = viz.desenhar_grafo_em_camadas(grafo, catalogo_pequeno, "crescente", ras, mostrar_retencao=True)
+    assert completa.axes[0].mapas_pendentes is None
+
+    figura = viz.desenhar_grafo_em_camadas(grafo, catalogo_pequeno, "crescente", ras, mostrar_retencao=True,
+                                           progressivo=True)
+    ax = figura.axes[0]
+    assert not any((a.get_gid() or "").startswith("mapa:") for a in ax.artists)
+    assert not any((t.get_gid() or "").startswith("retencao:") for t in ax.texts)
+
+    # Um nó por next(), na ordem do layout, cada um com o mapa dele e entrando no recorte da tela
+    nos = []
+    selos = 0
+    for no, artistas in ax.mapas_pendentes:
+        nos.append(no)
+        gids = {a.get_gid() for a in artistas}
+        selos += f"retencao:{no}" in gids
+        assert f"mapa:{no}" in gids and gids <= {f"mapa:{no}", f"retencao:{no}"}
+        assert all(a in ax.recorte_visivel.artistas_por_no[no] for a in artistas)
+    assert nos == list(viz.calcular_layout(grafo)["pos"]) and selos > 0
+    np.testing.assert_array_equal(_imagem(figura), _imagem(completa))
@@ -9,15 +9,22 @@
 #       alpha das cores e largura da figura (largura/altura calculadas automaticamente).
 
 import os
+import time
 import networkx as nx
 # Importa a Figure da API
 from matplotlib.figure import Figure
-from matplotlib.patches import FancyBboxPatch, FancyArrowPatch
+from matplotlib.patches import FancyBboxPatch
+from matplotlib.collections import PolyCollection, LineCollection
+from matplotlib.colors import to_rgba, to_rgba_array
+from matplotlib.artist import Artist
+from matplotlib.transforms import IdentityTransform
+from matplotlib.backends.backend_agg import RendererAgg
 import numpy as np
 from collections import defaultdict
 from model import Catalogo
-#interatividade entre on nós conectados e arestas
-import matplotlib.pyplot as plt
+from planejamento import Elegibilidade
+import instrumentacao
+# Sem pyplot aqui: tudo é desenhado na Figure direto e o pyplot sozinho custa um bom pedaço da abertura
 
 
 
@@ -45,74 +52,279 @@ def map_nota_para_cor(nota):
         b = int(0 * (1 - t) + 193 * t)
         return f"#{r:02x}{g:02x}{b:02x}"
 
-def desenhar_mini_mapa_calor(ax, x, y, width, height, notas, ordem='decrescente', ra_sequencia=None):
+#Cor dos quadrados de quem não cursou a disciplina
+COR_SEM_NOTA = '#CCCCCC'
+
+# Tabela de cores pré-calculada: TABELA_CORES[k] é a cor RGBA da nota k/100 (0.00 a 10.00),
+# gerada com o próprio map_nota_para_cor, então as cores são exatamente as mesmas do gradiente
+RESOLUCAO_TABELA = 100
+TABELA_CORES = np.array([
+    [int(cor[i:i + 2], 16) / 255 for i in (1, 3, 5)] + [1.0]
+    for cor in (map_nota_para_cor(k / RESOLUCAO_TABELA) for k in range(10 * RESOLUCAO_TABELA + 1))
+])
+RGBA_SEM_NOTA = np.array([int(COR_SEM_NOTA[i:i + 2], 16) / 255 for i in (1, 3, 5)] + [1.0])
+
+
+def _como_array(notas):
+    # Lista com None (jeito antigo) ou array com NaN -> array float com NaN
+    if isinstance(notas, list):
+        notas = [np.nan if n is None else n for n in notas]
+    return np.asarray(notas, dtype=float)
+
+
+def cores_das_notas(notas):
+    """
+    Cores RGBA (array N x 4) de um vetor de notas, sem chamar map_nota_para_cor nota a nota.
+    NaN (ou None) vira o cinza de "não cursou". Notas fora da grade de 0.01 da tabela
+    usam a mesma fórmula do map_nota_para_cor, só que vetorizada
+    """
+    notas = _como_array(notas)
+    cores = np.empty((len(notas), 4))
+    cores[:] = RGBA_SEM_NOTA
+    validas = ~np.isnan(notas)
+    valores = np.clip(notas[validas], 0.0, 10.0)
+
+    indices = np.rint(valores * RESOLUCAO_TABELA)
+    na_tabela = indices / RESOLUCAO_TABELA == valores
+    resultado = np.empty((len(valores), 4))
+    resultado[na_tabela] = TABELA_CORES[indices[na_tabela].astype(np.int64)]
+
+    # Fora da tabela (ex.: 7.125): o mesmo gradiente, com o int() truncando igual ao map_nota_para_cor
+    fora = valores[~na_tabela]
+    t_verde = (fora - 6.0) / 4.0
+    t_vermelho = fora / 6.0
+    verde = fora >= 6.0
+    rgb = np.where(
+        verde[:, None],
+        np.stack([144 * (1 - t_verde), 238 * (1 - t_verde) + 100 * t_verde, 144 * (1 - t_verde)], axis=1),
+        np.stack([139 * (1 - t_vermelho) + 255 * t_vermelho, 182 * t_vermelho, 193 * t_vermelho], axis=1),
+    )
+    resultado[~na_tabela, :3] = np.trunc(rgb) / 255
+    resultado[~na_tabela, 3] = 1.0
+
+    cores[validas] = resultado
+    return cores
+
+
+# Ordens do mapa de calor: nome -> função que recebe as notas na ordem do ra_sequencia (NaN = não cursou)
+# e devolve a permutação dos quadradinhos. Pra ter uma ordem nova na GUI é só colocar aqui
+ORDENS_MAPA = {
+    'decrescente': lambda notas: np.argsort(-notas, kind='stable'),  # o argsort já joga os NaN pro final
+    'crescente': lambda notas: np.argsort(notas, kind='stable'),
+    'ra': lambda notas: np.arange(len(notas)),  # já vêm na ordem do ra_sequencia
+}
+
+
+def permutacao_notas(notas, ordem='decrescente'):
+    #Índices dos alunos na ordem em que os quadradinhos são desenhados (ordem desconhecida = decrescente)
+    return ORDENS_MAPA.get(ordem, ORDENS_MAPA['decrescente'])(_como_array(notas))
+
+
+def ordenar_notas(notas, ordem='decrescente'):
+    """
+    Notas na ordem em que os quadradinhos são desenhados (NaN = não cursou).
+    - 'decrescente' / 'crescente': notas ordenadas e os cinzas no final
+    - 'ra': do jeito que vieram (já estão na ordem do ra_sequencia)
+    """
+    notas = _como_array(notas)
+    return notas[permutacao_notas(notas, ordem)]
+
+
+def notas_do_mapa(catalogo, node, linhas_ras):
+    #Notas do mapa de calor de um nó na ordem do ra_sequencia (NaN = não cursou). None se não tiver mapa
+    if linhas_ras is None or not catalogo.get_disciplina(node):
+        return None
+    coluna = catalogo.notas_da_disciplina(node, linhas_ras)
+    # Nota negativa também conta como sem nota
+    return np.where(coluna >= 0, coluna, np.nan)
+
+
+# Nível de detalhe dos mapas de calor:
+# - com até LIMITE_ALUNOS_DETALHE alunos o mapa mostra um quadradinho por aluno, a não ser que
+#   o quadradinho fique menor que PIXELS_MINIMOS_CELULA na tela (aí ele só vira um borrão)
+# - acima do limite ele começa como histograma das notas e só troca pros quadradinhos quando o zoom
+#   deixa cada um com pelo menos PIXELS_CELULA_TURMA_GRANDE pixels
+# A troca é decidida a cada desenho, então acompanha o zoom/pan da barra de ferramentas.
+# Só vale pra tela (canvas Agg): no savefig e em SVG/PDF o mapa sai sempre com os quadradinhos
+LIMITE_ALUNOS_DETALHE = 1000
+PIXELS_MINIMOS_CELULA = 1.0
+PIXELS_CELULA_TURMA_GRANDE = 3.0
+
+#Faixas do histograma: 0-1, 1-2, ..., 9-10 (+ uma barra cinza pra quem não cursou)
+FAIXAS_HISTOGRAMA = np.arange(0, 11)
+
+
+class MapaCalor(Artist):
+    """
+    Mini mapa de calor de um nó com nível de detalhe automático (ver LIMITE_ALUNOS_DETALHE).
+
+    Tem duas representações e desenha só uma delas, escolhida na hora do desenho:
+    - celulas: PolyCollection com um quadradinho por aluno
+    - histograma: PolyCollection com uma barra por faixa de nota (np.histogram), bem mais leve
+    As duas são criadas só quando forem desenhadas pela primeira vez
+
+    - notas: notas na ordem do ra_sequencia (NaN = não cursou)
+    - reordenar(ordem): troca a ordem dos quadradinhos sem criar artistas novos
+    - colorir(cores): pinta os quadradinhos com cores dadas (ex.: tudo apagado nos relatórios)
+    - cantos(): vértices (N, 4, 2) de cada quadradinho, na ordem em que são desenhados
+    """
+    def __init__(self, x, y, width, height, notas, ordem='decrescente',
+                 limite_alunos=LIMITE_ALUNOS_DETALHE, zorder=4):
+        super().__init__()
+        self.set_zorder(zorder)
+        self.x, self.y, self.width, self.height = x, y, width, height
+        self.notas = _como_array(notas)
+        self.ordem = ordem
+        self.limite_alunos = limite_alunos
+        self.cores = None  # cores fixas (colorir), se não as cores vêm das notas
+
+        # o layout do grid
+        num_notas = len(self.notas)
+        self.cols = min(5, num_notas)
+        self.rows = (num_notas + self.cols - 1) // self.cols
+        # tamanho dos quadradinhos
+        self.cell_width = width / self.cols
+        self.cell_height = height / self.rows
+
+        # As duas representações só são criadas no primeiro desenho que precisar delas
+        # (um mapa fora da tela, ver RecorteVisivel, nunca cria nenhuma)
+        self.celulas = None
+        self.histograma = None
+
+    def cantos(self):
+        # Cantos de todos os quadradinhos de uma vez (o pad=0.01 do antigo boxstyle "square,pad=0.01")
+        pad = 0.01
+        i = np.arange(len(self.notas))
+        row = i // self.cols
+        col = i % self.cols
+        x0 = self.x - self.width/2 + col * self.cell_width - pad
+        y0 = self.y + self.height/2 - (row + 1) * self.cell_height - pad
+        x1 = x0 + self.cell_width + 2 * pad
+        y1 = y0 + self.cell_height + 2 * pad
+        return np.stack([
+            np.stack([x0, y0], axis=1), np.stack([x1, y0], axis=1),
+            np.stack([x1, y1], axis=1), np.stack([x0, y1], axis=1),
+        ], axis=1)
+
+    def _cores_celulas(self):
+        if self.cores is not None:
+            return self.cores
+        return cores_das_notas(ordenar_notas(self.notas, self.ordem))
+
+    def _criar_celulas(self):
+        # Turma grande no SVG/PDF: os quadradinhos vão como uma imagem embutida (um retângulo vetorial
+        # por aluno deixa o arquivo com centenas de MB). Na tela (Agg) isso não muda nada
+        turma_grande = self.limite_alunos is not None and len(self.notas) > self.limite_alunos
+        return PolyCollection(self.cantos(), facecolors=self._cores_celulas(), rasterized=turma_grande,
+                              edgecolors='white', linewidths=0.3, zorder=self.get_zorder())
+
+    def _criar_histograma(self):
+        # Uma barra por faixa de nota + a barra cinza de quem não cursou, alturas relativas à maior barra
+        validas = self.notas[~np.isnan(self.notas)]
+        contagens, _ = np.histogram(np.clip(validas, 0.0, 10.0), bins=FAIXAS_HISTOGRAMA)
+        contagens = np.append(contagens, len(self.notas) - len(validas))
+        maior = max(int(contagens.max()), 1)
+
+        num_barras = len(contagens)
+        largura = self.width / num_barras
+        x0 = self.x - self.width/2 + np.arange(num_barras) * largura
+        y0 = np.full(num_barras, self.y - self.height/2)
+        y1 = y0 + self.height * contagens / maior
+        x1 = x0 + largura
+        vertices = np.stack([
+            np.stack([x0, y0], axis=1), np.stack([x1, y0], axis=1),
+            np.stack([x1, y1], axis=1), np.stack([x0, y1], axis=1),
+        ], axis=1)
+
+        # Cor de cada faixa = cor da nota no meio dela
+        centros = (FAIXAS_HISTOGRAMA[:-1] + FAIXAS_HISTOGRAMA[1:]) / 2
+        cores = np.vstack([cores_das_notas(centros), RGBA_SEM_NOTA])
+        return PolyCollection(vertices, facecolors=cores, edgecolors='white',
+                              linewidths=0.3, zorder=self.get_zorder())
+
+    def pixels_por_celula(self):
+        #Menor lado de um quadradinho na tela, em pixels, com o zoom atual
+        if self.axes is None:
+            return float("inf")
+        p = self.axes.transData.transform([[0.0, 0.0], [self.cell_width, self.cell_height]])
+        return float(np.min(np.abs(p[1] - p[0])))
+
+    def usa_celulas(self, renderer=None):
+        #True se com o zoom atual o mapa deve ser desenhado aluno a aluno
+        if self.limite_alunos is None:
+            return True
+        # Arquivo exportado (savefig, SVG, PDF): o histograma não tem ordem e as ordens sairiam iguais
+        if renderer is not None and not isinstance(renderer, RendererAgg):
+            return True
+        if self.figure is not None and self.figure.canvas.is_saving():
+            return True
+        minimo = PIXELS_MINIMOS_CELULA if len(self.notas) <= self.limite_alunos else PIXELS_CELULA_TURMA_GRANDE
+        return self.pixels_por_celula() >= minimo
+
+    def reordenar(self, ordem):
+        self.ordem = ordem
+        if self.celulas is not None and self.cores is None:
+            self.celulas.set_facecolor(self._cores_celulas())
+        self.stale = True
+
+    def colorir(self, cores):
+        self.cores = np.broadcast_to(to_rgba_array(cores), (len(self.notas), 4)).copy()
+        if self.celulas is not None:
+            self.celulas.set_facecolor(self.cores)
+        self.stale = True
+
+    def _preparar(self, colecao):
+        # As coleções não são adicionadas no eixo, então herdam eixo/transformação/recorte do mapa
+        if colecao.axes is not self.axes:
+            colecao.axes = self.axes
+            colecao.set_figure(self.figure)
+            colecao.set_transform(self.get_transform())
+            colecao.set_clip_path(self.get_clip_path())
+            colecao.set_clip_box(self.get_clip_box())
+        return colecao
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        if self.usa_celulas(renderer):
+            if self.celulas is None:
+                with instrumentacao.trecho("viz.mapa_calor.criar_celulas", alunos=len(self.notas)):
+                    self.celulas = self._criar_celulas()
+                instrumentacao.contar("viz.quadradinhos_criados", len(self.notas))
+            self._preparar(self.celulas).draw(renderer)
+        else:
+            if self.histograma is None:
+                with instrumentacao.trecho("viz.mapa_calor.criar_histograma", alunos=len(self.notas)):
+                    self.histograma = self._criar_histograma()
+            self._preparar(self.histograma).draw(renderer)
+        self.stale = False
+
+
+def desenhar_mini_mapa_calor(ax, x, y, width, height, notas, ordem='decrescente', ra_sequencia=None,
+                             limite_alunos=LIMITE_ALUNOS_DETALHE):
     """
     Desenha o mini mapa de calor com diferentes ordens de visualização.
+    É um artista só por nó (MapaCalor), que mostra os quadradinhos ou o histograma conforme o zoom.
     
     Parâmetros:
     - ax: objeto de eixos do matplotlib onde desenhar
+    - notas: lista (None = não cursou) ou array numpy (NaN = não cursou), na ordem do ra_sequencia
     - ordem: 'decrescente', 'crescente', 'ra'
     - ra_sequencia: lista ordenada de RAs para a ordem 'ra'
-    """
-    if not notas:
-        return
-    
-    notas_validas = [n for n in notas if n is not None]
-    quadrados_cinzas = [n for n in notas if n is None]
-    
-    notas_ordenadas = []
-    
-    # Ordenar as notas conforme a opção selecionada
-    if ordem == 'decrescente':
-        notas_ordenadas_validas = sorted(notas_validas, reverse=True)
-        notas_ordenadas = notas_ordenadas_validas + quadrados_cinzas
-    elif ordem == 'crescente':
-        notas_ordenadas_validas = sorted(notas_validas)
-        notas_ordenadas = notas_ordenadas_validas + quadrados_cinzas
-    elif ordem == 'ra':
-        # Na ordem 'ra', as notas já vêm na ordem correta (incluindo 'None')
-        # da função 'desenhar_grafo_em_camadas'
-        notas_ordenadas = notas
-    else:
-        # Padrão (decrescente)
-        notas_ordenadas_validas = sorted(notas_validas, reverse=True)
-        notas_ordenadas = notas_ordenadas_validas + quadrados_cinzas
+    - limite_alunos: acima disso o mapa começa como histograma (None = sempre quadradinhos)
 
+    Retorna o MapaCalor criado (ou None se não tiver notas)
+    """
+    if notas is None or len(notas) == 0:
+        return None
 
-    num_notas = len(notas_ordenadas) 
-    
-    # o layout do grid
-    cols = min(5, num_notas)  
-    rows = (num_notas + cols - 1) // cols
-    
-    # tamanho dos quadradinhos
-    cell_width = width / cols
-    cell_height = height / rows
-    for i, nota in enumerate(notas_ordenadas):
-        row = i // cols
-        col = i % cols
-        
-        cell_x = x - width/2 + col * cell_width
-        cell_y = y + height/2 - (row + 1) * cell_height
-
-        if nota is None:
-            cor = '#CCCCCC'
-        else:
-            cor = map_nota_para_cor(nota)
-        
-        cell = FancyBboxPatch(
-            (cell_x, cell_y),
-            cell_width, cell_height,
-            boxstyle="square,pad=0.01",
-            facecolor=cor,
-            edgecolor='white',
-            linewidth=0.3,
-            zorder=4
-        )
-        ax.add_patch(cell)
+    mapa = MapaCalor(x, y, width, height, notas, ordem, limite_alunos)
+    ax.add_artist(mapa)
+    return mapa
 # ---------------------------
 # Função: criar_grafo_do_catalogo
 # ---------------------------
+@instrumentacao.medido("viz.criar_grafo_do_catalogo")
 def criar_grafo_do_catalogo(catalogo: Catalogo) -> nx.DiGraph:
     """
     Constrói um networkx.DiGraph a partir de um objeto Catalogo (model.Catalogo)
@@ -138,19 +350,18 @@ def criar_grafo_do_catalogo(catalogo: Catalogo) -> nx.DiGraph:
     return G
 
 # ---------------------------
-# Função: desenhar_grafo_em_camadas
+# Função: calcular_layout
 # ---------------------------
-def desenhar_grafo_em_camadas(grafo: nx.DiGraph, catalogo: Catalogo, ordem_heatmap='decrescente', ra_sequencia=None) -> Figure:
+@instrumentacao.medido("viz.calcular_layout")
+def calcular_layout(grafo: nx.DiGraph) -> dict:
     """
-    Recebe um grafo (nx.DiGraph) com atributo de nó 'semestre' e desenha:
-    - Colunas verticais por semestre
-    - Nós como caixas arredondadas dentro de cada coluna
-    - Arestas com setas entre as caixas
-    - Linhas tracejadas verticais entre colunas
-    - Margens superiores/inferiores reduzidas para maior área útil
+    Calcula onde cada nó fica no desenho (só depende do grafo, não dos alunos).
+    Retorna um dicionário com:
+    - pos: {nó: (x, y)} centro de cada caixa
+    - semestres: lista ordenada dos semestres (uma coluna cada)
+    - horizontal_spacing, vertical_spacing, box_width, box_height
+    - y_min, y_max: limites verticais das colunas
     """
-    # plt.rcParams['toolbar'] = 'None'
-
     # -------------------------------------
     # 1) Agrupar nós por semestre
     # -------------------------------------
@@ -201,6 +412,402 @@ def desenhar_grafo_em_camadas(grafo: nx.DiGraph, catalogo: Catalogo, ordem_heatm
     y_max = max(all_y) + 4   
     y_min = min(all_y) - 4   # folga embaixo
 
+    return {
+        "pos": pos, "semestres": semestres,
+        "horizontal_spacing": horizontal_spacing, "vertical_spacing": vertical_spacing,
+        "box_width": box_width, "box_height": box_height,
+        "y_min": y_min, "y_max": y_max,
+    }
+
+
+# Curvatura das setas (o mesmo "arc3,rad=0.08" que as FancyArrowPatch usavam)
+CURVATURA_SETA = 0.08
+
+
+def geometria_arestas(layout, arestas):
+    """
+    Pontos inicial e final de todas as setas de uma vez, encostando nas bordas das caixas em vez do centro.
+    Retorna (arestas_validas, inicio, fim): inicio/fim são arrays (E, 2) na mesma ordem de arestas_validas.
+    Arestas com nó sem posição (ex.: nó sem semestre) ou com os dois nós no mesmo lugar ficam de fora.
+    """
+    pos = layout["pos"]
+    arestas = [(s, e) for s, e in arestas if s in pos and e in pos]
+    if not arestas:
+        return [], np.zeros((0, 2)), np.zeros((0, 2))
+    s_pos = np.array([pos[s] for s, _ in arestas], dtype=float)
+    e_pos = np.array([pos[e] for _, e in arestas], dtype=float)
+    vec = e_pos - s_pos
+    validas = np.any(vec != 0, axis=1)
+
+    # os pontos iniciais/finais vão pra borda das caixas no sentido da seta, se não elas apontam pra dentro do nó
+    meia_caixa = np.array([layout["box_width"] / 2, layout["box_height"] / 2])
+    deslocamento = np.sign(vec) * meia_caixa
+    inicio = s_pos + deslocamento
+    fim = e_pos - deslocamento
+    arestas = [a for a, ok in zip(arestas, validas) if ok]
+    return arestas, inicio[validas], fim[validas]
+
+
+def pontos_aresta(layout, start, end):
+    #Pontos (inicial, final) de uma seta só, ou None se ela não puder ser desenhada (ver geometria_arestas)
+    arestas, inicio, fim = geometria_arestas(layout, [(start, end)])
+    if not arestas:
+        return None
+    return inicio[0], fim[0]
+
+
+class ColecaoSetas(LineCollection):
+    """
+    Todas as setas do grafo num artista só (uma LineCollection), no lugar de uma FancyArrowPatch por aresta.
+
+    Os pontos ficam em coordenadas de dados (inicio/fim, como em geometria_arestas), e a curva é montada
+    a cada desenho em pixels, igual ao "arc3" do matplotlib: uma Bézier quadrática com o ponto de controle
+    deslocado CURVATURA_SETA vezes o tamanho da seta. A ponta "->" (duas linhas) tem tamanho fixo em pontos,
+    então continua do mesmo tamanho com zoom.
+
+    - indice[(start, end)]: posição da aresta nos arrays
+    - colorir(indices, cor, largura): muda a cor/espessura só dessas arestas
+    - selecionar(indices): desenha só essas arestas (None = todas), usado pela camada de destaque do hover
+    - guardar_fundos: com True, cada desenho guarda em 'fundos' a imagem da figura logo antes e logo depois
+      das setas (None se nenhuma seta foi desenhada), usado pela gui pra montar o fundo com as setas
+      apagadas sem outro desenho completo (ver apagar_setas)
+    Setas que ficam inteiras fora da área visível (zoom/pan) não entram no desenho.
+    """
+    def __init__(self, inicio, fim, arestas, curvatura=CURVATURA_SETA, tamanho_ponta=20,
+                 amostras=16, encolher=2.0, colors='#262626', linewidths=1.8, **kwargs):
+        super().__init__([], **kwargs)
+        self.inicio = np.asarray(inicio, dtype=float).reshape(-1, 2)
+        self.fim = np.asarray(fim, dtype=float).reshape(-1, 2)
+        self.arestas = list(arestas)
+        self.indice = {aresta: i for i, aresta in enumerate(self.arestas)}
+        self.curvatura = curvatura
+        self.tamanho_ponta = tamanho_ponta  # o mutation_scale da FancyArrowPatch, em pontos
+        self.encolher = encolher            # o shrinkA/shrinkB padrão da FancyArrowPatch, em pontos
+        self.t = np.linspace(0.0, 1.0, amostras)[None, :, None]
+        self.cores = np.tile(to_rgba(colors), (len(self.arestas), 1))
+        self.larguras = np.full(len(self.arestas), float(linewidths))
+        self.selecao = None
+        self.guardar_fundos = False
+        self.fundos = None
+        # Os segmentos são calculados em pixels na hora do desenho
+        self.set_transform(IdentityTransform())
+
+    def colorir(self, indices, cor=None, largura=None):
+        if cor is not None:
+            self.cores[indices] = to_rgba(cor)
+        if largura is not None:
+            self.larguras[indices] = largura
+        self.stale = True
+
+    def selecionar(self, indices):
+        self.selecao = None if indices is None else np.asarray(indices, dtype=np.int64)
+        self.stale = True
+
+    @instrumentacao.medido("viz.setas.draw")
+    def draw(self, renderer):
+        self.fundos = None
+        if not self.get_visible() or self.axes is None:
+            return
+        sel = np.arange(len(self.arestas)) if self.selecao is None else self.selecao
+        if len(sel) == 0:
+            return
+        transformacao = self.axes.transData
+        p0 = transformacao.transform(self.inicio[sel])
+        p2 = transformacao.transform(self.fim[sel])
+
+        # Ponto de controle do arc3: meio do segmento + curvatura * (dy, -dx)
+        d = p2 - p0
+        controle = (p0 + p2) / 2 + self.curvatura * np.stack([d[:, 1], -d[:, 0]], axis=1)
+
+        # Só as setas que aparecem na tela: a curva fica dentro do triângulo início/controle/fim,
+        # então basta o retângulo desses três pontos cruzar a área do eixo
+        caixa = self.axes.bbox
+        pontos = np.stack([p0, controle, p2], axis=1)
+        minimo, maximo = pontos.min(axis=1), pontos.max(axis=1)
+        na_tela = ((minimo[:, 0] <= caixa.x1) & (maximo[:, 0] >= caixa.x0) &
+                   (minimo[:, 1] <= caixa.y1) & (maximo[:, 1] >= caixa.y0))
+        if not na_tela.all():
+            sel, p0, p2, controle = sel[na_tela], p0[na_tela], p2[na_tela], controle[na_tela]
+        if len(sel) == 0:
+            return
+
+        # Encolhe as duas pontas um pouco ao longo da tangente (como o shrinkA/B)
+        encolher = renderer.points_to_pixels(self.encolher)
+        p0 = p0 + _unitario(controle - p0) * encolher
+        p2 = p2 + _unitario(controle - p2) * encolher
+
+        t = self.t
+        curvas = (1 - t) ** 2 * p0[:, None] + 2 * (1 - t) * t * controle[:, None] + t ** 2 * p2[:, None]
+
+        # Ponta "->": duas linhas saindo da ponta pra trás (head_length=0.4, head_width=0.2 do ArrowStyle)
+        escala = renderer.points_to_pixels(self.tamanho_ponta)
+        direcao = _unitario(p2 - controle)
+        normal = np.stack([-direcao[:, 1], direcao[:, 0]], axis=1)
+        base = p2 - direcao * 0.4 * escala
+        pontas = np.stack([base + normal * 0.2 * escala, p2, base - normal * 0.2 * escala], axis=1)
+
+        self.set_segments(list(curvas) + list(pontas))
+        self.set_color(np.concatenate([self.cores[sel], self.cores[sel]]))
+        self.set_linewidth(np.concatenate([self.larguras[sel], self.larguras[sel]]))
+        # Só o Agg tem copy_from_bbox (no savefig em SVG/PDF não guarda nada)
+        guardar = self.guardar_fundos and hasattr(renderer, "copy_from_bbox")
+        if guardar:
+            antes = renderer.copy_from_bbox(self.figure.bbox)
+        super().draw(renderer)
+        if guardar:
+            self.fundos = (antes, renderer.copy_from_bbox(self.figure.bbox))
+        self.stale = False
+
+
+def apagar_setas(antes, depois, imagem, alpha=0.3):
+    """
+    Muda 'imagem' (a figura inteira, RGBA, no lugar) pra as setas ficarem como se tivessem sido desenhadas
+    com 'alpha', a partir das imagens logo antes e logo depois das setas (ColecaoSetas.fundos).
+    Onde o pixel ainda é o de logo depois das setas, nada foi desenhado por cima dele: volta
+    (1 - alpha) do caminho até o pixel de antes. O resto (caixas, mapas, textos por cima) fica igual.
+    Retorna o retângulo dos pixels que mudaram (x0, y0, x1, y1), em colunas/linhas da imagem
+    (y de cima pra baixo), ou None se nenhum mudou
+    """
+    antes, depois = np.asarray(antes), np.asarray(depois)
+    if antes.shape != imagem.shape or depois.shape != imagem.shape:
+        return None
+    # Cada pixel RGBA como um uint32, pra comparar a imagem inteira de uma vez
+    a, d, f = (np.ascontiguousarray(x).view(np.uint32)[..., 0] for x in (antes, depois, imagem))
+    ys, xs = np.nonzero((a != d) & (f == d))
+    if len(ys) == 0:
+        return None
+    # As contas só nos pixels das setas
+    pixels_antes = antes[ys, xs].astype(np.float32)
+    pixels_depois = depois[ys, xs].astype(np.float32)
+    imagem[ys, xs] = np.rint(pixels_depois + (1 - alpha) * (pixels_antes - pixels_depois)).astype(np.uint8)
+    return int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1
+
+
+def _unitario(v):
+    norma = np.linalg.norm(v, axis=1, keepdims=True)
+    return v / np.where(norma == 0, 1.0, norma)
+
+
+class IndiceEspacial:
+    """
+    Grade uniforme (em coordenadas de dados) com as caixas dos nós, pra achar o nó embaixo
+    do mouse sem testar todas as caixas. Cada célula guarda os nós cujas caixas encostam nela,
+    então a busca é: calcular a célula do ponto e testar só os poucos nós dela.
+    Só precisa ser refeito quando o layout muda.
+    """
+    def __init__(self, layout, folga=0.1):
+        # folga = o pad do boxstyle "round,pad=0.1" das caixas, pra área clicável ser a caixa desenhada
+        self.tamanho_x = layout["horizontal_spacing"]
+        self.tamanho_y = layout["vertical_spacing"]
+        meia_largura = layout["box_width"] / 2 + folga
+        meia_altura = layout["box_height"] / 2 + folga
+        self.caixas = {}
+        self.celulas = defaultdict(list)
+        for no, (x, y) in layout["pos"].items():
+            caixa = (x - meia_largura, y - meia_altura, x + meia_largura, y + meia_altura)
+            self.caixas[no] = caixa
+            for cx in range(self._celula(caixa[0], self.tamanho_x), self._celula(caixa[2], self.tamanho_x) + 1):
+                for cy in range(self._celula(caixa[1], self.tamanho_y), self._celula(caixa[3], self.tamanho_y) + 1):
+                    self.celulas[(cx, cy)].append(no)
+
+    @staticmethod
+    def _celula(valor, tamanho):
+        return int(np.floor(valor / tamanho))
+
+    def no_em(self, x, y):
+        #Retorna o nó cuja caixa contém o ponto (x, y), ou None
+        if x is None or y is None:
+            return None
+        for no in self.celulas.get((self._celula(x, self.tamanho_x), self._celula(y, self.tamanho_y)), ()):
+            x0, y0, x1, y1 = self.caixas[no]
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                return no
+        return None
+
+    def nos_na_regiao(self, x0, y0, x1, y1):
+        #Todos os nós cujas caixas cruzam o retângulo [x0, x1] × [y0, y1]
+        encontrados = set()
+        for cx in range(self._celula(x0, self.tamanho_x), self._celula(x1, self.tamanho_x) + 1):
+            for cy in range(self._celula(y0, self.tamanho_y), self._celula(y1, self.tamanho_y) + 1):
+                for no in self.celulas.get((cx, cy), ()):
+                    bx0, by0, bx1, by1 = self.caixas[no]
+                    if bx0 <= x1 and bx1 >= x0 and by0 <= y1 and by1 >= y0:
+                        encontrados.add(no)
+        return encontrados
+
+
+class RecorteVisivel:
+    """
+    Acompanha os limites do eixo (zoom/pan) e deixa visíveis só os artistas dos nós que aparecem na tela:
+    caixa, texto, selos e mapa de calor. Os nós fora da tela ficam com set_visible(False), então
+    o matplotlib nem chega a processar eles, e o mapa de calor só é montado quando aparece (MapaCalor).
+    A consulta de quais nós estão na tela é feita na grade do IndiceEspacial.
+
+    - artistas_por_no: {no: [artistas]}
+    - visiveis: nós visíveis agora
+    - ligar({no: artista}, ligado): esconde/mostra artistas de propósito (os selos), sem redesenhar a figura
+    """
+    def __init__(self, ax, layout, artistas_por_no):
+        self.ax = ax
+        self.indice = IndiceEspacial(layout)
+        self.artistas_por_no = artistas_por_no
+        # Os selos passam um pouco da caixa, então a área consultada é a tela + meia caixa
+        self.margem = max(layout["box_width"], layout["box_height"]) / 2
+        self.visiveis = set(artistas_por_no)
+        self.desligados = set()  # artistas escondidos de propósito (ligar), a tela não mexe neles
+        ax.callbacks.connect('xlim_changed', self.atualizar)
+        ax.callbacks.connect('ylim_changed', self.atualizar)
+        self.atualizar()
+
+    def atualizar(self, ax=None):
+        (x0, x1), (y0, y1) = sorted(self.ax.get_xlim()), sorted(self.ax.get_ylim())
+        m = self.margem
+        visiveis = self.indice.nos_na_regiao(x0 - m, y0 - m, x1 + m, y1 + m) & set(self.artistas_por_no)
+        # Só mexe nos nós que entraram ou saíram da tela
+        for no in visiveis ^ self.visiveis:
+            for artista in self.artistas_por_no[no]:
+                artista.set_visible(no in visiveis and artista not in self.desligados)
+        self.visiveis = visiveis
+
+    def adicionar(self, no, artista):
+        #Artista novo de um nó que já existe (ex.: mapa de calor que chegou depois, ver gerar_mapas_calor)
+        self.artistas_por_no[no].append(artista)
+        artista.set_visible(no in self.visiveis and artista not in self.desligados)
+
+    def ligar(self, artistas_por_no, ligado):
+        #Liga/desliga artistas ({no: artista}, ex.: os selos): desligado fica escondido mesmo com o nó na tela
+        for no, artista in artistas_por_no.items():
+            if ligado:
+                self.desligados.discard(artista)
+            else:
+                self.desligados.add(artista)
+            artista.set_visible(ligado and no in self.visiveis)
+
+
+# Selos no canto de cada nó: tipo -> (canto: +1 direito / -1 esquerdo, símbolo, cor)
+SELOS = {
+    "retencao": (1, "↻", '#8B0000'),
+    "elegiveis": (-1, "✓", '#1F4E99'),
+}
+
+
+def contagens_selo(tipo, catalogo: Catalogo, grafo, ra_sequencia=None):
+    """
+    Número do selo de cada nó ({no: n}, só os maiores que zero):
+    - retencao: quantos alunos precisaram cursar mais de uma vez (direto do índice de tentativas)
+    - elegiveis: quantos podem cursar agora (pré-requisitos aprovados) e ainda não cursaram
+      (a turma inteira numa conta de matrizes só)
+    """
+    if tipo == "retencao":
+        return {no: r['refizeram'] for no, r in catalogo.resumo_retencao().items() if r['refizeram'] > 0}
+    contagens = Elegibilidade(catalogo, grafo, ra_sequencia).contagens()
+    return {no: c['elegiveis_nao_cursaram'] for no, c in contagens.items() if c['elegiveis_nao_cursaram'] > 0}
+
+
+def desenhar_selo(ax, layout, node, tipo, quantidade):
+    x, y = layout["pos"][node]
+    canto, simbolo, cor = SELOS[tipo]
+    selo = ax.text(
+        x + canto * layout["box_width"] / 2, y + layout["box_height"] / 2, f"{simbolo}{quantidade}",
+        ha='center', va='center', fontsize=7, fontweight='bold', color='white',
+        bbox=dict(boxstyle="round,pad=0.2", facecolor=cor, edgecolor='none'),
+        zorder=6
+    )
+    selo.set_gid(f"{tipo}:{node}")
+    return selo
+
+
+def desenhar_selos(ax, layout, tipo, contagens):
+    """
+    Todos os selos de um tipo de uma vez, numa figura que já está pronta (a gui, quando o selo é ligado
+    depois). Entram no ax.recorte_visivel como os outros artistas do nó. Retorna {no: selo}
+    """
+    selos = {}
+    for node, quantidade in contagens.items():
+        if node in layout["pos"]:
+            selos[node] = desenhar_selo(ax, layout, node, tipo, quantidade)
+            ax.recorte_visivel.adicionar(node, selos[node])
+    return selos
+
+
+# ---------------------------
+# Função: gerar_mapas_calor
+# ---------------------------
+def gerar_mapas_calor(ax, layout, catalogo: Catalogo, grafo, ordem_heatmap='decrescente', ra_sequencia=None,
+                      mostrar_retencao=False, mostrar_elegiveis=False, limite_alunos=LIMITE_ALUNOS_DETALHE):
+    """
+    Gerador que coloca no eixo, nó por nó, tudo que depende das notas da turma: o mapa de calor
+    e os selos de retenção/elegíveis. Cada next() termina um nó e retorna (node, [artistas novos]).
+    O esqueleto do grafo (colunas, caixas, textos, setas) já tem que estar desenhado no 'ax'
+    (desenhar_grafo_em_camadas), os artistas novos entram no ax.recorte_visivel
+    """
+    box_width = layout["box_width"]
+    box_height = layout["box_height"]
+    # Linha de cada RA na matriz de notas do catálogo, calculada uma vez só pra todos os nós
+    linhas_ras = catalogo.linhas_dos_ras(ra_sequencia) if ra_sequencia else None
+    # Números dos selos de todos os nós de uma vez (contagens_selo)
+    selos = {tipo: contagens_selo(tipo, catalogo, grafo, ra_sequencia)
+             for tipo, ligado in (("retencao", mostrar_retencao), ("elegiveis", mostrar_elegiveis)) if ligado}
+
+    for node, (x, y) in layout["pos"].items():
+        inicio = time.perf_counter()
+        novos = []
+        #Obter as notas pro mapa de calor (a coluna inteira da disciplina de uma vez)
+        notas = notas_do_mapa(catalogo, node, linhas_ras)
+
+        #Desenhar mini mapa de calor:
+        mapa_height = box_height * 0.65
+        mapa = desenhar_mini_mapa_calor(ax, x, y + box_height * 0.15, box_width * 0.9, mapa_height, notas, ordem_heatmap, ra_sequencia,
+                                        limite_alunos)
+        if mapa is not None:
+            mapa.set_gid(f"mapa:{node}")
+            novos.append(mapa)
+
+        for tipo, contagens in selos.items():
+            if node in contagens:
+                novos.append(desenhar_selo(ax, layout, node, tipo, contagens[node]))
+
+        for artista in novos:
+            ax.recorte_visivel.adicionar(node, artista)
+        # Medido na mão: um 'with' em volta do yield contaria também o tempo de quem consome o gerador
+        instrumentacao.registrar_trecho("viz.mapa_calor", inicio, time.perf_counter() - inicio, no=node)
+        instrumentacao.contar("viz.artistas_criados", len(novos))
+        yield node, novos
+
+# ---------------------------
+# Função: desenhar_grafo_em_camadas
+# ---------------------------
+@instrumentacao.medido("viz.desenhar_grafo_em_camadas")
+def desenhar_grafo_em_camadas(grafo: nx.DiGraph, catalogo: Catalogo, ordem_heatmap='decrescente', ra_sequencia=None,
+                              mostrar_retencao=False, mostrar_elegiveis=False,
+                              limite_alunos=LIMITE_ALUNOS_DETALHE, progressivo=False) -> Figure:
+    """
+    Recebe um grafo (nx.DiGraph) com atributo de nó 'semestre' e desenha:
+    - Colunas verticais por semestre
+    - Nós como caixas arredondadas dentro de cada coluna
+    - Arestas com setas entre as caixas
+    - Linhas tracejadas verticais entre colunas
+    - Margens superiores/inferiores reduzidas para maior área útil
+    - mostrar_retencao: selo no canto de cada nó com quantos alunos refizeram a disciplina
+    - mostrar_elegiveis: selo com quantos alunos podem cursar a disciplina e ainda não cursaram
+    - limite_alunos: acima disso os mapas de calor começam como histograma (None = sempre quadradinhos)
+    - progressivo: retorna só o esqueleto (colunas, caixas, textos, setas, que só dependem do XML) e deixa
+      os mapas de calor e os selos no gerador ax.mapas_pendentes (gerar_mapas_calor), pra quem chama
+      ir completando aos poucos. Sem isso o gerador é consumido aqui e a figura já sai completa
+    """
+    # plt.rcParams['toolbar'] = 'None'
+
+    # -------------------------------------
+    # 1-4) Layout: semestres, tamanhos das caixas e posição de cada nó (calcular_layout)
+    # -------------------------------------
+    layout = calcular_layout(grafo)
+    pos = layout["pos"]
+    semestres = layout["semestres"]
+    horizontal_spacing = layout["horizontal_spacing"]
+    box_width = layout["box_width"]
+    box_height = layout["box_height"]
+    y_min, y_max = layout["y_min"], layout["y_max"]
+
     # -------------------------------------
     # 5) Preparar figura e eixos
     # -------------------------------------
@@ -247,18 +854,10 @@ def desenhar_grafo_em_camadas(grafo: nx.DiGraph, catalogo: Catalogo, ordem_heatm
     # -------------------------------------
     # 7) Desenhar as caixas ancyBboxPatch (SÃO OS NÓS)
     # -------------------------------------
+    # Aqui só a caixa e o código; o mapa de calor e os selos (que precisam das notas) vêm de gerar_mapas_calor
+    # Artistas de cada nó, pro RecorteVisivel esconder os que saem da tela
+    artistas_por_no = defaultdict(list)
     for node, (x, y) in pos.items():
-        #Obter as notas pro mapa de calor
-        disciplina = catalogo.get_disciplina(node)
-        notas = []
-        if disciplina and ra_sequencia:
-            for ra in ra_sequencia:
-                ultimo_registro = disciplina.get_ultima_nota_aluno(ra)
-                if ultimo_registro and ultimo_registro['nota'] is not None and ultimo_registro['nota'] >= 0:
-                    notas.append(ultimo_registro['nota'])
-                else:
-                    notas.append(None)  # None indica aluno sem nota nesta disciplin
-        
         #Criar caixa principal 
         rect = FancyBboxPatch(
             (x - box_width / 2, y - box_height / 2),  # canto inferior esquerdo
@@ -275,11 +874,8 @@ def desenhar_grafo_em_camadas(grafo: nx.DiGraph, catalogo: Catalogo, ordem_heatm
         rect.set_gid(node)     # Associa o ID do nó a ela
 
         ax_grafo.add_patch(rect)
+        artistas_por_no[node].append(rect)
 
-        #Desenhar mini mapa de calor:
-        mapa_height = box_height * 0.65
-        desenhar_mini_mapa_calor(ax_grafo, x, y + box_height * 0.15, box_width * 0.9, mapa_height, notas, ordem_heatmap, ra_sequencia)
-        
         # Escreve o código da disciplina embaixo
         txt = ax_grafo.text(x, y - box_height * 0.4, node, 
                       ha='center', va='center',
@@ -288,55 +884,18 @@ def desenhar_grafo_em_camadas(grafo: nx.DiGraph, catalogo: Catalogo, ordem_heatm
 
         txt.set_picker(True) # O texto tem que ser clicável tbm pra nao dar uns bugs
         txt.set_gid(node)    
+        artistas_por_no[node].append(txt)
 
     # -------------------------------------
     # 8) Desenhar arestas orientadas
     # -------------------------------------
-    # Para cada aresta (start -> end) é uma FancyArrowPatch ligando as bordas das caixas.
-    # Ajustar os pontos inicial/final para "encostar" nas bordas das caixas em vez do centro.
-    for start, end in grafo.edges():
-        # Se alguma das posições não existir (ex.: nó sem semestre), pulamos a aresta
-        if start not in pos or end not in pos:
-            continue
-
-        s_pos = np.array(pos[start])
-        e_pos = np.array(pos[end])
-        vec = e_pos - s_pos
-        vec_len = np.linalg.norm(vec)
-        if vec_len == 0:
-            continue
-
-        u_vec = vec / vec_len  
-        start_point = s_pos.copy()
-        end_point = e_pos.copy()
-
-        # os pontos iniciais/finais para a borda das caixas com base nos vetores se não elas apontam pra dentro do nó
-        if u_vec[0] > 0:
-            start_point[0] += box_width / 2
-            end_point[0] -= box_width / 2
-        elif u_vec[0] < 0:
-            start_point[0] -= box_width / 2
-            end_point[0] += box_width / 2
-
-        if u_vec[1] > 0:
-            start_point[1] += box_height / 2
-            end_point[1] -= box_height / 2
-        elif u_vec[1] < 0:
-            start_point[1] -= box_height / 2
-            end_point[1] += box_height / 2
-
-        # AS SETAS
-        arrow = FancyArrowPatch(
-            start_point, end_point,
-            arrowstyle='->', color='#262626',
-            mutation_scale=20, linewidth=1.8,
-            connectionstyle="arc3,rad=0.08", zorder=2
-        )
-
-        arrow.set_gid(f"{start}->{end}")  # Identificador único para a seta
-
-
-        ax_grafo.add_patch(arrow)
+    # Todas as arestas (start -> end) numa coleção só: os pontos que "encostam" nas bordas das caixas
+    # são calculados de uma vez e a curva/ponta de cada seta é montada pela ColecaoSetas na hora do desenho.
+    # O gid da coleção é "arestas" e setas.indice guarda a posição de cada aresta
+    arestas, inicio, fim = geometria_arestas(layout, grafo.edges())
+    setas = ColecaoSetas(inicio, fim, arestas, colors='#262626', linewidths=1.8, zorder=2)
+    setas.set_gid("arestas")
+    ax_grafo.add_collection(setas, autolim=False)
 
     # -------------------------------------
     # 9) Linhas pontilhada entre as colunas
@@ -356,6 +915,10 @@ def desenhar_grafo_em_camadas(grafo: nx.DiGraph, catalogo: Catalogo, ordem_heatm
     # limites Y com pequena folga
     ax_grafo.set_ylim(y_min - 0.8, y_max + 0.8)
 
+    # Daqui pra frente o zoom/pan da barra de ferramentas só desenha os nós que estão na tela.
+    # Fica guardado no eixo pra não ser coletado (o callback do matplotlib guarda só uma referência fraca)
+    ax_grafo.recorte_visivel = RecorteVisivel(ax_grafo, layout, artistas_por_no)
+
     # Remover marcadores e spines (eixos) para estilo "canvas"
     ax_grafo.set_xticks([])
     ax_grafo.set_yticks([])
@@ -368,8 +931,22 @@ def desenhar_grafo_em_camadas(grafo: nx.DiGraph, catalogo: Catalogo, ordem_heatm
     # título do gráfico
     ax_grafo.set_title("Sistema de Visualização de Múltiplos Históricos", fontsize=20, weight='bold', pad=18)
 
+    instrumentacao.contar("viz.artistas_criados", len(ax_grafo.get_children()))
+
+    # -------------------------------------
+    # 11) Mapas de calor e selos (agora ou depois, aos poucos)
+    # -------------------------------------
+    mapas = gerar_mapas_calor(ax_grafo, layout, catalogo, grafo, ordem_heatmap, ra_sequencia,
+                              mostrar_retencao, mostrar_elegiveis, limite_alunos)
+    if progressivo:
+        ax_grafo.mapas_pendentes = mapas
+    else:
+        for _ in mapas:
+            pass
+        ax_grafo.mapas_pendentes = None
+
     # -------------------------------------
-    # 11) Ajustar margens e retornar figura
+    # 12) Ajustar margens e retornar figura
     # -------------------------------------
     fig.subplots_adjust(top=0.98, bottom=0.02, left=0.01, right=0.99)
     return fig